@@ -6,16 +6,32 @@
 ╚══════════════════════════════════════════════════════════════════════════════╝
 """
 
+import argparse
+import atexit
+import codecs
+import heapq
 import json
+import mmap
+import operator
 import os
 import re
-import textwrap
+import struct
+import sys
+import threading
 import unicodedata
+import zlib
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from collections.abc import Sequence as SequenceABC
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache, total_ordering, wraps
+from itertools import chain, compress, islice, repeat
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -97,11 +113,49 @@ class Cores:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 UI_LARGURA = 70
+RECENTES_LIMITE = 20  # transações mantidas no feed de atividade recente
 PROJETO_NOME = "PyBank"
 PROJETO_VERSAO = "v.5_final"
-DATA_DIR = Path(__file__).parent / "data"
+CACHE_TEXTOS = 4096  # textos distintos lembrados pelos cálculos de largura visual
+DATA_DIR = Path(os.environ.get("PYBANK_DATA_DIR", Path(__file__).parent / "data"))
 CLIENTES_FILE = DATA_DIR / "clientes.json"
 CONTAS_FILE = DATA_DIR / "contas.json"
+JOURNAL_FILE = DATA_DIR / "journal.jsonl"
+JOURNAL_ANTERIOR_FILE = DATA_DIR / "journal.anterior.jsonl"  # posto de lado durante um snapshot
+JOURNAL_ATIVO = True
+JOURNAL_LIMITE = 1000  # operações no journal antes de compactar em snapshot
+CARGA_BLOCO = 1 << 16  # bytes lidos por vez pelo carregador incremental
+INDICE_CONTAS_FILE = DATA_DIR / "contas.indice.json"
+HISTORICO_SOB_DEMANDA = os.environ.get("PYBANK_HISTORICO_SOB_DEMANDA", "0") == "1"
+HISTORICO_MEMORIA_MAX = int(os.environ.get("PYBANK_HISTORICO_MEMORIA_MAX", 64 * 1024 * 1024))
+HISTORICO_MAPEADO = os.environ.get("PYBANK_HISTORICO_MAPEADO", "0") == "1"
+HISTORICOS_DIR = DATA_DIR / "historicos"  # um arquivo de registros fixos por conta
+HISTORICOS_MAPEADOS_MAX = 256  # mapas abertos ao mesmo tempo (cada um segura um descritor)
+SQLITE_FILE = DATA_DIR / "pybank.db"
+SNAPSHOT_FILE = DATA_DIR / "pybank.snap"
+FRAGMENTOS_DIR = DATA_DIR / "fragmentos"  # snapshot JSON dividido, regravado por partes
+CONTAS_POR_FRAGMENTO = 1024  # faixa de números de conta por arquivo de fragmento
+FRAGMENTOS_CLIENTES = 1024  # arquivos de clientes (por CRC32 do CPF)
+ARMAZENAMENTO = os.environ.get("PYBANK_ARMAZENAMENTO", "json")  # "json", "binario", "fragmentado" ou "sqlite"
+GRAVACAO_AGRUPADA = os.environ.get("PYBANK_GRAVACAO_AGRUPADA", "0") == "1"  # gravadora em segundo plano
+CONFIRMACAO = os.environ.get("PYBANK_CONFIRMACAO", "duravel")  # "duravel" ou "memoria"
+# Segundos que a gravadora espera juntando registros num grupo; com 0 o
+# grupo é o que se acumulou durante a gravação anterior (discos lentos
+# ganham com uma janela de alguns milissegundos)
+GRAVACAO_JANELA = float(os.environ.get("PYBANK_GRAVACAO_JANELA", 0))
+GRAVACAO_LOTE = 1000  # registros que fecham um grupo antes do fim da janela
+EXTRATO_POR_PAGINA = 20
+BUSCA_RESULTADOS = 8  # sugestões mostradas na seleção de conta por busca
+LISTAGEM_POR_PAGINA = 5  # cartões por página nas listagens de contas e clientes
+IMPORTACAO_LOTE = 10_000  # linhas do CSV processadas por lote na importação
+SERVIDOR_HOST = "127.0.0.1"
+SERVIDOR_PORTA = int(os.environ.get("PYBANK_PORTA", 8765))
+SERVIDOR_LOTE_MAX = 1000  # mutações aplicadas por persistência no servidor
+PARTICOES_DIR = DATA_DIR / "particoes"
+PARTICOES_MANIFESTO = "particoes.json"
+PARTICOES_DECISOES = "decisoes.jsonl"      # decisões de efetivar do coordenador (duas fases)
+PARTICOES_TRANSACOES = "transacoes.jsonl"  # votos e efetivações de cada partição
+ANALISE_NUMPY = os.environ.get("PYBANK_NUMPY", "1") != "0"  # 0 força as análises em Python puro
 
 # Cores tema
 C_PRIMARIA = Cores.CYAN
@@ -116,6 +170,131 @@ C_SUBTITULO = Cores.LIGHT_BLACK
 
 ANSI_ESCAPE_RE = re.compile(r"\033\[[0-9;]*m")
 VARIATION_SELECTOR = "\ufe0f"
+VALOR_RE = re.compile(r"\s*([+-]?)(\d*)(?:[.,](\d*))?\s*")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DINHEIRO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@total_ordering
+class Dinheiro:
+    """Valor monetário exato, guardado como inteiro de centavos.
+    
+    Imutável e comparável só com outro Dinheiro: somar ou comparar com
+    float é erro de tipo em vez de arredondamento silencioso. Valores em
+    reais (float, texto) entram por de_reais e saem por reais, só nas
+    bordas: entrada do usuário, arquivos antigos e JSON dos comandos.
+    """
+    __slots__ = ("_centavos",)
+    
+    def __init__(self, centavos: int = 0):
+        self._centavos = operator.index(centavos)  # recusa float
+    
+    @classmethod
+    def de_reais(cls, valor: Union["Dinheiro", int, float, str]) -> "Dinheiro":
+        """Converte reais ("10,50", "10.5", 10.5, 10) arredondando ao centavo.
+        
+        Metade arredonda para longe do zero, pelo texto decimal do valor
+        (1.005 vira R$ 1,01), sem passar por aritmética de float.
+        """
+        if isinstance(valor, Dinheiro):
+            return valor
+        if isinstance(valor, int) and not isinstance(valor, bool):
+            return cls(valor * 100)
+        if isinstance(valor, float):
+            texto = f"{valor:.6f}"  # desfaz o erro binário: 1.005 → "1.005000"
+        elif isinstance(valor, str):
+            texto = valor
+        else:
+            raise TypeError(f"Valor monetário inválido: {valor!r}")
+        m = VALOR_RE.fullmatch(texto)
+        if m is None or not (m.group(2) or m.group(3)):
+            raise ValueError(f"Valor monetário inválido: {valor!r}")
+        sinal, inteiro, fracao = m.group(1), m.group(2), m.group(3) or ""
+        centavos = int(inteiro or 0) * 100 + int(fracao[:2].ljust(2, "0"))
+        if fracao[2:3] >= "5":
+            centavos += 1
+        return cls(-centavos if sinal == "-" else centavos)
+    
+    @classmethod
+    def do_dict(cls, dados: dict, campo: str, padrao: Optional["Dinheiro"] = None) -> "Dinheiro":
+        """Lê `<campo>_centavos` ou, em dados antigos, `<campo>` em reais (float)."""
+        centavos = dados.get(campo + "_centavos")
+        if centavos is not None:
+            return cls(centavos)
+        valor = dados.get(campo)
+        if valor is None:
+            return cls() if padrao is None else padrao
+        return cls.de_reais(valor)
+    
+    @property
+    def centavos(self) -> int:
+        return self._centavos
+    
+    @property
+    def reais(self) -> float:
+        """Valor em reais para JSON e relatórios (c / 100 imprime as 2 casas exatas)."""
+        return self._centavos / 100
+    
+    def dividido(self, partes: int) -> "Dinheiro":
+        """Divide em `partes` iguais, arredondando ao centavo mais próximo."""
+        return Dinheiro((2 * self._centavos + partes) // (2 * partes))
+    
+    def __add__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return Dinheiro(self._centavos + outro._centavos)
+        return NotImplemented
+
+    def __radd__(self, outro):
+        # Só o 0 inicial de sum(); qualquer outro número é erro de tipo
+        if type(outro) is int and outro == 0:
+            return self
+        return NotImplemented
+    
+    def __sub__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return Dinheiro(self._centavos - outro._centavos)
+        return NotImplemented
+    
+    def __mul__(self, fator):
+        if isinstance(fator, int) and not isinstance(fator, bool):
+            return Dinheiro(self._centavos * fator)
+        return NotImplemented
+    
+    __rmul__ = __mul__
+    
+    def __neg__(self) -> "Dinheiro":
+        return Dinheiro(-self._centavos)
+    
+    def __abs__(self) -> "Dinheiro":
+        return Dinheiro(abs(self._centavos))
+    
+    def __bool__(self) -> bool:
+        return self._centavos != 0
+    
+    def __eq__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return self._centavos == outro._centavos
+        return NotImplemented
+    
+    def __lt__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return self._centavos < outro._centavos
+        return NotImplemented
+    
+    def __hash__(self) -> int:
+        return hash(self._centavos)
+    
+    def __reduce__(self):
+        return (Dinheiro, (self._centavos,))
+    
+    def __repr__(self) -> str:
+        return f"Dinheiro({self._centavos})"
+    
+    def __str__(self) -> str:
+        reais, centavos = divmod(abs(self._centavos), 100)
+        return f"{'-' if self._centavos < 0 else ''}{reais}.{centavos:02d}"
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -123,13 +302,22 @@ VARIATION_SELECTOR = "\ufe0f"
 # ═══════════════════════════════════════════════════════════════════════════════
 
 def limpar_tela():
-    """Limpa a tela do terminal."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    """Limpa a tela do terminal (na sessão interativa, começa um quadro novo)."""
+    TELA.limpar()
 
 
 def normalizar_unicode(texto: str) -> str:
     """Remove caracteres problemáticos para cálculo de largura visual."""
-    return str(texto).replace(VARIATION_SELECTOR, "")
+    texto = str(texto)
+    return texto if texto.isascii() else texto.replace(VARIATION_SELECTOR, "")
+
+
+def dobrar_texto(texto: str) -> str:
+    """Minúsculas e sem acentos, para comparar nomes ('João' → 'joao')."""
+    if texto.isascii():
+        return texto.lower()
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
 
 
 def limpar_ansi(texto: str) -> str:
@@ -137,22 +325,52 @@ def limpar_ansi(texto: str) -> str:
     return ANSI_ESCAPE_RE.sub("", normalizar_unicode(texto))
 
 
-def largura_visual(texto: str) -> int:
-    """Calcula largura visual real (Unicode + ANSI)."""
-    largura = 0
-    for char in limpar_ansi(texto):
+# Largura de cada caractere já visto (0 combinante, 2 largo, 1 demais);
+# ASCII entra pré-calculado e nem passa por aqui nos caminhos rápidos.
+_LARGURA_CHAR: Dict[str, int] = {chr(i): 1 for i in range(128)}
+_SEM_LARGURA = set()  # caracteres de largura 0 já vistos
+
+
+def largura_char(char: str) -> int:
+    """Largura visual de um caractere, consultando unicodedata uma vez por código."""
+    largura = _LARGURA_CHAR.get(char)
+    if largura is None:
         if unicodedata.combining(char):
-            continue
-        largura += 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+            largura = 0
+            _SEM_LARGURA.add(char)
+        else:
+            largura = 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+        _LARGURA_CHAR[char] = largura
     return largura
 
 
-def truncar_visual(texto: str, limite: int) -> str:
-    """Trunca texto considerando largura visual e sequências ANSI."""
-    if limite <= 0:
-        return ""
+def _largura_texto(visivel: str) -> int:
+    """Soma das larguras de um texto já sem sequências ANSI."""
+    try:
+        return sum(map(_LARGURA_CHAR.__getitem__, visivel))
+    except KeyError:
+        for char in visivel:
+            largura_char(char)
+        return sum(map(_LARGURA_CHAR.__getitem__, visivel))
+
 
+@lru_cache(maxsize=CACHE_TEXTOS)
+def _largura_unicode(texto: str) -> int:
+    return _largura_texto(ANSI_ESCAPE_RE.sub("", texto))
+
+
+def largura_visual(texto: str) -> int:
+    """Calcula largura visual real (Unicode + ANSI)."""
     texto = normalizar_unicode(texto)
+    if texto.isascii():
+        if "\033" not in texto:
+            return len(texto)
+        return len(ANSI_ESCAPE_RE.sub("", texto))
+    return _largura_unicode(texto)
+
+
+def _truncar(texto: str, limite: int) -> Tuple[str, int]:
+    """Texto (já normalizado) truncado em `limite` colunas e a largura resultante."""
     resultado = []
     largura = 0
     i = 0
@@ -169,29 +387,60 @@ def truncar_visual(texto: str, limite: int) -> str:
                 continue
 
         char = texto[i]
-        if unicodedata.combining(char):
+        largura_c = largura_char(char)
+        if not largura_c:
             i += 1
             continue
 
-        largura_char = 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
-        if largura + largura_char > limite:
+        if largura + largura_c > limite:
             truncado = True
             break
 
         resultado.append(char)
-        largura += largura_char
+        largura += largura_c
         i += 1
 
     texto_final = "".join(resultado)
     if truncado and possui_ansi and not texto_final.endswith(Cores.RESET):
         texto_final += Cores.RESET
-    return texto_final
+    return texto_final, largura
+
+
+@lru_cache(maxsize=CACHE_TEXTOS)
+def _truncar_unicode(texto: str, limite: int) -> Tuple[str, int]:
+    visivel = ANSI_ESCAPE_RE.sub("", texto) if "\033" in texto else texto
+    largura = _largura_texto(visivel)
+    # Caracteres de largura 0 são descartados pelo truncamento
+    if largura <= limite and _SEM_LARGURA.isdisjoint(visivel):
+        return texto, largura
+    return _truncar(texto, limite)
+
+
+def _truncar_rapido(texto: str, limite: int) -> Tuple[str, int]:
+    """Como _truncar, mas devolve o próprio texto quando ele já cabe."""
+    if limite <= 0:
+        return "", 0
+    texto = normalizar_unicode(texto)
+    if not texto.isascii():
+        return _truncar_unicode(texto, limite)
+    if "\033" not in texto:
+        texto = texto[:limite]
+        return texto, len(texto)
+    largura = len(ANSI_ESCAPE_RE.sub("", texto))
+    if largura <= limite:
+        return texto, largura
+    return _truncar(texto, limite)
+
+
+def truncar_visual(texto: str, limite: int) -> str:
+    """Trunca texto considerando largura visual e sequências ANSI."""
+    return _truncar_rapido(texto, limite)[0]
 
 
 def ajustar_visual(texto: str, largura: int, alinhamento: str = "esquerda") -> str:
     """Ajusta texto para largura fixa usando largura visual real."""
-    texto_ajustado = truncar_visual(texto, largura)
-    faltante = max(0, largura - largura_visual(texto_ajustado))
+    texto_ajustado, ocupada = _truncar_rapido(texto, largura)
+    faltante = max(0, largura - ocupada)
 
     if alinhamento == "direita":
         return " " * faltante + texto_ajustado
@@ -202,12 +451,12 @@ def ajustar_visual(texto: str, largura: int, alinhamento: str = "esquerda") -> s
     return texto_ajustado + " " * faltante
 
 
-def formatar_moeda(valor: float) -> str:
+def formatar_moeda(valor: Dinheiro) -> str:
     """Formata valores monetários brasileiros com cor."""
-    valor_formatado = f"{abs(valor):,.2f}"
-    valor_formatado = valor_formatado.replace(",", "X").replace(".", ",").replace("X", ".")
-    cor = C_SUCESSO if valor >= 0 else C_ERRO
-    return f"{cor}R$ {valor_formatado}{Cores.RESET}"
+    reais, centavos = divmod(abs(valor.centavos), 100)
+    inteiro = str(reais) if reais < 1000 else f"{reais:,}".replace(",", ".")
+    cor = C_SUCESSO if valor.centavos >= 0 else C_ERRO
+    return f"{cor}R$ {inteiro},{centavos:02d}{Cores.RESET}"
 
 
 def limitar_texto(texto: str, limite: int) -> str:
@@ -286,6 +535,7 @@ def barra_progresso(valor: float, maximo: float, largura: int = 20,
 def animacao_carregamento(texto: str = "Carregando", duracao: float = 0.5):
     """Mostra animação de carregamento."""
     import time
+    TELA.enviar()  # o spinner escreve direto, depois do que já foi composto
     simbolos = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
     inicio = time.time()
     i = 0
@@ -296,38 +546,237 @@ def animacao_carregamento(texto: str = "Carregando", duracao: float = 0.5):
     print(f"\r{' ' * (len(texto) + 10)}\r", end="")
 
 
+def criar_progresso_carga(texto: str) -> Callable[[int, int], None]:
+    """Cria callback que mostra uma barra de progresso de leitura de arquivo."""
+    ultimo = [-1]
+    
+    def progresso(lidos: int, total: int):
+        if total <= CARGA_BLOCO:
+            return
+        percentual = lidos * 100 // total
+        if percentual == ultimo[0]:
+            return
+        ultimo[0] = percentual
+        fim = "\n" if lidos >= total else ""
+        print(f"\r{C_PRIMARIA}⏳{Cores.RESET} {texto} {barra_progresso(lidos, total, 30)} "
+              f"{percentual:>3}%", end=fim, flush=True)
+    
+    return progresso
+
+
 def titulo_gradiente(texto: str) -> str:
     """Cria título com gradiente dourado."""
     return Cores.gradient(texto, (255, 215, 0), (255, 140, 0))
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# TERMINAL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class Tela:
+    """Saída da interface interativa, composta em memória e escrita de uma vez.
+    
+    Dentro de sessao(), escrever() só acumula linhas; elas vão para o
+    terminal numa única escrita quando o programa pede uma entrada (ler)
+    ou a sessão termina. limpar() começa um quadro novo: em vez de rodar
+    `clear` num subprocesso, o quadro é comparado com o que está na tela
+    e só as linhas que mudaram são reescritas, posicionando o cursor com
+    ANSI. Se a tela rolou ou o quadro não cabe nela, ele é redesenhado
+    inteiro (ainda numa única escrita). Fora de um terminal não há
+    códigos de controle: as linhas são só anexadas.
+    """
+    
+    def __init__(self):
+        self._ativa = False
+        self._pendentes: List[str] = []
+        self._quadro_novo = False
+        # Linhas visíveis a partir do topo (None = conteúdo desconhecido,
+        # ex.: o que o usuário digitou); None no lugar da lista = tela incerta
+        self._na_tela: Optional[List[Optional[str]]] = None
+        self._colunas = 0
+        self._rascunho = -1  # linhas do rascunho na tela (-1 = nenhum)
+    
+    @contextmanager
+    def sessao(self) -> Iterator["Tela"]:
+        self._ativa = True
+        try:
+            yield self
+        finally:
+            self.enviar()
+            self._ativa = False
+            self._na_tela = None
+    
+    def escrever(self, texto: str = ""):
+        """Equivalente a print(texto) que respeita o quadro em composição."""
+        if not self._ativa:
+            print(texto)
+            return
+        self._pendentes.extend(str(texto).split("\n"))
+    
+    def limpar(self):
+        if not self._ativa:
+            if sys.stdout.isatty():
+                sys.stdout.write("\033[H\033[2J")
+                sys.stdout.flush()
+            return
+        self._pendentes = []  # nunca seriam vistas: a tela seria limpa em seguida
+        self._quadro_novo = True
+    
+    def ler(self, prompt: str) -> str:
+        """input() com o prompt escrito junto das linhas pendentes."""
+        *linhas, ultima = prompt.split("\n")
+        self._pendentes.extend(linhas)
+        self.enviar(ultima)
+        try:
+            return input()
+        finally:
+            if self._na_tela is not None:
+                self._na_tela.append(None)
+    
+    def enviar(self, sufixo: str = ""):
+        """Escreve as linhas pendentes, mais um texto sem quebra, numa só chamada."""
+        linhas, self._pendentes = self._pendentes, []
+        if self._quadro_novo:
+            self._quadro_novo = False
+            texto = self._desenhar(linhas)
+        else:
+            texto = "".join(linha + "\n" for linha in linhas)
+            if self._na_tela is not None:
+                if any(largura_visual(linha) > self._colunas for linha in linhas):
+                    self._na_tela = None  # linha quebrada: a contagem de linhas se perde
+                else:
+                    self._na_tela.extend(linhas)
+        if texto or sufixo:
+            sys.stdout.write(texto + sufixo)
+            sys.stdout.flush()
+    
+    def teclas_disponiveis(self) -> bool:
+        """Se dá para ler tecla a tecla: sessão ativa com entrada e saída num terminal."""
+        return self._ativa and sys.stdin.isatty() and sys.stdout.isatty()
+    
+    @contextmanager
+    def modo_teclas(self) -> Iterator[Callable[[], str]]:
+        """Terminal sem eco nem espera pelo ENTER; entrega a função que lê a próxima tecla.
+        
+        Teclas especiais chegam como as constantes TECLA_* (nunca
+        imprimíveis); texto colado chega de uma vez. Ao sair, o rascunho em
+        andamento é encerrado e o terminal volta ao modo anterior.
+        """
+        try:
+            import termios
+            import tty
+        except ImportError:  # Windows
+            import msvcrt
+            try:
+                yield lambda: _tecla_windows(msvcrt)
+            finally:
+                self.encerrar_rascunho()
+            return
+        fd = sys.stdin.fileno()
+        modo = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            yield lambda: _tecla_posix(fd)
+        finally:
+            self.encerrar_rascunho()
+            termios.tcsetattr(fd, termios.TCSADRAIN, modo)
+    
+    def rascunho(self, linhas: List[str], cursor: str = ""):
+        """Troca o bloco escrito pela chamada anterior por `linhas`, com `cursor`
+        (ex.: prompt e texto digitado) na linha seguinte, numa só escrita.
+        
+        O bloco é reescrito subindo o cursor relativamente, então o que está
+        acima dele fica intacto mesmo que a tela tenha rolado.
+        """
+        pendentes, self._pendentes = self._pendentes, []
+        partes = ["".join(linha + "\n" for linha in pendentes)]
+        if self._quadro_novo:
+            self._quadro_novo = False
+            partes = [self._desenhar(pendentes)]
+        if self._rascunho > 0:
+            partes.append(f"\r\033[{self._rascunho}A")
+        partes.append("\r\033[J" + "".join(linha + "\n" for linha in linhas) + cursor)
+        self._rascunho = len(linhas)
+        self._na_tela = None  # o bloco muda fora do controle do quadro
+        sys.stdout.write("".join(partes))
+        sys.stdout.flush()
+    
+    def encerrar_rascunho(self):
+        """Fixa o último rascunho na tela; a saída seguinte começa abaixo dele."""
+        if self._rascunho >= 0:
+            self._rascunho = -1
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+    
+    def _desenhar(self, linhas: List[str]) -> str:
+        if not sys.stdout.isatty():
+            return "".join(linha + "\n" for linha in linhas)
+        try:
+            self._colunas, altura = os.get_terminal_size(sys.stdout.fileno())
+        except (OSError, ValueError):
+            self._colunas, altura = 80, 24
+        anterior = self._na_tela
+        cabe = len(linhas) < altura and all(largura_visual(l) <= self._colunas for l in linhas)
+        self._na_tela = list(linhas) if cabe else None
+        if anterior is None or len(anterior) >= altura or not cabe:
+            return "\033[H\033[2J" + "".join(linha + "\n" for linha in linhas)
+        partes = []
+        for i, linha in enumerate(linhas):
+            if i >= len(anterior) or anterior[i] != linha:
+                partes.append(f"\033[{i + 1};1H{linha}\033[K")
+        partes.append(f"\033[{len(linhas) + 1};1H\033[J")
+        return "".join(partes)
+
+
+TECLA_ENTER, TECLA_ESC, TECLA_APAGAR, TECLA_CIMA, TECLA_BAIXO = "\n", "\x1b", "\x7f", "\x1b[A", "\x1b[B"
+_TECLAS = {"\r": TECLA_ENTER, "\x08": TECLA_APAGAR, "\x1bOA": TECLA_CIMA, "\x1bOB": TECLA_BAIXO}
+
+
+def _tecla_posix(fd: int) -> str:
+    # Uma leitura traz a sequência inteira de uma seta ou de um texto colado
+    dados = os.read(fd, 64).decode("utf-8", "ignore")
+    return _TECLAS.get(dados, dados)
+
+
+def _tecla_windows(msvcrt) -> str:
+    tecla = msvcrt.getwch()
+    if tecla in ("\x00", "\xe0"):
+        return {"H": TECLA_CIMA, "P": TECLA_BAIXO}.get(msvcrt.getwch(), "")
+    if tecla == "\x03":
+        raise KeyboardInterrupt
+    return _TECLAS.get(tecla, tecla)
+
+
+TELA = Tela()
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # MENSAGENS ESTILIZADAS
 # ═══════════════════════════════════════════════════════════════════════════════
 
 def msg_sucesso(mensagem: str, icone: str = "✅"):
     """Exibe mensagem de sucesso."""
-    print(f"{C_SUCESSO}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
+    TELA.escrever(f"{C_SUCESSO}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
 
 
 def msg_erro(mensagem: str, icone: str = "❌"):
     """Exibe mensagem de erro."""
-    print(f"{C_ERRO}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
+    TELA.escrever(f"{C_ERRO}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
 
 
 def msg_aviso(mensagem: str, icone: str = "⚠"):
     """Exibe mensagem de aviso."""
-    print(f"{C_AVISO}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
+    TELA.escrever(f"{C_AVISO}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
 
 
 def msg_info(mensagem: str, icone: str = "ℹ"):
     """Exibe mensagem informativa."""
-    print(f"{C_INFO}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
+    TELA.escrever(f"{C_INFO}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
 
 
 def msg_destaque(mensagem: str, icone: str = "👉"):
     """Exibe mensagem em destaque."""
-    print(f"{C_DESTAQUE}{Cores.BOLD}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
+    TELA.escrever(f"{C_DESTAQUE}{Cores.BOLD}{normalizar_unicode(icone)} {mensagem}{Cores.RESET}")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -336,16 +785,15 @@ def msg_destaque(mensagem: str, icone: str = "👉"):
 
 def input_colorido(mensagem: str, cor: str = C_PRIMARIA, icone: str = "→") -> str:
     """Input com cor."""
-    return input(f"{cor}{icone}{Cores.RESET} {mensagem} ").strip()
+    return TELA.ler(f"{cor}{icone}{Cores.RESET} {mensagem} ").strip()
 
 
-def input_valor(mensagem: str) -> Optional[float]:
+def input_valor(mensagem: str) -> Optional[Dinheiro]:
     """Input monetário com validação."""
     entrada = input_colorido(mensagem, C_SUCESSO, "💵")
-    entrada = entrada.replace(",", ".")
     try:
-        valor = float(entrada)
-        if valor <= 0:
+        valor = Dinheiro.de_reais(entrada)
+        if valor.centavos <= 0:
             msg_erro("O valor deve ser maior que zero!")
             return None
         return valor
@@ -362,7 +810,7 @@ def input_cpf() -> str:
 
 def confirmar(mensagem: str) -> bool:
     """Confirmação com estilo."""
-    resposta = input(f"{C_AVISO}❓ {mensagem} (s/n):{Cores.RESET} ").strip().lower()
+    resposta = TELA.ler(f"{C_AVISO}❓ {mensagem} (s/n):{Cores.RESET} ").strip().lower()
     return resposta in ('s', 'sim', 'yes', 'y')
 
 
@@ -384,6 +832,34 @@ def formatar_cpf(cpf: str) -> str:
     return f"{C_PRIMARIA}{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}{Cores.RESET}"
 
 
+EPOCA = datetime(1970, 1, 1)
+SEGUNDOS_DIA = 86400
+FORMATO_DATA_HORA = "%d/%m/%Y %H:%M:%S"
+
+
+def data_para_epoch(data: str) -> int:
+    """Converte 'dd/mm/aaaa HH:MM:SS' em segundos desde 1970 (hora local ingênua)."""
+    instante = datetime(int(data[6:10]), int(data[3:5]), int(data[0:2]),
+                        int(data[11:13]), int(data[14:16]), int(data[17:19]))
+    return int((instante - EPOCA).total_seconds())
+
+
+def epoch_agora() -> int:
+    return int((datetime.now() - EPOCA).total_seconds())
+
+
+def epoch_para_data(epoch: int) -> str:
+    """Inverso de data_para_epoch."""
+    return (EPOCA + timedelta(seconds=epoch)).strftime(FORMATO_DATA_HORA)
+
+
+def dia_para_epoch(data: str, fim_do_dia: bool = False) -> int:
+    """Epoch do início (ou do último segundo) do dia 'dd/mm/aaaa' ou 'dd-mm-aaaa'."""
+    dia = datetime.strptime(data.strip().replace("-", "/"), "%d/%m/%Y")
+    epoch = int((dia - EPOCA).total_seconds())
+    return epoch + SEGUNDOS_DIA - 1 if fim_do_dia else epoch
+
+
 def validar_data(data: str) -> bool:
     """Valida data dd-mm-aaaa."""
     try:
@@ -431,7 +907,7 @@ class Endereco:
 class Cliente:
     def __init__(self, endereco: Endereco):
         self._endereco = endereco
-        self._contas: List["Conta"] = []
+        self._contas: Dict[int, "Conta"] = {}
     
     @property
     def endereco(self) -> Endereco:
@@ -439,13 +915,20 @@ class Cliente:
     
     @property
     def contas(self) -> List["Conta"]:
-        return self._contas
+        return list(self._contas.values())
     
     def adicionar_conta(self, conta: "Conta"):
-        self._contas.append(conta)
+        self._contas[conta.numero] = conta
+    
+    def remover_conta(self, conta: "Conta"):
+        if self.possui_conta(conta):
+            del self._contas[conta.numero]
+    
+    def possui_conta(self, conta: "Conta") -> bool:
+        return self._contas.get(conta.numero) is conta
     
     def realizar_transacao(self, conta: "Conta", transacao: "Transacao") -> bool:
-        if conta not in self._contas:
+        if not self.possui_conta(conta):
             msg_erro("Esta conta não pertence a este cliente!")
             return False
         return transacao.registrar(conta)
@@ -489,50 +972,458 @@ class PessoaFisica(Cliente):
         )
 
 
+# Códigos de um byte para os tipos de transação gravados no histórico.
+# Tipos desconhecidos (dados antigos) recebem o próximo código livre.
+TIPOS_TRANSACAO: List[str] = ["Deposito", "Saque", "Transferencia"]
+_CODIGOS_TIPO: Dict[str, int] = {tipo: i for i, tipo in enumerate(TIPOS_TRANSACAO)}
+
+
+def codigo_tipo(tipo: str) -> int:
+    codigo = _CODIGOS_TIPO.get(tipo)
+    if codigo is None:
+        if len(TIPOS_TRANSACAO) > 255:
+            raise ValueError(f"Tipos de transação demais para registrar '{tipo}'")
+        codigo = len(TIPOS_TRANSACAO)
+        TIPOS_TRANSACAO.append(tipo)
+        _CODIGOS_TIPO[tipo] = codigo
+    return codigo
+
+
 @dataclass
 class RegistroTransacao:
     tipo: str
-    valor: float
+    valor: Dinheiro
     data: str
     
     def to_dict(self) -> dict:
-        return {"tipo": self.tipo, "valor": self.valor, "data": self.data}
+        return {"tipo": self.tipo, "valor_centavos": self.valor.centavos, "data": self.data}
     
     @classmethod
     def from_dict(cls, data: dict) -> "RegistroTransacao":
-        return cls(**data)
+        return cls(data["tipo"], Dinheiro.do_dict(data, "valor"), data["data"])
+
+
+class VisaoHistorico(SequenceABC):
+    """Visão somente leitura de um trecho do histórico, sem cópia.
+    
+    Os RegistroTransacao são criados sob demanda a cada acesso. Com
+    `selecao`, `indices` aponta para posições dessa lista de índices do
+    histórico (ex.: as transações de um tipo) em vez de direto para ele;
+    fatiar continua custando O(1).
+    """
+    
+    def __init__(self, historico: "Historico", indices: range,
+                 selecao: Optional[Sequence[int]] = None):
+        self._historico = historico
+        self._indices = indices
+        self._selecao = selecao
+    
+    def __len__(self) -> int:
+        return len(self._indices)
+    
+    def _absolutos(self, indices: Iterable[int]) -> Iterable[int]:
+        if self._selecao is None:
+            return indices
+        return map(self._selecao.__getitem__, indices)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return VisaoHistorico(self._historico, self._indices[i], self._selecao)
+        i = self._indices[i]
+        return self._historico.registro(i if self._selecao is None else self._selecao[i])
+    
+    def __iter__(self) -> Iterator[RegistroTransacao]:
+        registro = self._historico.registro
+        for i in self._absolutos(self._indices):
+            yield registro(i)
+    
+    def __reversed__(self) -> Iterator[RegistroTransacao]:
+        registro = self._historico.registro
+        for i in self._absolutos(reversed(self._indices)):
+            yield registro(i)
+    
+    def paginas(self, tamanho: int) -> int:
+        return max(1, -(-len(self) // tamanho))
+    
+    def pagina(self, numero: int, tamanho: int) -> "VisaoHistorico":
+        """Página `numero` (1 = mais antiga) com até `tamanho` transações."""
+        inicio = (numero - 1) * tamanho
+        return self[inicio:inicio + tamanho]
+
+
+class FonteHistorico(ABC):
+    """Local de armazenamento de um histórico ainda não materializado."""
+    
+    @abstractmethod
+    def carregar(self) -> List[dict]:
+        """Lê os registros persistidos (formato de RegistroTransacao.to_dict)."""
+    
+    def carregar_historico(self) -> "Historico":
+        """Os registros persistidos já em colunas; fontes colunares evitam os dicts."""
+        return Historico.from_dict(self.carregar())
+
+
+class CacheHistoricos:
+    """LRU dos históricos materializados sob demanda, limitado em bytes.
+    
+    O tamanho é estimado pelas colunas (17 bytes por transação); ao passar
+    do orçamento, os históricos menos usados devolvem a parte persistida e
+    voltam a ser lidos da fonte no próximo acesso.
+    
+    Compartilhado entre contas (e threads): o descarte só acontece se a
+    trava do histórico estiver livre; os ocupados ficam para a próxima vez.
+    `limite_historicos` limita também a quantidade (ex.: históricos
+    mapeados, cada um segurando um descritor de arquivo).
+    """
+    
+    def __init__(self, limite_bytes: int = HISTORICO_MEMORIA_MAX,
+                 limite_historicos: Optional[int] = None):
+        self._limite = limite_bytes
+        self._limite_historicos = limite_historicos
+        self._uso = 0
+        self._historicos: "OrderedDict[Historico, int]" = OrderedDict()
+        self._trava = threading.Lock()
+    
+    @property
+    def uso(self) -> int:
+        return self._uso
+    
+    def carregado(self, historico: "Historico"):
+        with self._trava:
+            tamanho = historico.memoria()
+            self._historicos[historico] = tamanho
+            self._uso += tamanho
+            ocupados = []
+            maximo = self._limite_historicos or sys.maxsize
+            while len(self._historicos) > 1 and (self._uso > self._limite or
+                                                 len(self._historicos) + len(ocupados) > maximo):
+                antigo, tamanho_antigo = self._historicos.popitem(last=False)
+                if antigo is historico or not antigo._trava.acquire(blocking=False):
+                    ocupados.append((antigo, tamanho_antigo))
+                    continue
+                try:
+                    antigo._descarregar()
+                finally:
+                    antigo._trava.release()
+                self._uso -= tamanho_antigo
+            for antigo, tamanho_antigo in reversed(ocupados):
+                self._historicos[antigo] = tamanho_antigo
+                self._historicos.move_to_end(antigo, last=False)
+    
+    def usado(self, historico: "Historico"):
+        with self._trava:
+            if historico in self._historicos:
+                self._historicos.move_to_end(historico)
+    
+    def esquecer(self, historico: "Historico"):
+        with self._trava:
+            self._uso -= self._historicos.pop(historico, 0)
 
 
 class Historico:
+    """Histórico colunar: instante (epoch), valor em centavos e código do tipo.
+    
+    Cada transação ocupa 17 bytes nos arrays em vez de um objeto com duas
+    strings; RegistroTransacao só é montado quando alguém lê o registro.
+    
+    Um histórico criado com sob_demanda() conhece apenas o tamanho e o
+    último instante do que está persistido na fonte; as colunas guardam
+    só os registros anexados depois da carga até o primeiro acesso à parte
+    persistida, que é então lida da fonte (e pode ser descartada de novo
+    pelo CacheHistoricos).
+    
+    A trava protege as colunas contra a carga/descarte feitos por outra
+    thread entre a tradução do índice e a leitura.
+    """
+    
     def __init__(self):
-        self._transacoes: List[RegistroTransacao] = []
+        self._trava = threading.RLock()
+        self._epochs = array('q')
+        self._centavos = array('q')
+        self._tipos = bytearray()
+        self._fonte: Optional[FonteHistorico] = None   # parte persistida ainda não lida
+        self._origem: Optional[FonteHistorico] = None  # de onde recarregar após descarte
+        self._n_fonte = 0
+        self._ultimo_epoch_fonte = 0
+        self._cache: Optional[CacheHistoricos] = None
+        # Índices (lógicos) das transações de cada tipo, montado na primeira
+        # consulta por tipo e estendido a cada inclusão
+        self._por_tipo: Optional[Dict[int, array]] = None
+    
+    @classmethod
+    def sob_demanda(cls, fonte: FonteHistorico, tamanho: int, ultimo_epoch: int,
+                    cache: Optional[CacheHistoricos] = None) -> "Historico":
+        h = cls()
+        h._fonte = h._origem = fonte
+        h._n_fonte = tamanho
+        h._ultimo_epoch_fonte = ultimo_epoch
+        h._cache = cache
+        return h
+    
+    def reapontar(self, fonte: FonteHistorico, tamanho: int, ultimo_epoch: int,
+                  cache: Optional[CacheHistoricos] = None):
+        """Declara que os `tamanho` primeiros registros estão persistidos em `fonte`.
+        
+        Registros anexados depois de `tamanho` (gravação em segundo plano)
+        continuam nas colunas.
+        """
+        with self._trava:
+            persistidos = tamanho - (self._n_fonte if self._fonte is not None else 0)
+            if persistidos < 0:
+                return  # a fonte atual já cobre mais registros que a nova
+            if self._cache is not None:
+                self._cache.esquecer(self)
+            self._origem = fonte
+            self._n_fonte = tamanho
+            self._ultimo_epoch_fonte = ultimo_epoch
+            self._cache = cache
+            if self._fonte is None:
+                if cache is not None:
+                    cache.carregado(self)
+            else:
+                # Nada materializado: a nova fonte já inclui parte dos registros anexados
+                self._fonte = fonte
+                del self._epochs[:persistidos], self._centavos[:persistidos], self._tipos[:persistidos]
+                self._por_tipo = None
     
     @property
-    def transacoes(self) -> List[RegistroTransacao]:
-        return self._transacoes.copy()
+    def carregado(self) -> bool:
+        return self._fonte is None
     
-    def adicionar(self, transacao: "Transacao"):
-        registro = RegistroTransacao(
-            tipo=transacao.__class__.__name__,
-            valor=transacao.valor,
-            data=datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    def memoria(self) -> int:
+        indice = sum(map(len, self._por_tipo.values())) * 8 if self._por_tipo else 0
+        return len(self._tipos) * 17 + indice
+    
+    def _carregar(self):
+        base = self._fonte.carregar_historico()
+        base._epochs.extend(self._epochs)
+        base._centavos.extend(self._centavos)
+        base._tipos.extend(self._tipos)
+        self._epochs, self._centavos, self._tipos = base._epochs, base._centavos, base._tipos
+        self._fonte = None
+        if self._cache is not None:
+            self._cache.carregado(self)
+    
+    def _descarregar(self):
+        """Descarta a parte persistida, mantendo os registros anexados depois."""
+        if self._fonte is not None or self._origem is None:
+            return
+        del self._epochs[:self._n_fonte]
+        del self._centavos[:self._n_fonte]
+        del self._tipos[:self._n_fonte]
+        self._por_tipo = None
+        self._fonte = self._origem
+    
+    def _pos(self, i: int) -> int:
+        """Traduz índice lógico em posição nas colunas, materializando se preciso."""
+        if i < 0:
+            i += len(self)
+        if self._fonte is not None:
+            if i >= self._n_fonte:
+                return i - self._n_fonte
+            self._carregar()
+        elif self._cache is not None:
+            self._cache.usado(self)
+        return i
+    
+    @property
+    def transacoes(self) -> VisaoHistorico:
+        return VisaoHistorico(self, range(len(self)))
+    
+    def __len__(self) -> int:
+        with self._trava:
+            if self._fonte is not None:
+                return self._n_fonte + len(self._tipos)
+            return len(self._tipos)
+    
+    def __iter__(self) -> Iterator[RegistroTransacao]:
+        return iter(self.transacoes)
+    
+    def __reversed__(self) -> Iterator[RegistroTransacao]:
+        return reversed(self.transacoes)
+    
+    def registro(self, i: int) -> RegistroTransacao:
+        with self._trava:
+            i = self._pos(i)
+            tipo, centavos, epoch = self._tipos[i], self._centavos[i], self._epochs[i]
+        return RegistroTransacao(
+            tipo=TIPOS_TRANSACAO[tipo],
+            valor=Dinheiro(centavos),
+            data=epoch_para_data(epoch)
         )
-        self._transacoes.append(registro)
+    
+    def epoch(self, i: int) -> int:
+        with self._trava:
+            i = self._pos(i)
+            return self._epochs[i]
+    
+    def centavos(self, i: int) -> int:
+        with self._trava:
+            i = self._pos(i)
+            return self._centavos[i]
+    
+    def tipo(self, i: int) -> str:
+        with self._trava:
+            i = self._pos(i)
+            return TIPOS_TRANSACAO[self._tipos[i]]
+    
+    def ultimo_epoch(self) -> int:
+        """Instante do último registro sem materializar a parte persistida."""
+        with self._trava:
+            if self._fonte is not None and not self._tipos:
+                return self._ultimo_epoch_fonte
+            return self.epoch(-1)
+    
+    def ultimo(self) -> Optional[RegistroTransacao]:
+        with self._trava:
+            return self.registro(-1) if len(self) else None
+    
+    def _anexar(self, epoch: int, centavos: int, tipo: str):
+        with self._trava:
+            codigo = codigo_tipo(tipo)
+            posicoes = None if self._por_tipo is None else self._por_tipo.get(codigo)
+            if posicoes is not None:
+                posicoes.append(len(self))
+            self._epochs.append(epoch)
+            self._centavos.append(centavos)
+            self._tipos.append(codigo)
+    
+    def anexar(self, registro: RegistroTransacao):
+        self._anexar(data_para_epoch(registro.data), registro.valor.centavos, registro.tipo)
+    
+    def adicionar(self, transacao: "Transacao"):
+        self._anexar(epoch_agora(), transacao.valor.centavos, transacao.__class__.__name__)
+    
+    def periodo(self, desde: Optional[int] = None, ate: Optional[int] = None) -> range:
+        """Índices das transações com desde <= instante <= ate (epochs).
+        
+        Busca binária nas épocas, que ficam em ordem de inclusão (cronológica).
+        """
+        with self._trava:
+            n = len(self)
+            if (desde is None and ate is None) or not n:
+                return range(n)
+            self._pos(0)  # materializado, posição nas colunas = índice
+            inicio = 0 if desde is None else bisect_left(self._epochs, desde)
+            fim = n if ate is None else bisect_right(self._epochs, ate)
+            return range(inicio, max(inicio, fim))
+    
+    def _indice_tipo(self, codigo: int) -> array:
+        """Posições das transações do tipo, montadas na primeira consulta dele."""
+        if self._por_tipo is None:
+            self._por_tipo = {}
+        posicoes = self._por_tipo.get(codigo)
+        if posicoes is None:
+            if len(self):
+                self._pos(0)
+            posicoes = array('q', compress(range(len(self._tipos)), map(codigo.__eq__, self._tipos)))
+            self._por_tipo[codigo] = posicoes
+        return posicoes
+    
+    def filtrar(self, desde: Optional[int] = None, ate: Optional[int] = None,
+                tipo: Optional[str] = None) -> VisaoHistorico:
+        """Transações do período [desde, ate] e do tipo pedido, sem varrer o histórico.
+        
+        O período sai de periodo() e o tipo de um índice de posições por
+        tipo; a visão é montada em O(log n) e cada página custa o seu tamanho.
+        """
+        with self._trava:
+            faixa = self.periodo(desde, ate)
+            if tipo is None:
+                return VisaoHistorico(self, faixa)
+            codigo = _CODIGOS_TIPO.get(tipo)
+            if codigo is None:
+                return VisaoHistorico(self, range(0))
+            posicoes = self._indice_tipo(codigo)
+            return VisaoHistorico(self, range(bisect_left(posicoes, faixa.start),
+                                              bisect_left(posicoes, faixa.stop)), posicoes)
+    
+    def copiar_colunas(self, epochs: array, centavos: array, tipos: bytearray):
+        """Estende as colunas dadas com o histórico inteiro (materializa se preciso)."""
+        with self._trava:
+            if len(self):
+                self._pos(0)
+            epochs.extend(self._epochs)
+            centavos.extend(self._centavos)
+            tipos.extend(self._tipos)
     
     def to_dict(self) -> List[dict]:
-        return [t.to_dict() for t in self._transacoes]
+        with self._trava:
+            if self._fonte is not None:
+                # Lê a parte persistida sem materializá-la nem mexer no cache
+                anexados = range(self._n_fonte, len(self))
+                return self._fonte.carregar() + [self.registro(i).to_dict() for i in anexados]
+            return [t.to_dict() for t in self.transacoes]
     
     @classmethod
     def from_dict(cls, data: List[dict]) -> "Historico":
         h = cls()
-        h._transacoes = [RegistroTransacao.from_dict(t) for t in data]
+        for t in data:
+            centavos = t.get("valor_centavos")
+            if centavos is None:  # formato antigo: valor em reais (float)
+                centavos = Dinheiro.de_reais(t["valor"]).centavos
+            h._anexar(data_para_epoch(t["data"]), centavos, t["tipo"])
         return h
 
 
+class ObservadorContas:
+    """Recebe eventos das contas do banco (movimentos confirmados,
+    inclusão, remoção e mudança de status). Métodos padrão não fazem nada."""
+    
+    def movimento(self, conta: "Conta", registro: RegistroTransacao, delta: Dinheiro):
+        pass
+    
+    def conta_adicionada(self, conta: "Conta"):
+        pass
+    
+    def conta_removida(self, conta: "Conta"):
+        pass
+    
+    def status_alterado(self, conta: "Conta"):
+        pass
+
+
+class Observadores(ObservadorContas):
+    """Repassa cada evento a uma lista de observadores.
+    
+    Eventos de contas diferentes chegam de threads diferentes; a trava
+    serializa o repasse, e quem lê o estado dos observadores (ex.: o feed
+    de recentes) deve segurá-la também.
+    """
+    
+    def __init__(self, *observadores: ObservadorContas):
+        self._observadores = list(observadores)
+        self.trava = threading.RLock()
+    
+    def adicionar(self, observador: ObservadorContas):
+        with self.trava:
+            self._observadores.append(observador)
+    
+    def movimento(self, conta, registro, delta):
+        with self.trava:
+            for o in self._observadores:
+                o.movimento(conta, registro, delta)
+    
+    def conta_adicionada(self, conta):
+        with self.trava:
+            for o in self._observadores:
+                o.conta_adicionada(conta)
+    
+    def conta_removida(self, conta):
+        with self.trava:
+            for o in self._observadores:
+                o.conta_removida(conta)
+    
+    def status_alterado(self, conta):
+        with self.trava:
+            for o in self._observadores:
+                o.status_alterado(conta)
+
+
 class Transacao(ABC):
     @property
     @abstractmethod
-    def valor(self) -> float:
+    def valor(self) -> Dinheiro:
         pass
     
     @abstractmethod
@@ -541,70 +1432,130 @@ class Transacao(ABC):
 
 
 class Saque(Transacao):
-    def __init__(self, valor: float):
+    def __init__(self, valor: Dinheiro):
         self._valor = valor
     
     @property
-    def valor(self) -> float:
+    def valor(self) -> Dinheiro:
         return self._valor
     
     def registrar(self, conta: "Conta") -> bool:
-        if conta.sacar(self._valor):
-            conta.historico.adicionar(self)
-            return True
-        return False
+        with conta.trava:
+            if conta.sacar(self._valor):
+                conta.confirmar(self, -self._valor)
+                return True
+            return False
 
 
 class Deposito(Transacao):
-    def __init__(self, valor: float):
+    def __init__(self, valor: Dinheiro):
         self._valor = valor
     
     @property
-    def valor(self) -> float:
+    def valor(self) -> Dinheiro:
         return self._valor
     
     def registrar(self, conta: "Conta") -> bool:
-        if conta.depositar(self._valor):
-            conta.historico.adicionar(self)
-            return True
-        return False
+        with conta.trava:
+            if conta.depositar(self._valor):
+                conta.confirmar(self, self._valor)
+                return True
+            return False
 
 
 class Transferencia(Transacao):
-    def __init__(self, valor: float, conta_destino: "Conta"):
+    def __init__(self, valor: Dinheiro, conta_destino: Optional["Conta"]):
+        # conta_destino é None quando o destino vive em outra partição
         self._valor = valor
         self._conta_destino = conta_destino
     
     @property
-    def valor(self) -> float:
+    def valor(self) -> Dinheiro:
         return self._valor
     
     def registrar(self, conta_origem: "Conta") -> bool:
-        if conta_origem.sacar(self._valor):
-            if self._conta_destino.depositar(self._valor):
-                conta_origem.historico.adicionar(self)
-                self._conta_destino.historico.adicionar(Deposito(self._valor))
-                return True
-            conta_origem.depositar(self._valor)
-        return False
+        # Com as duas travas, débito, crédito e estorno não são vistos pela metade
+        with travar_contas(conta_origem, self._conta_destino):
+            if conta_origem.sacar(self._valor):
+                if self._conta_destino.depositar(self._valor):
+                    conta_origem.confirmar(self, -self._valor)
+                    self._conta_destino.confirmar(Deposito(self._valor), self._valor)
+                    return True
+                conta_origem._saldo += self._valor  # estorno sem revalidar
+            return False
+
+
+class ContadorDiario:
+    """Quantidade e valor (centavos) de operações no dia corrente.
+    
+    Guarda só o dia mais recente visto; um registro de outro dia
+    reinicia a contagem. Consultas e atualizações são O(1).
+    """
+    __slots__ = ("_dia", "_quantidade", "_centavos")
+    
+    def __init__(self):
+        self._dia = -1
+        self._quantidade = 0
+        self._centavos = 0
+    
+    def registrar(self, dia: int, centavos: int):
+        if dia != self._dia:
+            self._dia, self._quantidade, self._centavos = dia, 0, 0
+        self._quantidade += 1
+        self._centavos += centavos
+    
+    def quantidade(self, dia: int) -> int:
+        return self._quantidade if dia == self._dia else 0
+    
+    def centavos(self, dia: int) -> int:
+        return self._centavos if dia == self._dia else 0
+    
+    @classmethod
+    def do_historico(cls, historico: Historico, tipo: str) -> "ContadorDiario":
+        """Reconstrói a contagem de hoje lendo o histórico de trás para frente."""
+        contador = cls()
+        hoje = epoch_agora() // SEGUNDOS_DIA
+        contador._dia = hoje
+        # Último registro de outro dia: nada a contar, e um histórico sob
+        # demanda continua sem ser lido
+        if not len(historico) or historico.ultimo_epoch() // SEGUNDOS_DIA != hoje:
+            return contador
+        for i in range(len(historico) - 1, -1, -1):
+            if historico.epoch(i) // SEGUNDOS_DIA != hoje:
+                break
+            if historico.tipo(i) == tipo:
+                contador._quantidade += 1
+                contador._centavos += historico.centavos(i)
+        return contador
 
 
 class Conta:
     _contador = 0
+    _trava_contador = threading.Lock()
     AGENCIA = "0001"
     
     def __init__(self, cliente: Cliente, numero: Optional[int] = None):
-        Conta._contador += 1
-        self._numero = numero or Conta._contador
+        with Conta._trava_contador:
+            Conta._contador += 1
+            self._numero = numero or Conta._contador
         self._agencia = self.AGENCIA
         self._cliente = cliente
-        self._saldo = 0.0
+        self._saldo = Dinheiro()
         self._historico = Historico()
         self._ativa = True
+        self._observador: Optional[ObservadorContas] = None
+        self._trava = threading.RLock()
+        self._reservado = Dinheiro()  # bloqueado por transferências em andamento (só memória)
     
     @classmethod
     def set_contador(cls, valor: int):
-        cls._contador = valor
+        with cls._trava_contador:
+            cls._contador = valor
+    
+    @property
+    def trava(self) -> threading.RLock:
+        """Trava da conta: validação, saldo e histórico mudam juntos sob ela."""
+        return self._trava
     
     @property
     def numero(self) -> int:
@@ -619,7 +1570,7 @@ class Conta:
         return self._cliente
     
     @property
-    def saldo(self) -> float:
+    def saldo(self) -> Dinheiro:
         return self._saldo
     
     @property
@@ -630,37 +1581,95 @@ class Conta:
     def ativa(self) -> bool:
         return self._ativa
     
-    def sacar(self, valor: float) -> bool:
+    @property
+    def observador(self) -> Optional[ObservadorContas]:
+        return self._observador
+    
+    @observador.setter
+    def observador(self, observador: Optional[ObservadorContas]):
+        self._observador = observador
+    
+    def definir_ativa(self, ativa: bool):
+        with self._trava:
+            if ativa == self._ativa:
+                return
+            self._ativa = ativa
+            if self._observador is not None:
+                self._observador.status_alterado(self)
+    
+    def confirmar(self, transacao: "Transacao", delta: Dinheiro):
+        """Registra no histórico uma transação já aplicada ao saldo."""
+        with self._trava:
+            self._historico.adicionar(transacao)
+            if self._observador is not None:
+                self._observador.movimento(self, self._historico.ultimo(), delta)
+    
+    def motivo_recusa_saque(self, valor: Dinheiro) -> Optional[str]:
+        """Mensagem explicando por que o saque seria recusado (None se permitido)."""
         if not self._ativa:
-            msg_erro("Conta inativa!")
-            return False
-        if valor <= 0:
-            msg_erro("Valor deve ser positivo!")
-            return False
-        if valor > self._saldo:
-            msg_erro(f"Saldo insuficiente! Disponível: {formatar_moeda(self._saldo)}")
-            return False
-        self._saldo -= valor
-        return True
+            return "Conta inativa!"
+        if valor.centavos <= 0:
+            return "Valor deve ser positivo!"
+        if valor > self._saldo - self._reservado:
+            return f"Saldo insuficiente! Disponível: {formatar_moeda(self._saldo - self._reservado)}"
+        return None
+    
+    def reservar(self, valor: Dinheiro) -> Optional[str]:
+        """Bloqueia `valor` para um débito futuro; devolve o motivo se recusado."""
+        with self._trava:
+            motivo = self.motivo_recusa_saque(valor)
+            if motivo is None:
+                self._reservado += valor
+            return motivo
+    
+    def liberar(self, valor: Dinheiro):
+        with self._trava:
+            self._reservado -= valor
+    
+    def efetivar_reserva(self, transacao: "Transacao"):
+        """Debita um valor reservado antes; as regras já foram checadas na reserva."""
+        with self._trava:
+            self._reservado -= transacao.valor
+            self._saldo -= transacao.valor
+            self.confirmar(transacao, -transacao.valor)
     
-    def depositar(self, valor: float) -> bool:
+    def motivo_recusa_deposito(self, valor: Dinheiro) -> Optional[str]:
         if not self._ativa:
-            msg_erro("Conta inativa!")
-            return False
-        if valor <= 0:
-            msg_erro("Valor deve ser positivo!")
-            return False
-        self._saldo += valor
-        return True
+            return "Conta inativa!"
+        if valor.centavos <= 0:
+            return "Valor deve ser positivo!"
+        return None
+    
+    def sacar(self, valor: Dinheiro) -> bool:
+        with self._trava:
+            motivo = self.motivo_recusa_saque(valor)
+            if not motivo:
+                self._saldo -= valor
+                return True
+        msg_erro(motivo)
+        return False
+    
+    def depositar(self, valor: Dinheiro) -> bool:
+        with self._trava:
+            motivo = self.motivo_recusa_deposito(valor)
+            if not motivo:
+                self._saldo += valor
+                return True
+        msg_erro(motivo)
+        return False
     
     def to_dict(self) -> dict:
+        # Histórico antes do saldo: lido sem a trava da conta (snapshot em
+        # segundo plano), o saldo pode estar à frente do histórico, nunca
+        # atrás, e o journal reaplica o que faltar
+        historico = self._historico.to_dict()
         return {
             "tipo": "corrente",
             "numero": self._numero,
             "agencia": self._agencia,
             "cpf_cliente": self._cliente.cpf if isinstance(self._cliente, PessoaFisica) else "",
-            "saldo": self._saldo,
-            "historico": self._historico.to_dict(),
+            "saldo_centavos": self._saldo.centavos,
+            "historico": historico,
             "ativa": self._ativa
         }
     
@@ -672,45 +1681,62 @@ class Conta:
             raise ValueError(f"Cliente {cpf} não encontrado")
         
         c = cls(cliente=cliente, numero=data["numero"])
-        c._saldo = data.get("saldo", 0)
+        c._saldo = Dinheiro.do_dict(data, "saldo")
         c._historico = Historico.from_dict(data.get("historico", []))
         c._ativa = data.get("ativa", True)
         return c
 
 
 class ContaCorrente(Conta):
-    LIMITE_PADRAO = 500.0
+    LIMITE_PADRAO = Dinheiro(500_00)
     LIMITE_SAQUES = 3
     
     def __init__(self, cliente: Cliente, numero: Optional[int] = None,
-                 limite: float = LIMITE_PADRAO, limite_saques: int = LIMITE_SAQUES):
+                 limite: Dinheiro = LIMITE_PADRAO, limite_saques: int = LIMITE_SAQUES):
         super().__init__(cliente, numero)
         self._limite = limite
         self._limite_saques = limite_saques
+        self._saques_dia: Optional[ContadorDiario] = None
     
     @property
-    def limite(self) -> float:
+    def limite(self) -> Dinheiro:
         return self._limite
     
+    @property
+    def limite_saques(self) -> int:
+        return self._limite_saques
+    
+    def _contador_saques(self) -> "ContadorDiario":
+        """Contador de saques do dia, montado no primeiro uso após a carga."""
+        if self._saques_dia is None:
+            self._saques_dia = ContadorDiario.do_historico(self._historico, "Saque")
+        return self._saques_dia
+    
     def saques_hoje(self) -> int:
-        hoje = datetime.now().strftime("%d/%m/%Y")
-        return len([t for t in self._historico.transacoes 
-                    if t.tipo == "Saque" and t.data.startswith(hoje)])
+        return self._contador_saques().quantidade(epoch_agora() // SEGUNDOS_DIA)
+    
+    def valor_sacado_hoje(self) -> Dinheiro:
+        return Dinheiro(self._contador_saques().centavos(epoch_agora() // SEGUNDOS_DIA))
     
-    def sacar(self, valor: float) -> bool:
+    def confirmar(self, transacao: "Transacao", delta: Dinheiro):
+        with self._trava:
+            super().confirmar(transacao, delta)
+            if isinstance(transacao, Saque) and self._saques_dia is not None:
+                self._saques_dia.registrar(self._historico.epoch(-1) // SEGUNDOS_DIA,
+                                           self._historico.centavos(-1))
+    
+    def motivo_recusa_saque(self, valor: Dinheiro) -> Optional[str]:
         if valor > self._limite:
-            msg_erro(f"Excede limite de {formatar_moeda(self._limite)} por operação")
-            return False
+            return f"Excede limite de {formatar_moeda(self._limite)} por operação"
         if self.saques_hoje() >= self._limite_saques:
-            msg_erro(f"Limite de {self._limite_saques} saques diários atingido")
-            return False
-        return super().sacar(valor)
+            return f"Limite de {self._limite_saques} saques diários atingido"
+        return super().motivo_recusa_saque(valor)
     
     def to_dict(self) -> dict:
         data = super().to_dict()
         data.update({
             "tipo": "corrente",
-            "limite": self._limite,
+            "limite_centavos": self._limite.centavos,
             "limite_saques": self._limite_saques
         })
         return data
@@ -723,34 +1749,303 @@ class ContaCorrente(Conta):
             raise ValueError(f"Cliente {cpf} não encontrado")
         
         c = cls(cliente=cliente, numero=data["numero"],
-                limite=data.get("limite", cls.LIMITE_PADRAO),
+                limite=Dinheiro.do_dict(data, "limite", cls.LIMITE_PADRAO),
                 limite_saques=data.get("limite_saques", cls.LIMITE_SAQUES))
-        c._saldo = data.get("saldo", 0)
+        c._saldo = Dinheiro.do_dict(data, "saldo")
         c._historico = Historico.from_dict(data.get("historico", []))
         c._ativa = data.get("ativa", True)
         return c
 
 
+@contextmanager
+def travar_contas(*contas: Conta) -> Iterator[None]:
+    """Trava várias contas sempre em ordem crescente de número.
+    
+    Com uma ordem global, duas transferências opostas (A→B e B→A) nunca
+    ficam esperando uma pela outra.
+    """
+    ordenadas = sorted({id(c): c for c in contas}.values(), key=lambda c: c.numero)
+    travadas = []
+    try:
+        for conta in ordenadas:
+            conta.trava.acquire()
+            travadas.append(conta)
+        yield
+    finally:
+        for conta in reversed(travadas):
+            conta.trava.release()
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # PERSISTÊNCIA
 # ═══════════════════════════════════════════════════════════════════════════════
 
-class BancoDados:
-    @staticmethod
-    def inicializar():
-        DATA_DIR.mkdir(exist_ok=True)
+ProgressoCarga = Callable[[int, int], None]  # (bytes lidos, bytes totais)
+
+
+def iterar_array_json(caminho: Path, progresso: Optional[ProgressoCarga] = None,
+                      bloco: int = CARGA_BLOCO) -> Iterator[object]:
+    """Percorre um arquivo com um array JSON devolvendo um elemento por vez.
     
-    @staticmethod
-    def salvar_clientes(clientes: dict):
-        with open(CLIENTES_FILE, 'w', encoding='utf-8') as f:
-            json.dump({cpf: c.to_dict() for cpf, c in clientes.items()}, 
-                     f, ensure_ascii=False, indent=2)
+    Lê o arquivo em blocos e decodifica cada elemento com raw_decode,
+    descartando o texto já consumido; apenas o elemento corrente fica em
+    memória como árvore de dicts.
+    """
+    decodificador = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    total = caminho.stat().st_size
+    lidos = 0
+    buffer = ""
+    pos = 0
+    fim_arquivo = False
+    iniciado = False
+    
+    with open(caminho, 'rb') as f:
+        def ler(tamanho: int) -> bool:
+            nonlocal buffer, pos, lidos, fim_arquivo
+            dados = f.read(tamanho)
+            lidos += len(dados)
+            fim_arquivo = not dados
+            buffer = buffer[pos:] + utf8.decode(dados, final=fim_arquivo)
+            pos = 0
+            if progresso:
+                progresso(lidos, total)
+            return not fim_arquivo
+        
+        ler(bloco)
+        while True:
+            while pos < len(buffer) and (buffer[pos] in " \t\r\n" or (iniciado and buffer[pos] == ",")):
+                pos += 1
+            if pos >= len(buffer):
+                if not ler(bloco):
+                    if not iniciado:
+                        return
+                    raise ValueError(f"{caminho.name}: array JSON não terminado")
+                continue
+            if not iniciado:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{caminho.name}: esperado array JSON")
+                iniciado = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            
+            tamanho = bloco
+            while True:
+                try:
+                    elemento, fim = decodificador.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    # Elemento incompleto no buffer: lê mais (dobrando o bloco)
+                    if not ler(tamanho):
+                        raise
+                    tamanho *= 2
+            pos = fim
+            yield elemento
+
+
+@dataclass
+class Movimento:
+    """Estado de uma conta logo após um movimento confirmado."""
+    conta: Conta
+    saldo: Dinheiro
+    n: int  # tamanho do histórico após o movimento
+    registro: RegistroTransacao
+    contraparte: Optional[int] = None  # número da outra conta numa transferência
+    
+    @classmethod
+    def capturar(cls, conta: Conta, contraparte: Optional[int] = None) -> "Movimento":
+        return cls(conta, conta.saldo, len(conta.historico), conta.historico.ultimo(), contraparte)
+    
+    def to_dict(self) -> dict:
+        return {"numero": self.conta.numero, "saldo_centavos": self.saldo.centavos, "n": self.n,
+                "registro": self.registro.to_dict()}
+
+
+class Armazenamento(ABC):
+    """Contrato dos backends de persistência usados pelo BancoService."""
+    
+    # salvar() pode rodar numa thread enquanto outra chama registrar_*
+    COMPACTACAO_CONCORRENTE = False
+    
+    @abstractmethod
+    def carregar(self) -> Tuple[dict, List[Conta]]:
+        """Carrega clientes (por CPF) e contas."""
+    
+    @abstractmethod
+    def salvar(self, clientes: dict, contas: Iterable[Conta]):
+        """Grava o estado completo do banco."""
+    
+    @abstractmethod
+    def registrar_cliente(self, cliente: PessoaFisica):
+        """Persiste um cliente recém-cadastrado."""
+    
+    @abstractmethod
+    def registrar_conta(self, conta: Conta):
+        """Persiste uma conta recém-criada."""
+    
+    @abstractmethod
+    def registrar_movimentos(self, movimentos: Sequence[Movimento]):
+        """Persiste um grupo de movimentos numa única escrita atômica."""
+    
+    def registrar_movimento(self, contas: Sequence[Conta]):
+        """Persiste saldo e último registro de histórico de cada conta."""
+        self.registrar_movimentos([Movimento.capturar(c) for c in contas])
+    
+    def precisa_snapshot(self) -> bool:
+        """Indica se o backend pede uma gravação completa (compactação)."""
+        return False
+    
+    def sincronizar(self):
+        """Leva ao disco (fsync) o que já foi registrado."""
+    
+    def aguardar(self, duravel: Optional[bool] = None):
+        """Espera a gravação do que a thread atual registrou (backends em segundo plano)."""
+    
+    def fechar(self):
+        pass
+
+
+def _gravar_em_disco(f):
+    """Esvazia o buffer do arquivo e espera o sistema levá-lo ao disco."""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _substituir_arquivo(temporario: Path, caminho: Path):
+    """os.replace de um temporário já em disco, com fsync do diretório para o novo nome valer."""
+    os.replace(temporario, caminho)
+    if os.name == "posix":  # no Windows diretórios não abrem para fsync
+        fd = os.open(caminho.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class FonteJSON(FonteHistorico):
+    """Histórico persistido dentro do objeto da conta em contas.json."""
+    __slots__ = ("_caminho", "_inicio", "_tamanho")
+    
+    def __init__(self, caminho: Path, inicio: int, tamanho: int):
+        self._caminho = caminho
+        self._inicio = inicio
+        self._tamanho = tamanho
+    
+    def carregar(self) -> List[dict]:
+        with open(self._caminho, 'rb') as f:
+            f.seek(self._inicio)
+            return json.loads(f.read(self._tamanho)).get("historico", [])
+
+
+class BancoDados(Armazenamento):
+    """Backend JSON: snapshot em clientes.json/contas.json + journal.
+    
+    Cada snapshot grava também contas.indice.json com os dados de cada
+    conta (sem o histórico) e a posição do seu objeto em contas.json. No
+    modo sob demanda a carga lê só esse índice e os históricos são lidos
+    do snapshot no primeiro acesso.
+    
+    Valores são gravados em centavos (`saldo_centavos`, `valor_centavos`,
+    `limite_centavos`). Arquivos antigos, com reais em float, são lidos
+    normalmente e regravados no formato atual na primeira carga.
+    
+    Um snapshot começa pondo o journal de lado (journal.anterior.jsonl):
+    o que for registrado enquanto ele é gravado vai para um journal novo,
+    então a gravação pode correr em paralelo com os registros.
+    """
+    
+    VERSAO_INDICE = 2  # 2: valores em centavos
+    COMPACTACAO_CONCORRENTE = True
+    
+    def __init__(self, diretorio: Path = DATA_DIR, journal: bool = JOURNAL_ATIVO,
+                 limite_journal: int = JOURNAL_LIMITE,
+                 progresso: Optional[ProgressoCarga] = None,
+                 sob_demanda: bool = HISTORICO_SOB_DEMANDA,
+                 memoria_max: int = HISTORICO_MEMORIA_MAX):
+        self._diretorio = Path(diretorio)
+        self._arq_clientes = self._diretorio / CLIENTES_FILE.name
+        self._arq_contas = self._diretorio / CONTAS_FILE.name
+        self._arq_indice = self._diretorio / INDICE_CONTAS_FILE.name
+        self._arq_journal = self._diretorio / JOURNAL_FILE.name
+        self._arq_journal_anterior = self._diretorio / JOURNAL_ANTERIOR_FILE.name
+        self._trava_journal = threading.Lock()
+        self._saida_journal = None  # aberto no primeiro registro; fechado ao separar/limpar
+        self._journal = journal
+        self._limite_journal = limite_journal
+        self._ops_journal = 0
+        self._progresso = progresso
+        self._cache = CacheHistoricos(memoria_max) if sob_demanda else None
+        self._diretorio.mkdir(parents=True, exist_ok=True)
+    
+    def carregar(self) -> Tuple[dict, List[Conta]]:
+        clientes, contas = self._carregar_snapshot()
+        if self._journal:
+            registros = self.carregar_journal()
+            self.aplicar_journal(registros, clientes, contas)
+            self._ops_journal = sum(len(r.get("contas", ())) if r.get("op") == "mov" else 1
+                                    for r in registros)
+            if self._ops_journal >= self._limite_journal:
+                self.salvar(clientes, contas)
+        return clientes, contas
+    
+    def salvar(self, clientes: dict, contas: Iterable[Conta]):
+        """Grava snapshot completo e descarta o journal já incorporado."""
+        if self._journal:
+            self._separar_journal()
+        self._salvar_snapshot(clientes, contas)
+        if self._journal:
+            self._arq_journal_anterior.unlink(missing_ok=True)
+    
+    def instante_snapshot(self) -> Optional[int]:
+        """mtime (ns) do snapshot neste formato, ou None se não houver."""
+        if not self._arq_clientes.exists():
+            return None
+        return self._arq_clientes.stat().st_mtime_ns
+    
+    def _carregar_snapshot(self) -> Tuple[dict, List[Conta]]:
+        clientes = self.carregar_clientes()
+        return clientes, self.carregar_contas(clientes)
+    
+    def _salvar_snapshot(self, clientes: dict, contas: Iterable[Conta]):
+        self.salvar_clientes(clientes)
+        self.salvar_contas(contas)
+    
+    def registrar_cliente(self, cliente: PessoaFisica):
+        self._registrar({"op": "cliente", "dados": cliente.to_dict()})
+    
+    def registrar_conta(self, conta: Conta):
+        self._registrar({"op": "conta", "dados": conta.to_dict()})
+    
+    def registrar_movimentos(self, movimentos: Sequence[Movimento]):
+        # Um lote é um só registro, mas conta para a compactação por movimento
+        self._registrar({"op": "mov", "contas": [m.to_dict() for m in movimentos]}, len(movimentos))
+    
+    def precisa_snapshot(self) -> bool:
+        return not self._journal or self._ops_journal >= self._limite_journal
+    
+    def _registrar(self, registro: dict, ops: int = 1):
+        if self._journal:
+            self.registrar_journal(registro, ops)
     
     @staticmethod
-    def carregar_clientes() -> dict:
-        if not CLIENTES_FILE.exists():
+    def _escrever_atomico(caminho: Path, dados):
+        """Grava JSON em arquivo temporário, leva ao disco e substitui o original."""
+        temporario = caminho.with_suffix(caminho.suffix + ".tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+            _gravar_em_disco(f)
+        _substituir_arquivo(temporario, caminho)
+    
+    def salvar_clientes(self, clientes: dict):
+        self._escrever_atomico(
+            self._arq_clientes, {cpf: c.to_dict() for cpf, c in clientes.items()})
+    
+    def carregar_clientes(self) -> dict:
+        if not self._arq_clientes.exists():
             return {}
-        with open(CLIENTES_FILE, 'r', encoding='utf-8') as f:
+        with open(self._arq_clientes, 'r', encoding='utf-8') as f:
             dados = json.load(f)
         clientes = {}
         for cpf, data in dados.items():
@@ -760,133 +2055,2646 @@ class BancoDados:
                 msg_erro(f"Erro ao carregar cliente {cpf}: {e}")
         return clientes
     
-    @staticmethod
-    def salvar_contas(contas: List[Conta]):
-        with open(CONTAS_FILE, 'w', encoding='utf-8') as f:
-            json.dump([c.to_dict() for c in contas], f, ensure_ascii=False, indent=2)
+    def salvar_contas(self, contas: Iterable[Conta]):
+        """Grava contas.json conta a conta, anotando a posição de cada objeto."""
+        temporario = self._arq_contas.with_suffix(self._arq_contas.suffix + ".tmp")
+        entradas = []
+        with open(temporario, 'wb') as f:
+            f.write(b"[")
+            pos = 1
+            for conta in contas:
+                dados = conta.to_dict()
+                # Mesmo texto que json.dump(lista, indent=2) produziria
+                trecho = json.dumps([dados], ensure_ascii=False, indent=2)[1:-2].encode("utf-8")
+                if entradas:
+                    f.write(b",")
+                    pos += 1
+                f.write(trecho)
+                # O que foi gravado, não o histórico atual: com a gravação em
+                # segundo plano ele pode ter crescido desde o to_dict
+                historico = dados.pop("historico")
+                ultimo = data_para_epoch(historico[-1]["data"]) if historico else 0
+                entradas.append((conta, dados, pos + 3, len(trecho) - 3, len(historico), ultimo))
+                pos += len(trecho)
+            f.write(b"\n]")
+            _gravar_em_disco(f)
+        _substituir_arquivo(temporario, self._arq_contas)
+        self._salvar_indice(entradas)
     
-    @staticmethod
-    def carregar_contas(clientes: dict) -> List[Conta]:
-        if not CONTAS_FILE.exists():
+    def _salvar_indice(self, entradas: List[Tuple[Conta, dict, int, int, int, int]]):
+        estado = self._arq_contas.stat()
+        contas = []
+        for conta, dados, inicio, tamanho, n, ultimo in entradas:
+            dados["hist"] = [inicio, tamanho, n, ultimo]
+            contas.append(dados)
+            if self._cache is not None:
+                conta.historico.reapontar(FonteJSON(self._arq_contas, inicio, tamanho), n,
+                                          ultimo, self._cache)
+        temporario = self._arq_indice.with_suffix(self._arq_indice.suffix + ".tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"versao": self.VERSAO_INDICE, "tamanho": estado.st_size,
+                       "mtime_ns": estado.st_mtime_ns, "contas": contas},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporario, self._arq_indice)
+    
+    def _carregar_indice(self) -> Optional[List[dict]]:
+        """Entradas do índice, ou None se ausente ou defasado em relação ao snapshot."""
+        if not self._arq_indice.exists():
+            return None
+        try:
+            with open(self._arq_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except ValueError:
+            return None
+        estado = self._arq_contas.stat()
+        if (indice.get("versao") != self.VERSAO_INDICE
+                or indice.get("tamanho") != estado.st_size
+                or indice.get("mtime_ns") != estado.st_mtime_ns):
+            return None
+        return indice["contas"]
+    
+    def carregar_contas(self, clientes: dict) -> List[Conta]:
+        if not self._arq_contas.exists():
             return []
-        with open(CONTAS_FILE, 'r', encoding='utf-8') as f:
-            dados = json.load(f)
+        if self._cache is not None:
+            indice = self._carregar_indice()
+            if indice is not None:
+                return self._carregar_contas_sob_demanda(indice, clientes)
         
         contas = []
         max_num = 0
-        for data in dados:
+        legado = False
+        for data in iterar_array_json(self._arq_contas, self._progresso):
+            legado = legado or "saldo_centavos" not in data
             try:
                 conta = ContaCorrente.from_dict(data, clientes)
                 contas.append(conta)
                 if conta.numero > max_num:
                     max_num = conta.numero
-                if conta not in conta.cliente.contas:
-                    conta.cliente.adicionar_conta(conta)
+                conta.cliente.adicionar_conta(conta)
+            except Exception as e:
+                msg_erro(f"Erro ao carregar conta: {e}")
+        
+        Conta.set_contador(max_num)
+        if self._cache is not None or legado:
+            # Sem índice válido ou com valores antigos em reais: regrava o
+            # snapshot para que as próximas cargas (ex.: cada comando da
+            # CLI) já leiam o formato atual sem precisar ler tudo de novo
+            self.salvar_contas(contas)
+        return contas
+    
+    def _carregar_contas_sob_demanda(self, indice: List[dict], clientes: dict) -> List[Conta]:
+        contas = []
+        max_num = 0
+        for data in indice:
+            try:
+                inicio, tamanho, n, ultimo = data.pop("hist")
+                conta = ContaCorrente.from_dict(data, clientes)
+                conta._historico = Historico.sob_demanda(
+                    FonteJSON(self._arq_contas, inicio, tamanho), n, ultimo, self._cache)
+                contas.append(conta)
+                max_num = max(max_num, conta.numero)
+                conta.cliente.adicionar_conta(conta)
             except Exception as e:
                 msg_erro(f"Erro ao carregar conta: {e}")
         
         Conta.set_contador(max_num)
         return contas
+    
+    # Journal: um registro JSON compacto por operação confirmada.
+    # A reaplicação é idempotente (clientes e contas já existentes são
+    # ignorados e movimentos carregam o tamanho do histórico após a
+    # operação), então uma queda entre o snapshot e o truncamento do
+    # journal não duplica nada.
+    
+    def registrar_journal(self, registro: dict, ops: int = 1):
+        linha = json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._trava_journal:
+            if self._saida_journal is None:
+                self._saida_journal = open(self._arq_journal, 'a', encoding='utf-8')
+            self._saida_journal.write(linha)
+            self._saida_journal.flush()
+            self._ops_journal += ops
+    
+    def _fechar_journal(self):
+        """Fecha o arquivo de registro aberto; chamar com _trava_journal."""
+        if self._saida_journal is not None:
+            self._saida_journal.close()
+            self._saida_journal = None
+    
+    def sincronizar(self):
+        with self._trava_journal:
+            if self._saida_journal is not None:
+                os.fsync(self._saida_journal.fileno())
+            elif self._journal and self._arq_journal.exists():
+                with open(self._arq_journal, 'ab') as f:
+                    os.fsync(f.fileno())
+    
+    def fechar(self):
+        with self._trava_journal:
+            self._fechar_journal()
+    
+    def _separar_journal(self):
+        """Põe o journal de lado para o snapshot; os próximos registros vão para um novo."""
+        with self._trava_journal:
+            self._fechar_journal()
+            if self._arq_journal.exists():
+                if self._arq_journal_anterior.exists():
+                    # O snapshot que o pôs de lado não terminou: junta os dois
+                    with open(self._arq_journal_anterior, 'ab') as destino, \
+                            open(self._arq_journal, 'rb') as origem:
+                        destino.write(origem.read())
+                        _gravar_em_disco(destino)
+                    self._arq_journal.unlink()
+                else:
+                    with open(self._arq_journal, 'ab') as f:
+                        os.fsync(f.fileno())
+                    _substituir_arquivo(self._arq_journal, self._arq_journal_anterior)
+            self._ops_journal = 0
+    
+    def carregar_journal(self) -> List[dict]:
+        registros = []
+        for arquivo in (self._arq_journal_anterior, self._arq_journal):
+            if not arquivo.exists():
+                continue
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                for num_linha, linha in enumerate(f, 1):
+                    linha = linha.strip()
+                    if not linha:
+                        continue
+                    try:
+                        registros.append(json.loads(linha))
+                    except ValueError:
+                        # Última linha incompleta (queda durante a escrita)
+                        msg_aviso(f"{arquivo.name}: registro {num_linha} ilegível ignorado")
+        return registros
+    
+    @staticmethod
+    def aplicar_journal(registros: List[dict], clientes: dict, contas: List[Conta]):
+        """Reaplica o journal sobre o snapshot carregado."""
+        por_numero = {c.numero: c for c in contas}
+        max_num = max(por_numero, default=0)
+        
+        for registro in registros:
+            try:
+                op = registro["op"]
+                if op == "cliente":
+                    cpf = registro["dados"]["cpf"]
+                    if cpf not in clientes:
+                        clientes[cpf] = PessoaFisica.from_dict(registro["dados"])
+                elif op == "conta":
+                    numero = registro["dados"]["numero"]
+                    if numero not in por_numero:
+                        conta = ContaCorrente.from_dict(registro["dados"], clientes)
+                        conta.cliente.adicionar_conta(conta)
+                        contas.append(conta)
+                        por_numero[numero] = conta
+                        max_num = max(max_num, numero)
+                elif op == "mov":
+                    for item in registro["contas"]:
+                        conta = por_numero.get(item["numero"])
+                        if conta is None:
+                            raise ValueError(f"Conta {item['numero']} não encontrada")
+                        if len(conta.historico) >= item["n"]:
+                            continue
+                        conta._saldo = Dinheiro.do_dict(item, "saldo")
+                        conta.historico.anexar(RegistroTransacao.from_dict(item["registro"]))
+                else:
+                    raise ValueError(f"Operação desconhecida: {op}")
+            except Exception as e:
+                msg_erro(f"Erro ao aplicar journal: {e}")
+        
+        Conta.set_contador(max_num)
+    
+    def limpar_journal(self):
+        with self._trava_journal:
+            self._fechar_journal()
+            with open(self._arq_journal, 'w', encoding='utf-8'):
+                pass
+            self._arq_journal_anterior.unlink(missing_ok=True)
+            self._ops_journal = 0
 
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# SERVIÇO BANCÁRIO
-# ═══════════════════════════════════════════════════════════════════════════════
+def _little_endian(coluna: array) -> array:
+    """A coluna na ordem de bytes do arquivo (little-endian); cópia só em máquinas big-endian."""
+    if sys.byteorder == "little":
+        return coluna
+    copia = array(coluna.typecode, coluna)
+    copia.byteswap()
+    return copia
+
+
+class SnapshotBinario:
+    """Snapshot binário: clientes, contas e históricos num só arquivo.
+    
+    Cabeçalho: assinatura, versão, número de seções, (posição, tamanho,
+    CRC32) de cada seção e o CRC32 do próprio cabeçalho. As seções, nesta
+    ordem e alinhadas em 8 bytes:
+    
+      TEXTOS    textos distintos (nomes, endereços...) em UTF-8, separados por NUL
+      TIPOS     índice do texto de cada código de tipo de transação gravado
+      CLIENTES  registro fixo (CLIENTE) de índices de texto por cliente
+      CONTAS    registro fixo (CONTA) por conta, com o tamanho do histórico
+      EPOCHS, CENTAVOS, CODIGOS  colunas de todos os históricos, conta após conta
+    
+    Inteiros em little-endian. A instância descreve um arquivo gravado e
+    lê faixas das colunas para os históricos sob demanda (FonteBinaria).
+    """
+    ASSINATURA = b"PYBK"
+    VERSAO = 1
+    CABECALHO = struct.Struct("<4sHH")  # assinatura, versão, número de seções
+    SECAO = struct.Struct("<QQI")  # posição, tamanho, CRC32
+    CRC = struct.Struct("<I")
+    CLIENTE = struct.Struct("<9I")  # cpf, nome, nascimento, logradouro, número, bairro, cidade, uf, cep
+    # número, tipo, agência, cliente, saldo, limite, limite de saques, ativa,
+    # tamanho do histórico e seu último instante (para a carga sob demanda)
+    CONTA = struct.Struct("<qIIIqqIBQq")
+    TEXTOS, TIPOS, CLIENTES, CONTAS, EPOCHS, CENTAVOS, CODIGOS = range(7)
+    
+    def __init__(self, caminho: Path, secoes: List[Tuple[int, int, int]], traducao: bytes):
+        self.caminho = caminho
+        self.secoes = secoes
+        self._traducao = traducao  # tabela de bytes.translate: código gravado → código atual
+    
+    @classmethod
+    def gravar(cls, caminho: Path, clientes: dict, contas: Iterable[Conta]
+               ) -> Tuple["SnapshotBinario", List[Tuple[int, int]]]:
+        """Grava o estado completo (arquivo temporário + os.replace) e devolve o novo arquivo.
+        
+        Devolve também o tamanho e o último instante do histórico gravado de
+        cada conta, na ordem de `contas`.
+        """
+        textos: Dict[str, int] = {}
+        
+        def texto(valor: str) -> int:
+            i = textos.get(valor)
+            if i is None:
+                if "\0" in valor:
+                    raise ValueError(f"Texto com caractere NUL não pode ir para o snapshot: {valor!r}")
+                i = textos[valor] = len(textos)
+            return i
+        
+        posicao_cliente: Dict[str, int] = {}
+        registros_clientes = array('I')
+        for cpf, cliente in clientes.items():
+            e = cliente.endereco
+            posicao_cliente[cpf] = len(posicao_cliente)
+            registros_clientes.extend(map(texto, (cliente.cpf, cliente.nome, cliente.data_nascimento,
+                                                  e.logradouro, e.numero, e.bairro, e.cidade, e.uf, e.cep)))
+        
+        registros_contas = bytearray()
+        historicos = []
+        epochs, centavos, codigos = array('q'), array('q'), bytearray()
+        corrente, tipo_conta = texto("corrente"), cls.CONTA.pack
+        for conta in contas:
+            antes = len(codigos)
+            conta.historico.copiar_colunas(epochs, centavos, codigos)
+            limite = conta.limite.centavos if isinstance(conta, ContaCorrente) else 0
+            n = len(codigos) - antes
+            historicos.append((n, epochs[-1] if n else 0))
+            registros_contas += tipo_conta(
+                conta.numero, corrente, texto(conta.agencia), posicao_cliente[conta.cliente.cpf],
+                conta.saldo.centavos, limite, getattr(conta, "limite_saques", 0), conta.ativa,
+                *historicos[-1])
+        tipos = array('I', map(texto, TIPOS_TRANSACAO))
+        
+        conteudos = ["\0".join(textos).encode("utf-8"), _little_endian(tipos),
+                     _little_endian(registros_clientes), registros_contas,
+                     _little_endian(epochs), _little_endian(centavos), codigos]
+        secoes = []
+        posicao = cls.CABECALHO.size + len(conteudos) * cls.SECAO.size + cls.CRC.size
+        for conteudo in conteudos:
+            posicao += -posicao % 8
+            tamanho = len(conteudo) * getattr(conteudo, "itemsize", 1)
+            secoes.append((posicao, tamanho, zlib.crc32(conteudo)))
+            posicao += tamanho
+        cabecalho = cls.CABECALHO.pack(cls.ASSINATURA, cls.VERSAO, len(secoes))
+        cabecalho += b"".join(cls.SECAO.pack(*secao) for secao in secoes)
+        cabecalho += cls.CRC.pack(zlib.crc32(cabecalho))
+        
+        temporario = caminho.with_suffix(caminho.suffix + ".tmp")
+        with open(temporario, 'wb') as f:
+            f.write(cabecalho)
+            for (inicio, _, _), conteudo in zip(secoes, conteudos):
+                f.write(b"\0" * (inicio - f.tell()))
+                f.write(conteudo)
+            _gravar_em_disco(f)
+        _substituir_arquivo(temporario, caminho)
+        return cls(caminho, secoes, bytes(range(256))), historicos
+    
+    @classmethod
+    def ler_cabecalho(cls, f) -> Tuple[int, List[Tuple[int, int, int]]]:
+        """Versão e seções do arquivo aberto, validando assinatura e CRC do cabeçalho."""
+        inicio = f.read(cls.CABECALHO.size)
+        if len(inicio) < cls.CABECALHO.size:
+            raise ValueError("snapshot binário truncado (cabeçalho)")
+        assinatura, versao, n_secoes = cls.CABECALHO.unpack(inicio)
+        if assinatura != cls.ASSINATURA:
+            raise ValueError("arquivo não é um snapshot do PyBank")
+        if versao > cls.VERSAO:
+            raise ValueError(f"snapshot na versão {versao}; esta versão do {PROJETO_NOME} lê até a {cls.VERSAO}")
+        resto = f.read(n_secoes * cls.SECAO.size + cls.CRC.size)
+        if len(resto) < n_secoes * cls.SECAO.size + cls.CRC.size:
+            raise ValueError("snapshot binário truncado (cabeçalho)")
+        crc, = cls.CRC.unpack_from(resto, len(resto) - cls.CRC.size)
+        if zlib.crc32(inicio + resto[:-cls.CRC.size]) != crc:
+            raise ValueError("snapshot binário corrompido (CRC do cabeçalho)")
+        return versao, [cls.SECAO.unpack_from(resto, i * cls.SECAO.size) for i in range(n_secoes)]
+    
+    @classmethod
+    def carregar(cls, caminho: Path, historicos: bool = True
+                 ) -> Tuple["SnapshotBinario", dict, List[Tuple[Conta, int, int, int]]]:
+        """Lê o arquivo e monta clientes (por CPF) e contas.
+        
+        Cada conta vem com a posição, o tamanho e o último instante do seu
+        histórico nas colunas. Com historicos=False as colunas nem são lidas (nem têm o
+        CRC conferido): ficam para FonteBinaria, sob demanda.
+        """
+        with open(caminho, 'rb') as f:
+            versao, secoes = cls.ler_cabecalho(f)
+            carregar_versao = {1: cls._carregar_v1}[versao]
+            ultima = secoes[-1] if historicos else secoes[cls.CONTAS]
+            f.seek(0)
+            dados = memoryview(f.read(ultima[0] + ultima[1]))
+        for i, (inicio, tamanho, crc) in enumerate(secoes[:cls.CONTAS + 1] if not historicos else secoes):
+            if inicio + tamanho > len(dados):
+                raise ValueError("snapshot binário truncado")
+            if zlib.crc32(dados[inicio:inicio + tamanho]) != crc:
+                raise ValueError(f"snapshot binário corrompido (CRC da seção {i})")
+        return carregar_versao(caminho, secoes, dados, historicos)
+    
+    @classmethod
+    def _coluna(cls, dados: memoryview, tipo: str) -> array:
+        coluna = array(tipo)
+        coluna.frombytes(dados)
+        if sys.byteorder != "little":
+            coluna.byteswap()
+        return coluna
+    
+    @classmethod
+    def _carregar_v1(cls, caminho: Path, secoes: List[Tuple[int, int, int]], dados: memoryview,
+                     historicos: bool) -> Tuple["SnapshotBinario", dict, List[Tuple[Conta, int, int, int]]]:
+        def secao(i: int) -> memoryview:
+            inicio, tamanho, _ = secoes[i]
+            return dados[inicio:inicio + tamanho]
+        
+        textos = str(secao(cls.TEXTOS), "utf-8").split("\0")
+        traducao = bytearray(range(256))
+        for gravado, i in enumerate(cls._coluna(secao(cls.TIPOS), 'I')):
+            traducao[gravado] = codigo_tipo(textos[i])
+        snapshot = cls(caminho, secoes, bytes(traducao))
+        
+        clientes = {}
+        por_posicao = []
+        for cpf, nome, nasc, *endereco in cls.CLIENTE.iter_unpack(secao(cls.CLIENTES)):
+            cliente = PessoaFisica(textos[nome], textos[nasc], textos[cpf],
+                                   Endereco(*map(textos.__getitem__, endereco)))
+            clientes[cliente.cpf] = cliente
+            por_posicao.append(cliente)
+        
+        contas = []
+        inicio = 0
+        for (numero, _, agencia, cliente, saldo, limite, limite_saques, ativa,
+             n, ultimo) in cls.CONTA.iter_unpack(secao(cls.CONTAS)):
+            conta = ContaCorrente(por_posicao[cliente], numero, Dinheiro(limite), limite_saques)
+            conta._agencia = textos[agencia]
+            conta._saldo = Dinheiro(saldo)
+            conta._ativa = bool(ativa)
+            if historicos and n:
+                conta._historico = snapshot._historico(secao(cls.EPOCHS), secao(cls.CENTAVOS),
+                                                       secao(cls.CODIGOS), inicio, n)
+            contas.append((conta, inicio, n, ultimo))
+            inicio += n
+        return snapshot, clientes, contas
+    
+    def _historico(self, epochs: memoryview, centavos: memoryview, codigos: memoryview,
+                   inicio: int, n: int) -> Historico:
+        h = Historico()
+        h._epochs = self._coluna(epochs[inicio * 8:(inicio + n) * 8], 'q')
+        h._centavos = self._coluna(centavos[inicio * 8:(inicio + n) * 8], 'q')
+        h._tipos = bytearray(bytes(codigos[inicio:inicio + n]).translate(self._traducao))
+        return h
+    
+    def ler_historico(self, inicio: int, n: int) -> Historico:
+        """Lê do arquivo só a faixa [inicio, inicio + n) das três colunas."""
+        faixas = []
+        with open(self.caminho, 'rb') as f:
+            for secao, largura in ((self.EPOCHS, 8), (self.CENTAVOS, 8), (self.CODIGOS, 1)):
+                f.seek(self.secoes[secao][0] + inicio * largura)
+                faixas.append(memoryview(f.read(n * largura)))
+        return self._historico(faixas[0], faixas[1], faixas[2], 0, n)
+
+
+class FonteBinaria(FonteHistorico):
+    """Histórico persistido como faixa das colunas do snapshot binário."""
+    __slots__ = ("_snapshot", "_inicio", "_tamanho")
+    
+    def __init__(self, snapshot: SnapshotBinario, inicio: int, tamanho: int):
+        self._snapshot = snapshot
+        self._inicio = inicio
+        self._tamanho = tamanho
+    
+    def carregar_historico(self) -> Historico:
+        return self._snapshot.ler_historico(self._inicio, self._tamanho)
+    
+    def carregar(self) -> List[dict]:
+        return self.carregar_historico().to_dict()
+
+
+class BancoDadosBinario(BancoDados):
+    """Backend com o snapshot em pybank.snap (SnapshotBinario) e o mesmo journal do JSON.
+    
+    Sem nomes de campo repetidos nem texto para interpretar, a carga é
+    basicamente struct.iter_unpack e array.frombytes; no modo sob demanda
+    as colunas dos históricos nem são lidas.
+    """
+    
+    def __init__(self, diretorio: Path = DATA_DIR, **opcoes):
+        super().__init__(diretorio, **opcoes)
+        self._arq_snapshot = self._diretorio / SNAPSHOT_FILE.name
+    
+    def instante_snapshot(self) -> Optional[int]:
+        return self._arq_snapshot.stat().st_mtime_ns if self._arq_snapshot.exists() else None
+    
+    def _carregar_snapshot(self) -> Tuple[dict, List[Conta]]:
+        if not self._arq_snapshot.exists():
+            return {}, []
+        snapshot, clientes, entradas = SnapshotBinario.carregar(
+            self._arq_snapshot, historicos=self._cache is None)
+        contas = []
+        for conta, inicio, n, ultimo in entradas:
+            if self._cache is not None and n:
+                conta._historico = Historico.sob_demanda(
+                    FonteBinaria(snapshot, inicio, n), n, ultimo, self._cache)
+            conta.cliente.adicionar_conta(conta)
+            contas.append(conta)
+        Conta.set_contador(max((c.numero for c in contas), default=0))
+        return clientes, contas
+    
+    def _salvar_snapshot(self, clientes: dict, contas: Iterable[Conta]):
+        contas = list(contas)
+        snapshot, historicos = SnapshotBinario.gravar(self._arq_snapshot, clientes, contas)
+        if self._cache is not None:
+            inicio = 0
+            for conta, (n, ultimo) in zip(contas, historicos):
+                conta.historico.reapontar(FonteBinaria(snapshot, inicio, n), n, ultimo, self._cache)
+                inicio += n
+
+
+class BancoDadosFragmentado(BancoDados):
+    """Backend com o snapshot JSON dividido em fragmentos e o mesmo journal do JSON.
+    
+    As contas ficam em fragmentos/contas-<n>.json, um arquivo por faixa de
+    `contas_por_fragmento` números, e os clientes em clientes-<n>.json,
+    espalhados pelo CRC32 do CPF. A instância guarda o que há em cada
+    fragmento e anota como sujos os tocados por registrar_* (e, na carga,
+    os das contas e clientes que aparecem no journal); o snapshot regrava, cada
+    um com troca atômica, só os sujos, sem percorrer o resto do banco:
+    depois de uma transação são um ou dois arquivos.
+    
+    Um snapshot que não é o primeiro grava os objetos que esta instância
+    carregou ou registrou, não os recebidos; o primeiro de uma instância
+    que não carregou (conversão, junção de partições) regrava todos os
+    fragmentos. Os históricos são sempre carregados inteiros.
+    """
+    
+    def __init__(self, diretorio: Path = DATA_DIR,
+                 contas_por_fragmento: int = CONTAS_POR_FRAGMENTO,
+                 fragmentos_clientes: int = FRAGMENTOS_CLIENTES, **opcoes):
+        super().__init__(diretorio, **opcoes)
+        self._cache = None
+        self._dir_fragmentos = self._diretorio / FRAGMENTOS_DIR.name
+        self._contas_por_fragmento = contas_por_fragmento
+        self._fragmentos_clientes = fragmentos_clientes
+        self._em_dia = False  # os fragmentos refletem _membros menos _sujos
+        self._membros: Dict[Path, dict] = {}  # fragmento -> {cpf ou número: objeto}
+        self._sujos: Set[Path] = set()
+        self._trava_fragmentos = threading.Lock()  # registrar_* corre junto da compactação
+    
+    def _arquivos(self, tipo: str) -> List[Path]:
+        return sorted(self._dir_fragmentos.glob(f"{tipo}-*.json"))
+    
+    def instante_snapshot(self) -> Optional[int]:
+        arquivos = self._arquivos("clientes")
+        return max(a.stat().st_mtime_ns for a in arquivos) if arquivos else None
+    
+    def _fragmento_cliente(self, cpf: str) -> Path:
+        n = zlib.crc32(cpf.encode("ascii")) % self._fragmentos_clientes
+        return self._dir_fragmentos / f"clientes-{n:04d}.json"
+    
+    def _fragmento_conta(self, numero: int) -> Path:
+        return self._dir_fragmentos / f"contas-{numero // self._contas_por_fragmento:06d}.json"
+    
+    def _carregar_snapshot(self) -> Tuple[dict, List[Conta]]:
+        arquivos_clientes, arquivos_contas = self._arquivos("clientes"), self._arquivos("contas")
+        total = sum(a.stat().st_size for a in arquivos_clientes + arquivos_contas)
+        lidos = 0
+        
+        def ler(arquivo: Path):
+            nonlocal lidos
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            lidos += arquivo.stat().st_size
+            if self._progresso:
+                self._progresso(lidos, total)
+            return dados
+        
+        # Algo fora do fragmento esperado (tamanhos de fragmento mudaram):
+        # o primeiro snapshot regrava tudo e apaga os arquivos antigos. Se
+        # uma queda deixou as duas cópias, vale a do fragmento esperado.
+        fora_do_lugar = False
+        clientes = {}
+        for arquivo in arquivos_clientes:
+            for cpf, data in ler(arquivo).items():
+                try:
+                    no_lugar = self._fragmento_cliente(cpf) == arquivo
+                    fora_do_lugar = fora_do_lugar or not no_lugar
+                    if cpf in clientes and not no_lugar:
+                        continue
+                    cliente = PessoaFisica.from_dict(data)
+                    clientes[cpf] = cliente
+                except Exception as e:
+                    msg_erro(f"Erro ao carregar cliente {cpf}: {e}")
+        
+        contas: Dict[int, Conta] = {}
+        for arquivo in arquivos_contas:
+            for data in ler(arquivo):
+                try:
+                    no_lugar = self._fragmento_conta(data["numero"]) == arquivo
+                    fora_do_lugar = fora_do_lugar or not no_lugar
+                    if data["numero"] in contas and not no_lugar:
+                        continue
+                    conta = ContaCorrente.from_dict(data, clientes)
+                    conta.cliente.adicionar_conta(conta)
+                    contas[conta.numero] = conta
+                except Exception as e:
+                    msg_erro(f"Erro ao carregar conta: {e}")
+        Conta.set_contador(max(contas, default=0))
+        with self._trava_fragmentos:
+            self._membros = self._agrupar(clientes, contas.values())
+            self._sujos = set()
+        self._em_dia = not fora_do_lugar
+        return clientes, list(contas.values())
+    
+    def aplicar_journal(self, registros: List[dict], clientes: dict, contas: List[Conta]):
+        super().aplicar_journal(registros, clientes, contas)
+        if not registros:
+            return
+        # Só na carga: o que o journal criou ou moveu fica sujo para o próximo snapshot
+        por_numero = {c.numero: c for c in contas}
+        for registro in registros:
+            op = registro.get("op")
+            if op == "cliente":
+                cliente = clientes.get(registro["dados"]["cpf"])
+                if cliente is not None:
+                    self._anotar(self._fragmento_cliente(cliente.cpf), cliente.cpf, cliente)
+                continue
+            numeros = ([registro["dados"]["numero"]] if op == "conta" else
+                       [item["numero"] for item in registro.get("contas", ())])
+            for numero in numeros:
+                conta = por_numero.get(numero)
+                if conta is not None:
+                    self._anotar(self._fragmento_conta(numero), numero, conta)
+    
+    def _agrupar(self, clientes: dict, contas: Iterable[Conta]) -> Dict[Path, dict]:
+        membros: Dict[Path, dict] = {}
+        for cliente in clientes.values():
+            membros.setdefault(self._fragmento_cliente(cliente.cpf), {})[cliente.cpf] = cliente
+        for conta in contas:
+            membros.setdefault(self._fragmento_conta(conta.numero), {})[conta.numero] = conta
+        return membros
+    
+    def _anotar(self, caminho: Path, chave, item):
+        with self._trava_fragmentos:
+            self._membros.setdefault(caminho, {})[chave] = item
+            self._sujos.add(caminho)
+    
+    def registrar_cliente(self, cliente: PessoaFisica):
+        super().registrar_cliente(cliente)
+        self._anotar(self._fragmento_cliente(cliente.cpf), cliente.cpf, cliente)
+    
+    def registrar_conta(self, conta: Conta):
+        super().registrar_conta(conta)
+        self._anotar(self._fragmento_conta(conta.numero), conta.numero, conta)
+    
+    def registrar_movimentos(self, movimentos: Sequence[Movimento]):
+        super().registrar_movimentos(movimentos)
+        for m in movimentos:
+            self._anotar(self._fragmento_conta(m.conta.numero), m.conta.numero, m.conta)
+    
+    def _salvar_snapshot(self, clientes: dict, contas: Iterable[Conta]):
+        self._dir_fragmentos.mkdir(parents=True, exist_ok=True)
+        completo = not self._em_dia
+        membros = self._agrupar(clientes, contas) if completo else None
+        
+        # O que for registrado daqui em diante fica sujo para o próximo
+        # snapshot (e está no journal novo, separado antes desta chamada)
+        with self._trava_fragmentos:
+            sujos, self._sujos = self._sujos, set()
+            if completo:
+                # Registrados depois da cópia recebida continuam valendo
+                for caminho, grupo in self._membros.items():
+                    for chave, item in grupo.items():
+                        membros.setdefault(caminho, {}).setdefault(chave, item)
+                self._membros = membros
+                sujos = set(membros)
+            grupos = [(caminho, list(self._membros.get(caminho, {}).values()))
+                      for caminho in sorted(sujos)]
+        
+        pendentes = set(sujos)
+        try:
+            for caminho, grupo in grupos:
+                if caminho.name.startswith("clientes-"):
+                    self._escrever_atomico(caminho, {c.cpf: c.to_dict() for c in grupo})
+                else:
+                    self._escrever_atomico(caminho, [c.to_dict() for c in grupo])
+                pendentes.discard(caminho)
+        except BaseException:
+            with self._trava_fragmentos:
+                self._sujos |= pendentes
+            raise
+        if completo:
+            # Fragmentos de um estado anterior que não existem mais
+            for arquivo in self._arquivos("clientes") + self._arquivos("contas"):
+                if arquivo not in sujos:
+                    arquivo.unlink()
+        self._em_dia = True
+
+
+class FonteSQLite(FonteHistorico):
+    """Histórico persistido como faixa de linhas (seq 1..n) na tabela transacoes."""
+    __slots__ = ("_banco", "_conta", "_ate")
+    
+    def __init__(self, banco: "BancoDadosSQLite", conta: int, ate: int):
+        self._banco = banco
+        self._conta = conta
+        self._ate = ate
+    
+    def carregar(self) -> List[dict]:
+        return [{"tipo": tipo, "valor_centavos": centavos, "data": data}
+                for tipo, centavos, data in self._banco._conn.execute(
+                    "SELECT tipo, valor_centavos, data FROM transacoes "
+                    "WHERE conta = ? AND seq <= ? ORDER BY seq", (self._conta, self._ate))]
+
+
+class BancoDadosSQLite(Armazenamento):
+    """Backend SQLite com tabelas indexadas e escrita transacional por operação."""
+    
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS clientes (
+            cpf TEXT PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            nome TEXT NOT NULL,
+            data_nascimento TEXT NOT NULL,
+            logradouro TEXT, numero TEXT, bairro TEXT,
+            cidade TEXT, uf TEXT, cep TEXT
+        );
+        CREATE TABLE IF NOT EXISTS contas (
+            numero INTEGER PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            agencia TEXT NOT NULL,
+            cpf_cliente TEXT NOT NULL REFERENCES clientes(cpf),
+            saldo_centavos INTEGER NOT NULL,
+            ativa INTEGER NOT NULL,
+            limite_centavos INTEGER,
+            limite_saques INTEGER,
+            n_transacoes INTEGER NOT NULL DEFAULT 0,
+            ultimo_epoch INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS transacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conta INTEGER NOT NULL REFERENCES contas(numero),
+            seq INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            valor_centavos INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            instante TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_contas_cpf ON contas(cpf_cliente);
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transacoes_conta ON transacoes(conta, seq);
+        CREATE INDEX IF NOT EXISTS idx_transacoes_instante ON transacoes(instante);
+    """
+    COLUNAS_CONTA = ("numero, tipo, agencia, cpf_cliente, saldo_centavos, ativa, "
+                     "limite_centavos, limite_saques, n_transacoes, ultimo_epoch")
+    
+    def __init__(self, caminho: Path = SQLITE_FILE, sob_demanda: bool = HISTORICO_SOB_DEMANDA,
+                 memoria_max: int = HISTORICO_MEMORIA_MAX):
+        self._caminho = Path(caminho)
+        self._caminho.parent.mkdir(parents=True, exist_ok=True)
+        import sqlite3  # só carregado quando o backend SQLite é usado
+        # Usada por várias threads; o BancoService serializa as escritas
+        self._conn = sqlite3.connect(str(self._caminho), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self.ESQUEMA)
+        self._migrar_esquema()
+        self._cache = CacheHistoricos(memoria_max) if sob_demanda else None
+    
+    def _migrar_esquema(self):
+        """Atualiza bancos criados por versões anteriores do esquema."""
+        colunas = {linha[1] for linha in self._conn.execute("PRAGMA table_info(contas)")}
+        if "n_transacoes" not in colunas:
+            # Contadores de histórico usados pela carga sob demanda
+            with self._conn:
+                self._conn.execute("ALTER TABLE contas ADD COLUMN n_transacoes INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("ALTER TABLE contas ADD COLUMN ultimo_epoch INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("""
+                    UPDATE contas SET
+                        n_transacoes = (SELECT COUNT(*) FROM transacoes t WHERE t.conta = contas.numero),
+                        ultimo_epoch = COALESCE((SELECT CAST(strftime('%s', MAX(t.instante)) AS INTEGER)
+                                                 FROM transacoes t WHERE t.conta = contas.numero), 0)
+                """)
+        if "saldo_centavos" not in colunas:
+            self._migrar_para_centavos()
+    
+    def _migrar_para_centavos(self):
+        """Reconstrói contas e transacoes com valores REAL (reais) em INTEGER (centavos).
+        
+        O SQLite não muda o tipo de uma coluna: as tabelas antigas são
+        renomeadas, recriadas pelo ESQUEMA e copiadas numa só transação.
+        """
+        self._conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            self._conn.executescript(f"""
+                BEGIN;
+                DROP INDEX IF EXISTS idx_contas_cpf;
+                DROP INDEX IF EXISTS idx_transacoes_conta;
+                DROP INDEX IF EXISTS idx_transacoes_instante;
+                ALTER TABLE contas RENAME TO contas_reais;
+                ALTER TABLE transacoes RENAME TO transacoes_reais;
+                {self.ESQUEMA}
+                INSERT INTO contas ({self.COLUNAS_CONTA})
+                    SELECT numero, tipo, agencia, cpf_cliente, CAST(ROUND(saldo * 100) AS INTEGER),
+                           ativa, CAST(ROUND(limite * 100) AS INTEGER), limite_saques,
+                           n_transacoes, ultimo_epoch
+                    FROM contas_reais;
+                INSERT INTO transacoes (id, conta, seq, tipo, valor_centavos, data, instante)
+                    SELECT id, conta, seq, tipo, CAST(ROUND(valor * 100) AS INTEGER), data, instante
+                    FROM transacoes_reais;
+                DROP TABLE transacoes_reais;
+                DROP TABLE contas_reais;
+                COMMIT;
+            """)
+        except Exception:
+            if self._conn.in_transaction:
+                self._conn.rollback()
+            raise
+        finally:
+            self._conn.execute("PRAGMA foreign_keys=ON")
+    
+    @staticmethod
+    def _instante(data: str) -> str:
+        """Converte 'dd/mm/aaaa HH:MM:SS' em texto ordenável (ISO)."""
+        return f"{data[6:10]}-{data[3:5]}-{data[0:2]}{data[10:]}"
+    
+    @staticmethod
+    def _linha_cliente(cliente: PessoaFisica) -> tuple:
+        e = cliente.endereco
+        return ("pf", cliente.nome, cliente.data_nascimento, cliente.cpf,
+                e.logradouro, e.numero, e.bairro, e.cidade, e.uf, e.cep)
+    
+    @staticmethod
+    def _linha_conta(conta: Conta) -> tuple:
+        # Histórico antes do saldo, como em Conta.to_dict
+        h = conta.historico
+        n = len(h)
+        ultimo = h.ultimo_epoch() if n else 0
+        limite = conta.limite.centavos if isinstance(conta, ContaCorrente) else None
+        return (conta.numero, "corrente", conta.agencia, conta.cliente.cpf, conta.saldo.centavos,
+                int(conta.ativa), limite, getattr(conta, "limite_saques", None), n, ultimo)
+    
+    def _linhas_historico(self, conta: Conta, inicio: int = 0, fim: Optional[int] = None):
+        for seq, t in enumerate(conta.historico.transacoes[inicio:fim], inicio + 1):
+            yield (conta.numero, seq, t.tipo, t.valor.centavos, t.data, self._instante(t.data))
+    
+    def carregar(self) -> Tuple[dict, List[Conta]]:
+        clientes = {}
+        for tipo, nome, nasc, cpf, *endereco in self._conn.execute(
+                "SELECT tipo, nome, data_nascimento, cpf, logradouro, numero, "
+                "bairro, cidade, uf, cep FROM clientes"):
+            try:
+                clientes[cpf] = PessoaFisica(nome, nasc, cpf, Endereco(*endereco))
+            except Exception as e:
+                msg_erro(f"Erro ao carregar cliente {cpf}: {e}")
+        
+        historicos: Dict[int, List[dict]] = {}
+        if self._cache is None:
+            for conta, tipo, centavos, data in self._conn.execute(
+                    "SELECT conta, tipo, valor_centavos, data FROM transacoes ORDER BY conta, seq"):
+                historicos.setdefault(conta, []).append(
+                    {"tipo": tipo, "valor_centavos": centavos, "data": data})
+        
+        contas = []
+        max_num = 0
+        for (numero, tipo, agencia, cpf, saldo, ativa, limite, limite_saques,
+             n_transacoes, ultimo_epoch) in self._conn.execute(
+                f"SELECT {self.COLUNAS_CONTA} FROM contas ORDER BY numero"):
+            try:
+                conta = ContaCorrente.from_dict({
+                    "numero": numero, "agencia": agencia, "cpf_cliente": cpf,
+                    "saldo_centavos": saldo, "ativa": bool(ativa),
+                    "historico": historicos.pop(numero, []),
+                    "limite_centavos": limite,
+                    "limite_saques": (limite_saques if limite_saques is not None
+                                      else ContaCorrente.LIMITE_SAQUES),
+                }, clientes)
+                if self._cache is not None:
+                    conta._historico = Historico.sob_demanda(
+                        FonteSQLite(self, numero, n_transacoes), n_transacoes,
+                        ultimo_epoch, self._cache)
+                contas.append(conta)
+                max_num = max(max_num, numero)
+                conta.cliente.adicionar_conta(conta)
+            except Exception as e:
+                msg_erro(f"Erro ao carregar conta: {e}")
+        
+        Conta.set_contador(max_num)
+        return clientes, contas
+    
+    def salvar(self, clientes: dict, contas: Iterable[Conta]):
+        """Grava o estado completo; só as transações ainda ausentes são inseridas.
+        
+        Cada conta vai com o histórico do tamanho lido junto com o saldo
+        (n_transacoes), mesmo que tenha crescido durante a gravação.
+        """
+        gravados = []
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO clientes (tipo, nome, data_nascimento, cpf, "
+                "logradouro, numero, bairro, cidade, uf, cep) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._linha_cliente(c) for c in clientes.values()))
+            for conta in contas:
+                linha = self._linha_conta(conta)
+                n, ultimo = linha[-2:]
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO contas ({self.COLUNAS_CONTA}) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linha)
+                gravadas, = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM transacoes WHERE conta = ?",
+                    (conta.numero,)).fetchone()
+                self._conn.executemany(
+                    "INSERT INTO transacoes (conta, seq, tipo, valor_centavos, data, instante) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", self._linhas_historico(conta, gravadas, n))
+                gravados.append((conta, n, ultimo))
+        if self._cache is not None:
+            for conta, n, ultimo in gravados:
+                self._reapontar(conta, n, ultimo)
+    
+    def _reapontar(self, conta: Conta, n: int, ultimo: int):
+        conta.historico.reapontar(FonteSQLite(self, conta.numero, n), n, ultimo, self._cache)
+    
+    def registrar_cliente(self, cliente: PessoaFisica):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO clientes (tipo, nome, data_nascimento, cpf, logradouro, "
+                "numero, bairro, cidade, uf, cep) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._linha_cliente(cliente))
+    
+    def registrar_conta(self, conta: Conta):
+        # Gravada em segundo plano, a conta já pode ter movimentos: as
+        # linhas deles vão junto, coerentes com o saldo
+        linha = self._linha_conta(conta)
+        with self._conn:
+            self._conn.execute(
+                f"INSERT INTO contas ({self.COLUNAS_CONTA}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linha)
+            self._conn.executemany(
+                "INSERT INTO transacoes (conta, seq, tipo, valor_centavos, data, instante) "
+                "VALUES (?, ?, ?, ?, ?, ?)", self._linhas_historico(conta, 0, linha[-2]))
+    
+    def registrar_movimentos(self, movimentos: Sequence[Movimento]):
+        # Idempotente: um snapshot gravado em segundo plano pode já ter
+        # levado estas linhas (e um estado mais novo da conta)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO transacoes (conta, seq, tipo, valor_centavos, data, instante) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((m.conta.numero, m.n, m.registro.tipo, m.registro.valor.centavos,
+                  m.registro.data, self._instante(m.registro.data)) for m in movimentos))
+            # Só o estado final de cada conta precisa ir para a tabela contas
+            finais = {m.conta.numero: m for m in movimentos}
+            self._conn.executemany(
+                "UPDATE contas SET saldo_centavos = ?, n_transacoes = ?, ultimo_epoch = ? "
+                "WHERE numero = ? AND n_transacoes < ?",
+                ((m.saldo.centavos, m.n, data_para_epoch(m.registro.data), numero, m.n)
+                 for numero, m in finais.items()))
+        if self._cache is not None:
+            # Linhas já gravadas: o histórico em memória volta a ser só a fonte
+            for m in finais.values():
+                self._reapontar(m.conta, m.n, data_para_epoch(m.registro.data))
+    
+    def fechar(self):
+        self._conn.close()
+
+
+class ColunaMapeada(SequenceABC):
+    """Coluna de histórico lida direto de um arquivo mapeado (mmap), sem cópia.
+    
+    `base` é uma memoryview de int64 (com passo) sobre os registros do
+    arquivo; o que for anexado depois vai para `resto`, um array comum.
+    Na coluna de tipos, `traducao` leva os códigos gravados aos do processo.
+    Aceita as operações que o Historico faz nas suas colunas: índice,
+    iteração, append/extend e remoção de prefixo (descarte).
+    """
+    __slots__ = ("_base", "_resto", "_traducao")
+    
+    def __init__(self, base: memoryview, resto: Union[array, bytearray],
+                 traducao: Optional[bytes] = None):
+        self._base = base
+        self._resto = resto
+        self._traducao = traducao
+    
+    def __len__(self) -> int:
+        return len(self._base) + len(self._resto)
+    
+    def __getitem__(self, i: int) -> int:
+        n = len(self._base)
+        if i < 0:
+            i += n + len(self._resto)
+            if i < 0:
+                raise IndexError("índice fora da coluna")
+        if i >= n:
+            return self._resto[i - n]
+        valor = self._base[i]
+        return valor if self._traducao is None else self._traducao[valor]
+    
+    def __iter__(self) -> Iterator[int]:
+        base = self._base if self._traducao is None else map(self._traducao.__getitem__, self._base)
+        return chain(base, self._resto)
+    
+    def __delitem__(self, fatia: slice):
+        inicio, fim, passo = fatia.indices(len(self))
+        if inicio != 0 or passo != 1:
+            raise ValueError("ColunaMapeada só remove prefixos")
+        n = len(self._base)
+        del self._resto[:max(0, fim - n)]
+        # Sem nenhuma referência ao mapa, o arquivo é desmapeado
+        self._base = self._base[fim:] if fim < n else _SEM_REGISTROS
+    
+    def append(self, valor: int):
+        self._resto.append(valor)
+    
+    def extend(self, valores: Iterable[int]):
+        self._resto.extend(valores)
+
+
+_SEM_REGISTROS = memoryview(b"").cast('q')
+
+
+class ArquivoHistoricos:
+    """Históricos em arquivos de registros fixos, um por conta, lidos via mmap.
+    
+    Cada registro tem 32 bytes: instante, centavos, código do tipo e número
+    da contraparte (0 se não houver), em int64 little-endian; mapeado, o
+    arquivo vira quatro colunas (memoryview com passo) sem interpretar nem
+    alocar nada por linha. Os arquivos ficam em <dir>/<numero % 256>/
+    <numero>.hist, com um cabeçalho do tamanho de um registro; os nomes dos
+    tipos ficam em tipos.json, na ordem dos códigos gravados, e em
+    estado.bin o (tamanho, último instante) de cada arquivo da última vez
+    que todos foram conferidos, para a carga não precisar abrir um por um.
+    """
+    
+    ASSINATURA = b"PYBH"
+    VERSAO = 1
+    CABECALHO = struct.Struct("<4sHH24x")  # assinatura, versão, tamanho do registro
+    REGISTRO = struct.Struct("<qqqq")      # instante, centavos, tipo, contraparte
+    CAMPOS = 4
+    ESTADO = struct.Struct("<4sHHQ")       # assinatura, versão, reservado, contas
+    
+    def __init__(self, diretorio: Path = HISTORICOS_DIR):
+        self._diretorio = Path(diretorio)
+        self._arq_tipos = self._diretorio / "tipos.json"
+        self._arq_estado = self._diretorio / "estado.bin"
+        self._trava = threading.Lock()
+        self._diretorio.mkdir(parents=True, exist_ok=True)
+        if self._arq_tipos.exists():
+            with open(self._arq_tipos, 'r', encoding='utf-8') as f:
+                self._tipos: List[str] = json.load(f)
+        else:
+            self._tipos = list(TIPOS_TRANSACAO)
+            BancoDados._escrever_atomico(self._arq_tipos, self._tipos)
+        self._gravados = {codigo_tipo(tipo): i for i, tipo in enumerate(self._tipos)}
+    
+    def caminho(self, numero: int) -> Path:
+        return self._diretorio / f"{numero % 256:02x}" / f"{numero}.hist"
+    
+    def _codigo_gravado(self, codigo: int) -> int:
+        gravado = self._gravados.get(codigo)
+        if gravado is None:
+            with self._trava:
+                gravado = self._gravados.get(codigo)
+                if gravado is None:
+                    gravado = len(self._tipos)
+                    self._tipos.append(TIPOS_TRANSACAO[codigo])
+                    BancoDados._escrever_atomico(self._arq_tipos, self._tipos)
+                    self._gravados[codigo] = gravado
+        return gravado
+    
+    def _traducao(self) -> Optional[bytes]:
+        """Tabela código gravado -> código do processo, ou None se forem iguais."""
+        traducao = bytearray(range(256))
+        for codigo, gravado in self._gravados.items():
+            traducao[gravado] = codigo
+        return None if all(c == g for c, g in self._gravados.items()) else bytes(traducao)
+    
+    def gravar(self, numero: int, inicio: int,
+               registros: Iterable[Tuple[int, int, int, int]]):
+        """Grava (instante, centavos, código, contraparte) a partir do registro `inicio`.
+        
+        A posição é explícita, não o fim do arquivo: regravar um trecho
+        (ex.: ao completar um arquivo atrasado) não duplica nada. O arquivo
+        nunca é truncado aqui, pois pode estar mapeado; sobras além do
+        histórico são cortadas por conferir() na carga.
+        """
+        empacotar = self.REGISTRO.pack
+        dados = b"".join(empacotar(epoch, centavos, self._codigo_gravado(codigo), contraparte)
+                         for epoch, centavos, codigo, contraparte in registros)
+        caminho = self.caminho(numero)
+        if inicio == 0:
+            dados = self.CABECALHO.pack(self.ASSINATURA, self.VERSAO, self.REGISTRO.size) + dados
+            posicao = 0
+        else:
+            posicao = self.CABECALHO.size + inicio * self.REGISTRO.size
+        try:
+            f = open(caminho, 'r+b')
+        except FileNotFoundError:
+            caminho.parent.mkdir(exist_ok=True)
+            f = open(caminho, 'w+b')
+        with f:
+            f.seek(posicao)
+            f.write(dados)
+    
+    def conferir(self, numero: int, n: int, ultimo_epoch: int, cortar: bool = False) -> int:
+        """Quantos dos `n` registros esperados o arquivo já tem certos.
+        
+        Com `cortar`, registros além de `n` (nunca confirmados no backend)
+        são cortados: só na carga, antes de mapear qualquer coisa, pois
+        tocar uma página mapeada além do novo fim derruba o processo
+        (SIGBUS) sem exceção. Se o último esperado não bate com
+        `ultimo_epoch`, o arquivo é de outra história e nada se aproveita.
+        """
+        caminho = self.caminho(numero)
+        try:
+            f = open(caminho, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            cabecalho = f.read(self.CABECALHO.size)
+            if (len(cabecalho) < self.CABECALHO.size
+                    or self.CABECALHO.unpack(cabecalho) != (self.ASSINATURA, self.VERSAO, self.REGISTRO.size)):
+                return 0
+            gravados = (os.fstat(f.fileno()).st_size - self.CABECALHO.size) // self.REGISTRO.size
+            if gravados < n or not n:
+                return gravados if n else 0
+            f.seek(self.CABECALHO.size + (n - 1) * self.REGISTRO.size)
+            if struct.unpack("<q", f.read(8))[0] != ultimo_epoch:
+                return 0
+        if gravados > n and cortar:
+            os.truncate(caminho, self.CABECALHO.size + n * self.REGISTRO.size)
+        return n
+    
+    def gravar_estado(self, estado: Iterable[Tuple[int, int, int]]):
+        """Anota (número, tamanho, último instante) dos arquivos sabidamente em dia."""
+        colunas = array('q', chain.from_iterable(estado))
+        temporario = self._arq_estado.with_suffix(".tmp")
+        with open(temporario, 'wb') as f:
+            f.write(self.ESTADO.pack(self.ASSINATURA, self.VERSAO, 0, len(colunas) // 3))
+            _little_endian(colunas).tofile(f)
+        os.replace(temporario, self._arq_estado)
+    
+    def ler_estado(self) -> Dict[int, Tuple[int, int]]:
+        """Número -> (tamanho, último instante) anotados; vazio se ausente ou ilegível."""
+        try:
+            with open(self._arq_estado, 'rb') as f:
+                assinatura, versao, _, contas = self.ESTADO.unpack(f.read(self.ESTADO.size))
+                colunas = array('q', f.read())
+        except (FileNotFoundError, struct.error):
+            return {}
+        if assinatura != self.ASSINATURA or versao != self.VERSAO or len(colunas) != contas * 3:
+            return {}
+        _little_endian(colunas)
+        return dict(zip(colunas[0::3], zip(colunas[1::3], colunas[2::3])))
+    
+    def mapear(self, numero: int, n: int) -> Tuple[memoryview, memoryview, memoryview, memoryview]:
+        """Colunas (instante, centavos, tipo gravado, contraparte) dos `n` primeiros registros.
+        
+        São visões do arquivo mapeado, sem cópia: só as páginas tocadas
+        entram na memória, e o mapa é desfeito quando a última visão some.
+        """
+        with open(self.caminho(numero), 'rb') as f:
+            mapa = mmap.mmap(f.fileno(), self.CABECALHO.size + n * self.REGISTRO.size,
+                             access=mmap.ACCESS_READ)
+        assinatura, versao, largura = self.CABECALHO.unpack_from(mapa)
+        if assinatura != self.ASSINATURA or largura != self.REGISTRO.size:
+            raise ValueError(f"{self.caminho(numero)} não é um histórico do PyBank")
+        if versao > self.VERSAO:
+            raise ValueError(f"Histórico na versão {versao}; este PyBank lê até a {self.VERSAO}")
+        registros = memoryview(mapa)[self.CABECALHO.size:]
+        if sys.byteorder != "little":
+            registros = memoryview(_little_endian(array('q', bytes(registros))))
+        registros = registros.cast('q')
+        return tuple(registros[campo::self.CAMPOS] for campo in range(self.CAMPOS))
+    
+    def historico(self, numero: int, n: int) -> Historico:
+        """Historico cujas colunas são os `n` primeiros registros mapeados."""
+        epochs, centavos, tipos, _ = self.mapear(numero, n)
+        h = Historico()
+        h._epochs = ColunaMapeada(epochs, array('q'))
+        h._centavos = ColunaMapeada(centavos, array('q'))
+        h._tipos = ColunaMapeada(tipos, bytearray(), self._traducao())
+        return h
+
+
+class FonteMapeada(FonteHistorico):
+    """Histórico persistido nos primeiros registros do arquivo da conta."""
+    __slots__ = ("_arquivo", "_numero", "_tamanho")
+    
+    def __init__(self, arquivo: ArquivoHistoricos, numero: int, tamanho: int):
+        self._arquivo = arquivo
+        self._numero = numero
+        self._tamanho = tamanho
+    
+    def carregar_historico(self) -> Historico:
+        return self._arquivo.historico(self._numero, self._tamanho)
+    
+    def carregar(self) -> List[dict]:
+        return [t.to_dict() for t in self.carregar_historico()]
+
+
+class ArmazenamentoMapeado(Armazenamento):
+    """Um backend qualquer com os históricos lidos de ArquivoHistoricos.
+    
+    O backend continua sendo a fonte da verdade (snapshot + journal); cada
+    grupo de movimentos confirmado nele é então anexado aos arquivos das
+    contas, já com a contraparte das transferências. Na carga e depois de
+    cada snapshot, os históricos passam a apontar para os arquivos: extrato,
+    filtros e análises fatiam as colunas mapeadas e a memória residente é
+    só a das páginas tocadas. Um arquivo atrasado (primeira carga, ou queda
+    entre o backend e o arquivo) é completado a partir do backend; escrito
+    sem fsync, ele se refaz sozinho.
+    """
+    
+    def __init__(self, base: Armazenamento, diretorio: Path = HISTORICOS_DIR,
+                 memoria_max: int = HISTORICO_MEMORIA_MAX,
+                 mapeados_max: int = HISTORICOS_MAPEADOS_MAX):
+        self._base = base
+        self._arquivo = ArquivoHistoricos(diretorio)
+        self._cache = CacheHistoricos(memoria_max, mapeados_max)
+        # (tamanho, último instante) já nos arquivos das contas movimentadas
+        # desde o último snapshot; o histórico em memória pode estar à frente
+        self._escritos: Dict[int, Tuple[int, int]] = {}
+    
+    @property
+    def arquivo(self) -> ArquivoHistoricos:
+        return self._arquivo
+    
+    def carregar(self) -> Tuple[dict, List[Conta]]:
+        clientes, contas = self._base.carregar()
+        anotados = self._arquivo.ler_estado()
+        estado = []
+        conferidos = 0
+        for conta in contas:
+            anotado = anotados.get(conta.numero)
+            n, ultimo = self._sincronizar(conta, anotado, cortar=True)
+            if n:
+                conferidos += (n, ultimo) != anotado
+                conta._historico = Historico.sob_demanda(
+                    FonteMapeada(self._arquivo, conta.numero, n), n, ultimo, self._cache)
+                estado.append((conta.numero, n, ultimo))
+        if conferidos:
+            self._arquivo.gravar_estado(estado)
+        return clientes, contas
+    
+    def salvar(self, clientes: dict, contas: Iterable[Conta]):
+        contas = list(contas)
+        # O que já está nos arquivos dispensa conferência. Precisa ser visto
+        # antes do backend reapontar os históricos.
+        em_dia = [self._em_dia(c) for c in contas]
+        self._escritos.clear()
+        self._base.salvar(clientes, contas)
+        estado = []
+        for conta, anotado in zip(contas, em_dia):
+            n, ultimo = self._sincronizar(conta, anotado)
+            conta.historico.reapontar(FonteMapeada(self._arquivo, conta.numero, n), n,
+                                      ultimo, self._cache)
+            # Conferidos agora podem ter sobras que não se cortam com o
+            # arquivo mapeado: ficam fora do estado e a próxima carga corta
+            if n and anotado is not None:
+                estado.append((conta.numero, n, ultimo))
+        self._arquivo.gravar_estado(estado)
+    
+    def _em_dia(self, conta: Conta) -> Optional[Tuple[int, int]]:
+        escrito = self._escritos.get(conta.numero)
+        if escrito is not None:
+            return escrito
+        h = conta.historico
+        origem = h._origem
+        if isinstance(origem, FonteMapeada) and origem._arquivo is self._arquivo:
+            return h._n_fonte, h._ultimo_epoch_fonte
+        return None
+    
+    def _sincronizar(self, conta: Conta, anotado: Optional[Tuple[int, int]] = None,
+                     cortar: bool = False) -> Tuple[int, int]:
+        """Deixa o arquivo da conta igual ao histórico; devolve (tamanho, último instante).
+        
+        Se o histórico bate com o `anotado` (estado já sabido do arquivo), o
+        arquivo nem é aberto. Sobras além do histórico só são cortadas com
+        `cortar` (na carga, ver ArquivoHistoricos.conferir); num arquivo de
+        histórico vazio, ficam para o primeiro movimento e a próxima carga.
+        """
+        h = conta.historico
+        n = len(h)
+        ultimo = h.ultimo_epoch() if n else 0
+        if not n or (n, ultimo) == anotado:
+            return n, ultimo
+        certos = self._arquivo.conferir(conta.numero, n, ultimo, cortar)
+        if certos < n:
+            epochs, centavos, tipos = array('q'), array('q'), bytearray()
+            h.copiar_colunas(epochs, centavos, tipos)
+            self._arquivo.gravar(conta.numero, certos,
+                                 zip(epochs[certos:], centavos[certos:], tipos[certos:], repeat(0)))
+        return n, ultimo
+    
+    def registrar_cliente(self, cliente: PessoaFisica):
+        self._base.registrar_cliente(cliente)
+    
+    def registrar_conta(self, conta: Conta):
+        self._base.registrar_conta(conta)
+    
+    def registrar_movimentos(self, movimentos: Sequence[Movimento]):
+        self._base.registrar_movimentos(movimentos)
+        for m in movimentos:
+            epoch = m.conta.historico.epoch(m.n - 1)
+            self._arquivo.gravar(m.conta.numero, m.n - 1, [(
+                epoch, m.registro.valor.centavos, codigo_tipo(m.registro.tipo), m.contraparte or 0)])
+            self._escritos[m.conta.numero] = (m.n, epoch)
+    
+    def precisa_snapshot(self) -> bool:
+        return self._base.precisa_snapshot()
+    
+    def sincronizar(self):
+        self._base.sincronizar()  # os arquivos de histórico se refazem a partir do backend
+    
+    def fechar(self):
+        self._base.fechar()
+
+
+class GravacaoAgrupada(Armazenamento):
+    """Um backend qualquer gravado por uma thread em segundo plano (group commit).
+    
+    registrar_* e salvar só enfileiram. A gravadora junta o que chegar numa
+    janela (`janela` segundos ou `lote` registros, o que vier primeiro),
+    repassa tudo ao backend na ordem de chegada e faz um único sincronizar()
+    (fsync) pelo grupo. Snapshots (salvar) usam cópias do cadastro feitas
+    na hora do pedido e, se o backend permitir (COMPACTACAO_CONCORRENTE),
+    rodam numa thread à parte sem parar os grupos; senão, na própria
+    gravadora, na sua vez da fila.
+    
+    Com confirmacao="duravel", aguardar() segura quem registrou até o
+    fsync do seu grupo; com "memoria" volta na hora, e uma queda perde no
+    máximo o que ainda estava na fila. Uma falha de gravação encerra a
+    gravadora e é relançada para quem aguardar ou registrar depois.
+    """
+    
+    CONFIRMACOES = ("duravel", "memoria")
+    
+    def __init__(self, base: Armazenamento, confirmacao: str = CONFIRMACAO,
+                 janela: float = GRAVACAO_JANELA, lote: int = GRAVACAO_LOTE):
+        if confirmacao not in self.CONFIRMACOES:
+            raise ValueError(f"Confirmação desconhecida: {confirmacao}")
+        self._base = base
+        self._duravel = confirmacao == "duravel"
+        self._janela = janela
+        self._lote = lote
+        self._fila: deque = deque()
+        self._cond = threading.Condition()
+        self._enfileirados = 0  # número de ordem do último registro enfileirado
+        self._gravados = 0      # ... e do último já gravado e sincronizado
+        self._erro: Optional[BaseException] = None
+        self._encerrando = False
+        self._snapshot_pendente = False
+        self._compactacao: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self._gravadora = threading.Thread(target=self._gravar, name="pybank-gravadora", daemon=True)
+        self._gravadora.start()
+        atexit.register(self.fechar)  # a fila pendente vai para o disco na saída
+    
+    @property
+    def base(self) -> Armazenamento:
+        return self._base
+    
+    def carregar(self) -> Tuple[dict, List[Conta]]:
+        return self._base.carregar()
+    
+    def salvar(self, clientes: dict, contas: Iterable[Conta]):
+        self._snapshot_pendente = True
+        self._enfileirar(self._salvar_base, dict(clientes), list(contas))
+    
+    def _salvar_base(self, clientes: dict, contas: List[Conta]):
+        if self._compactacao is not None:
+            self._compactacao.join()  # um snapshot por vez
+        if not self._base.COMPACTACAO_CONCORRENTE:
+            self._compactar(clientes, contas)
+            return
+        self._compactacao = threading.Thread(target=self._compactar, args=(clientes, contas),
+                                             name="pybank-compactacao", daemon=True)
+        self._compactacao.start()
+    
+    def _compactar(self, clientes: dict, contas: List[Conta]):
+        try:
+            self._base.salvar(clientes, contas)
+        except BaseException as e:
+            with self._cond:
+                self._erro = e
+                self._cond.notify_all()
+        finally:
+            self._snapshot_pendente = False
+    
+    def registrar_cliente(self, cliente: PessoaFisica):
+        self._enfileirar(self._base.registrar_cliente, cliente)
+    
+    def registrar_conta(self, conta: Conta):
+        self._enfileirar(self._base.registrar_conta, conta)
+    
+    def registrar_movimentos(self, movimentos: Sequence[Movimento]):
+        self._enfileirar(self._base.registrar_movimentos, list(movimentos))
+    
+    def precisa_snapshot(self) -> bool:
+        # Um snapshot por vez: os movimentos que chegarem até ele rodar já vão junto
+        return not self._snapshot_pendente and self._base.precisa_snapshot()
+    
+    def _enfileirar(self, funcao: Callable, *args):
+        with self._cond:
+            if self._erro is not None:
+                raise self._erro
+            if self._encerrando:
+                raise RuntimeError("Gravação encerrada")
+            self._enfileirados += 1
+            self._fila.append((funcao, args))
+            self._local.ordem = self._enfileirados
+            self._cond.notify_all()
+    
+    def aguardar(self, duravel: Optional[bool] = None):
+        """Com confirmação durável, espera o fsync do último registro desta thread."""
+        if not (self._duravel if duravel is None else duravel):
+            return
+        ordem = getattr(self._local, "ordem", 0)
+        with self._cond:
+            while self._gravados < ordem and self._erro is None:
+                self._cond.wait()
+            if self._gravados < ordem:
+                raise self._erro
+    
+    def sincronizar(self):
+        """Espera tudo o que foi enfileirado (por qualquer thread) chegar ao disco."""
+        with self._cond:
+            ordem = self._enfileirados
+            while self._gravados < ordem and self._erro is None:
+                self._cond.wait()
+            if self._gravados < ordem:
+                raise self._erro
+    
+    def _gravar(self):
+        import time
+        
+        while True:
+            with self._cond:
+                while not self._fila and not self._encerrando:
+                    self._cond.wait()
+                if not self._fila:
+                    return
+                prazo = time.monotonic() + self._janela
+                while len(self._fila) < self._lote and not self._encerrando:
+                    resta = prazo - time.monotonic()
+                    if resta <= 0:
+                        break
+                    self._cond.wait(resta)
+                grupo = [self._fila.popleft() for _ in range(min(len(self._fila), self._lote))]
+            try:
+                for funcao, args in grupo:
+                    funcao(*args)
+                self._base.sincronizar()
+            except BaseException as e:
+                with self._cond:
+                    self._erro = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                if self._erro is not None:  # falha na compactação
+                    return
+                self._gravados += len(grupo)
+                self._cond.notify_all()
+    
+    def fechar(self):
+        """Grava o que estiver na fila, encerra a gravadora e fecha o backend."""
+        with self._cond:
+            if self._encerrando:
+                return
+            self._encerrando = True
+            self._cond.notify_all()
+        atexit.unregister(self.fechar)
+        self._gravadora.join()
+        if self._compactacao is not None:
+            self._compactacao.join()
+        self._base.fechar()
+        if self._erro is not None:
+            raise self._erro
+
+
+def criar_armazenamento(tipo: str = ARMAZENAMENTO, diretorio: Path = DATA_DIR,
+                        progresso: Optional[ProgressoCarga] = None,
+                        sob_demanda: bool = HISTORICO_SOB_DEMANDA,
+                        mapeado: bool = HISTORICO_MAPEADO,
+                        agrupado: bool = GRAVACAO_AGRUPADA,
+                        confirmacao: str = CONFIRMACAO) -> Armazenamento:
+    """Instancia o backend configurado ('json', 'binario', 'fragmentado' ou 'sqlite').
+    
+    Com `mapeado`, os históricos são lidos dos arquivos de <diretorio>/
+    historicos e o backend é carregado sob demanda: os dele só servem para
+    completar arquivos atrasados. Com `agrupado`, a persistência passa a
+    uma thread de group commit (GravacaoAgrupada) com a `confirmacao` dada.
+    """
+    sob_demanda = sob_demanda or mapeado
+    if tipo == "json":
+        base = BancoDados(diretorio, progresso=progresso, sob_demanda=sob_demanda)
+    elif tipo == "binario":
+        base = BancoDadosBinario(diretorio, progresso=progresso, sob_demanda=sob_demanda)
+    elif tipo == "fragmentado":
+        base = BancoDadosFragmentado(diretorio, progresso=progresso)
+    elif tipo == "sqlite":
+        base = BancoDadosSQLite(Path(diretorio) / SQLITE_FILE.name, sob_demanda=sob_demanda)
+    else:
+        raise ValueError(f"Armazenamento desconhecido: {tipo}")
+    if mapeado:
+        base = ArmazenamentoMapeado(base, Path(diretorio) / HISTORICOS_DIR.name)
+    if agrupado:
+        return GravacaoAgrupada(base, confirmacao)
+    return base
+
+
+def migrar_json_para_sqlite(diretorio: Path = DATA_DIR,
+                            destino: Optional[Path] = None) -> Tuple[int, int]:
+    """Converte os arquivos JSON (snapshot + journal) para o banco SQLite."""
+    clientes, contas = BancoDados(diretorio).carregar()
+    sqlite = BancoDadosSQLite(destino or Path(diretorio) / SQLITE_FILE.name)
+    try:
+        sqlite.salvar(clientes, contas)
+    finally:
+        sqlite.fechar()
+    return len(clientes), len(contas)
+
+
+FORMATOS_SNAPSHOT = {"json": BancoDados, "binario": BancoDadosBinario,
+                     "fragmentado": BancoDadosFragmentado}
+
+
+def converter_snapshot(formato: str, diretorio: Path = DATA_DIR) -> Tuple[int, int]:
+    """Regrava o snapshot do diretório em 'json', 'binario' ou 'fragmentado'.
+    
+    A origem é o snapshot mais recente entre os dos outros formatos. O
+    journal fica intacto: reaplicá-lo sobre o snapshot novo, que já o
+    incorpora, não muda nada, e o formato de origem continua válido.
+    """
+    if formato not in FORMATOS_SNAPSHOT:
+        raise ValueError(f"Formato desconhecido: {formato}")
+    origens = [(cls(diretorio, sob_demanda=False), nome) for nome, cls in FORMATOS_SNAPSHOT.items()
+               if nome != formato]
+    origens = [(origem.instante_snapshot(), nome, origem) for origem, nome in origens]
+    origens = [o for o in origens if o[0] is not None]
+    if not origens:
+        raise FileNotFoundError(f"Nada para converter: nenhum snapshot em outro formato em {diretorio}")
+    _, _, origem = max(origens)
+    clientes, contas = origem.carregar()
+    FORMATOS_SNAPSHOT[formato](diretorio, journal=False, sob_demanda=False).salvar(clientes, contas)
+    return len(clientes), len(contas)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SERVIÇO BANCÁRIO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class EstatisticasBanco(ObservadorContas):
+    """Agregados do banco mantidos incrementalmente a cada evento de conta.
+    
+    A carga inicial soma cada conta uma única vez (via conta_adicionada);
+    a partir daí cada movimento confirmado ajusta os totais em O(1).
+    """
+    
+    def __init__(self):
+        self.total_contas = 0
+        self.contas_ativas = 0
+        self.total_saldo = Dinheiro()
+        self.total_transacoes = 0
+    
+    def movimento(self, conta, registro, delta):
+        self.total_saldo += delta
+        self.total_transacoes += 1
+    
+    def conta_adicionada(self, conta):
+        self.total_contas += 1
+        self.contas_ativas += conta.ativa
+        self.total_saldo += conta.saldo
+        self.total_transacoes += len(conta.historico)
+    
+    def conta_removida(self, conta):
+        self.total_contas -= 1
+        self.contas_ativas -= conta.ativa
+        self.total_saldo -= conta.saldo
+        self.total_transacoes -= len(conta.historico)
+    
+    def status_alterado(self, conta):
+        self.contas_ativas += 1 if conta.ativa else -1
+    
+    @property
+    def media_saldo(self) -> Dinheiro:
+        if not self.total_contas:
+            return Dinheiro()
+        return self.total_saldo.dividido(self.total_contas)
+
+
+class FeedRecente(ObservadorContas):
+    """Últimas transações do banco, em ordem da mais recente para a mais antiga.
+    
+    Cada movimento confirmado entra no início de uma fila limitada. A
+    reconstrução faz um merge de k vias sobre os históricos (já em ordem
+    cronológica) percorridos de trás para frente e para após `limite`
+    itens, sem ordenar o histórico inteiro.
+    """
+    
+    def __init__(self, limite: int = RECENTES_LIMITE):
+        self._limite = limite
+        self._itens: Optional[deque] = deque(maxlen=limite)
+        self._pendente: Optional[Iterable[Conta]] = None
+    
+    @staticmethod
+    def _do_mais_recente(conta: Conta) -> Iterator[Tuple[int, int, Conta]]:
+        historico = conta.historico
+        ultimo = len(historico) - 1
+        # O primeiro item não materializa históricos carregados sob demanda
+        yield historico.ultimo_epoch(), ultimo, conta
+        for i in range(ultimo - 1, -1, -1):
+            yield historico.epoch(i), i, conta
+    
+    def reconstruir_depois(self, contas: Iterable[Conta]):
+        """Adia a reconstrução para a primeira consulta (evita ler históricos
+        sob demanda em execuções que nunca exibem o feed)."""
+        self._itens = None
+        self._pendente = contas
+    
+    def reconstruir(self, contas: Iterable[Conta]):
+        self._pendente = None
+        fontes = [self._do_mais_recente(conta) for conta in contas if len(conta.historico)]
+        ordenadas = heapq.merge(*fontes, key=lambda item: item[0], reverse=True)
+        self._itens = deque(((conta.historico.registro(i), conta)
+                             for _, i, conta in islice(ordenadas, self._limite)),
+                            maxlen=self._limite)
+    
+    def ultimas(self, n: int) -> List[Tuple[RegistroTransacao, Conta]]:
+        if self._itens is None:
+            self.reconstruir(self._pendente)
+        return list(islice(self._itens, n))
+    
+    def movimento(self, conta, registro, delta):
+        if self._itens is None:
+            return  # a reconstrução adiada já verá este registro no histórico
+        if len(self._itens) == self._limite:
+            self._itens.pop()
+        self._itens.appendleft((registro, conta))
+    
+    def conta_removida(self, conta):
+        if self._itens is None:
+            return
+        self._itens = deque((item for item in self._itens if item[1] is not conta),
+                            maxlen=self._limite)
+
+
+class ListaOrdenada:
+    """Lista ordenada em blocos, com a posição de cada item em O(log n).
+    
+    Os itens ficam em blocos ordenados de até 2 * CARGA itens; `_maximos`
+    guarda o último item de cada bloco para achar o bloco por bisect, e
+    uma árvore de Fenwick sobre os tamanhos dos blocos soma quantos itens
+    vêm antes dele. Inserir e remover custam O(log n) mais o deslocamento
+    dentro de um bloco, limitado por CARGA. A árvore é remontada (O(n /
+    CARGA)) só quando blocos são divididos ou esvaziados.
+    """
+    CARGA = 512
+    
+    def __init__(self, itens: Iterable = ()):
+        ordenados = sorted(itens)
+        self._blocos = [ordenados[i:i + self.CARGA] for i in range(0, len(ordenados), self.CARGA)]
+        self._maximos = [bloco[-1] for bloco in self._blocos]
+        self._tamanho = len(ordenados)
+        self._arvore: Optional[List[int]] = None
+    
+    def __len__(self) -> int:
+        return self._tamanho
+    
+    def __iter__(self) -> Iterator:
+        for bloco in self._blocos:
+            yield from bloco
+    
+    def __reversed__(self) -> Iterator:
+        for bloco in reversed(self._blocos):
+            yield from reversed(bloco)
+    
+    def _montar_arvore(self) -> List[int]:
+        arvore = [0] + [len(bloco) for bloco in self._blocos]
+        for i in range(1, len(arvore)):
+            pai = i + (i & -i)
+            if pai < len(arvore):
+                arvore[pai] += arvore[i]
+        self._arvore = arvore
+        return arvore
+    
+    def _somar(self, bloco: int, delta: int):
+        arvore = self._arvore
+        if arvore is None:
+            return
+        i = bloco + 1
+        while i < len(arvore):
+            arvore[i] += delta
+            i += i & -i
+    
+    def _antes(self, bloco: int) -> int:
+        """Quantidade de itens nos blocos anteriores a `bloco`."""
+        arvore = self._arvore or self._montar_arvore()
+        total = 0
+        while bloco > 0:
+            total += arvore[bloco]
+            bloco -= bloco & -bloco
+        return total
+    
+    def _localizar(self, item) -> Tuple[int, int]:
+        i = bisect_left(self._maximos, item)
+        if i < len(self._blocos):
+            j = bisect_left(self._blocos[i], item)
+            if self._blocos[i][j] == item:
+                return i, j
+        raise ValueError(f"{item!r} não está na lista")
+    
+    def adicionar(self, item):
+        if not self._blocos:
+            self._blocos.append([item])
+            self._maximos.append(item)
+            self._tamanho = 1
+            self._arvore = None
+            return
+        i = bisect_left(self._maximos, item)
+        if i == len(self._blocos):
+            i -= 1
+            self._blocos[i].append(item)
+            self._maximos[i] = item
+        else:
+            insort(self._blocos[i], item)
+        self._tamanho += 1
+        bloco = self._blocos[i]
+        if len(bloco) > 2 * self.CARGA:
+            self._blocos[i:i + 1] = [bloco[:self.CARGA], bloco[self.CARGA:]]
+            self._maximos[i:i + 1] = [bloco[self.CARGA - 1], bloco[-1]]
+            self._arvore = None
+        else:
+            self._somar(i, 1)
+    
+    def remover(self, item):
+        i, j = self._localizar(item)
+        bloco = self._blocos[i]
+        del bloco[j]
+        self._tamanho -= 1
+        if not bloco:
+            del self._blocos[i], self._maximos[i]
+            self._arvore = None
+        else:
+            self._maximos[i] = bloco[-1]
+            self._somar(i, -1)
+    
+    def posicao(self, item) -> int:
+        """Índice (0 = menor) de um item presente na lista."""
+        i, j = self._localizar(item)
+        return self._antes(i) + j
+    
+    def a_partir(self, item) -> Iterator:
+        """Itens maiores ou iguais a `item`, em ordem (o primeiro sai em O(log n))."""
+        i = bisect_left(self._maximos, item)
+        if i < len(self._blocos):
+            bloco = self._blocos[i]
+            yield from islice(bloco, bisect_left(bloco, item), None)
+            for bloco in islice(self._blocos, i + 1, None):
+                yield from bloco
+
+
+class RankingSaldos(ObservadorContas):
+    """Contas ordenadas por saldo: maior primeiro, empate pelo menor número.
+    
+    Cada movimento confirmado troca a chave (-centavos, número) da conta
+    numa ListaOrdenada em O(log n); maiores/menores N e a posição de uma
+    conta saem sem reordenar o banco. Leituras devem segurar a trava
+    de Observadores, como o feed de recentes.
+    """
+    
+    def __init__(self, contas: Iterable[Conta] = ()):
+        self._contas: Dict[int, Conta] = {}
+        self._chaves: Dict[int, Tuple[int, int]] = {}
+        for conta in contas:
+            self._contas[conta.numero] = conta
+            self._chaves[conta.numero] = self._chave(conta)
+        self._ordem = ListaOrdenada(self._chaves.values())
+    
+    @staticmethod
+    def _chave(conta: Conta) -> Tuple[int, int]:
+        return -conta.saldo.centavos, conta.numero
+    
+    def __len__(self) -> int:
+        return len(self._ordem)
+    
+    def maiores(self, n: int) -> List[Conta]:
+        return [self._contas[numero] for _, numero in islice(self._ordem, n)]
+    
+    def menores(self, n: int) -> List[Conta]:
+        return [self._contas[numero] for _, numero in islice(reversed(self._ordem), n)]
+    
+    def posicao(self, conta: Conta) -> int:
+        """Posição da conta no ranking, começando em 1 (maior saldo)."""
+        return self._ordem.posicao(self._chaves[conta.numero]) + 1
+    
+    def movimento(self, conta, registro, delta):
+        nova = self._chave(conta)
+        antiga = self._chaves[conta.numero]
+        if nova != antiga:
+            self._ordem.remover(antiga)
+            self._ordem.adicionar(nova)
+            self._chaves[conta.numero] = nova
+    
+    def conta_adicionada(self, conta):
+        chave = self._chave(conta)
+        self._contas[conta.numero] = conta
+        self._chaves[conta.numero] = chave
+        self._ordem.adicionar(chave)
+    
+    def conta_removida(self, conta):
+        del self._contas[conta.numero]
+        self._ordem.remover(self._chaves.pop(conta.numero))
+
+
+class IndiceContas:
+    """Índices em memória das contas: número → conta e CPF → contas.
+    
+    Toda inclusão e remoção de conta passa por aqui, mantendo os dois
+    mapas e o vínculo com o cliente consistentes; buscas por número,
+    por CPF e checagens de titularidade custam O(1).
+    """
+    
+    def __init__(self, contas: Iterable[Conta] = (),
+                 observador: Optional[ObservadorContas] = None):
+        self._por_numero: Dict[int, Conta] = {}
+        self._por_cpf: Dict[str, Dict[int, Conta]] = {}
+        self._maior = 0  # maior número já indexado (limite das buscas por prefixo)
+        self._observador = observador
+        for conta in contas:
+            self.adicionar(conta)
+    
+    @staticmethod
+    def _cpf(conta: Conta) -> str:
+        return conta.cliente.cpf if isinstance(conta.cliente, PessoaFisica) else ""
+    
+    def adicionar(self, conta: Conta):
+        existente = self._por_numero.get(conta.numero)
+        if existente is not None and existente is not conta:
+            raise ValueError(f"Conta {conta.numero} já indexada")
+        self._por_numero[conta.numero] = conta
+        self._por_cpf.setdefault(self._cpf(conta), {})[conta.numero] = conta
+        self._maior = max(self._maior, conta.numero)
+        conta.cliente.adicionar_conta(conta)
+        if existente is None and self._observador is not None:
+            conta.observador = self._observador
+            self._observador.conta_adicionada(conta)
+    
+    def remover(self, conta: Conta):
+        if self._por_numero.get(conta.numero) is not conta:
+            return
+        del self._por_numero[conta.numero]
+        cpf = self._cpf(conta)
+        do_cliente = self._por_cpf.get(cpf, {})
+        do_cliente.pop(conta.numero, None)
+        if not do_cliente:
+            self._por_cpf.pop(cpf, None)
+        conta.cliente.remover_conta(conta)
+        if self._observador is not None:
+            self._observador.conta_removida(conta)
+            conta.observador = None
+    
+    def buscar(self, numero: int) -> Optional[Conta]:
+        return self._por_numero.get(numero)
+    
+    def do_cpf(self, cpf: str) -> List[Conta]:
+        return list(self._por_cpf.get(cpf, {}).values())
+    
+    def com_prefixo(self, prefixo: int) -> Iterator[Conta]:
+        """Contas cujo número começa com os dígitos de `prefixo` (12, 120-129, 1200-1299...)."""
+        inicio, fim = prefixo, prefixo + 1
+        while 0 < inicio <= self._maior:
+            for numero in range(inicio, min(fim, self._maior + 1)):
+                conta = self._por_numero.get(numero)
+                if conta is not None:
+                    yield conta
+            inicio, fim = inicio * 10, fim * 10
+    
+    def pertence(self, conta: Conta, cpf: str) -> bool:
+        return self._por_cpf.get(cpf, {}).get(conta.numero) is conta
+    
+    @property
+    def contas(self) -> Collection[Conta]:
+        return self._por_numero.values()
+    
+    def __len__(self) -> int:
+        return len(self._por_numero)
+    
+    def __iter__(self) -> Iterator[Conta]:
+        return iter(self._por_numero.values())
+    
+    def __contains__(self, conta: object) -> bool:
+        return isinstance(conta, Conta) and self._por_numero.get(conta.numero) is conta
+
+
+@dataclass
+class Operacao:
+    """Operação de um lote: 'deposito', 'saque' ou 'transferencia'."""
+    tipo: str
+    conta: int
+    valor: Dinheiro
+    destino: Optional[int] = None
+    
+    TIPOS = ("deposito", "saque", "transferencia")
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "Operacao":
+        tipo = str(data["tipo"]).strip().lower()
+        if tipo not in cls.TIPOS:
+            raise ValueError(f"Tipo de operação inválido: {data['tipo']}")
+        destino = data.get("destino")
+        return cls(
+            tipo=tipo,
+            conta=int(data["conta"]),
+            valor=Dinheiro.de_reais(data["valor"]),
+            destino=int(destino) if destino not in (None, "") else None
+        )
+
+
+@dataclass
+class ResultadoOperacao:
+    indice: int
+    sucesso: bool
+    mensagem: str = ""
+    
+    def to_dict(self) -> dict:
+        return {"indice": self.indice, "sucesso": self.sucesso, "mensagem": self.mensagem}
+
+
+_PALAVRA_RE = re.compile(r"[^\W_]+")
+
+
+def _trigramas(palavra: str) -> Set[str]:
+    """Trigramas da palavra com as bordas marcadas, como no pg_trgm."""
+    marcada = f"  {palavra} "
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+
+class IndiceBusca:
+    """Busca de clientes por palavras do nome e por prefixo de CPF.
+    
+    Os nomes são quebrados em palavras sem acento nem caixa ('José' →
+    'jose'). O vocabulário fica numa ListaOrdenada, de onde as palavras
+    com um dado prefixo saem por bisect, e cada palavra aponta para os
+    CPFs que a usam. Numa consulta com várias palavras, os clientes da
+    mais longa são percorridos e as demais conferidas no nome de cada um.
+    
+    Quando os prefixos não bastam, entram palavras parecidas (trigramas
+    em comum): 'slva' acha 'Silva'. Os trigramas indexam só o vocabulário,
+    que cresce bem mais devagar que o número de clientes.
+    """
+    SIMILARIDADE_MIN = 0.3  # fração de trigramas em comum (Jaccard)
+    ESTIMATIVA_MAX = 10_000  # clientes contados ao escolher o termo que guia a busca
+    
+    def __init__(self, clientes: Iterable[Cliente] = ()):
+        self._clientes: Dict[str, PessoaFisica] = {}
+        self._por_palavra: Dict[str, List[str]] = {}  # palavra → CPFs
+        self._trigramas: Dict[str, Set[str]] = {}  # trigrama → palavras
+        self._n_trigramas: Dict[str, int] = {}
+        self._dobradas: Dict[str, str] = {}  # palavra como escrita → dobrada
+        for cliente in clientes:
+            self._indexar(cliente)
+        self._palavras = ListaOrdenada(self._por_palavra)
+        self._cpfs = ListaOrdenada(self._clientes)
+    
+    def __len__(self) -> int:
+        return len(self._clientes)
+    
+    def _dobrar(self, texto: str) -> List[str]:
+        escritas = _PALAVRA_RE.findall(texto)
+        palavras = list(map(self._dobradas.get, escritas))
+        if None in palavras:
+            for i, escrita in enumerate(escritas):
+                if palavras[i] is None:
+                    palavras[i] = self._dobradas[escrita] = dobrar_texto(escrita)
+        return palavras
+    
+    def _indexar(self, cliente: Cliente) -> List[str]:
+        """Registra o cliente; devolve as palavras que entraram no vocabulário."""
+        if not isinstance(cliente, PessoaFisica):
+            return []
+        cpf = cliente.cpf
+        if cpf in self._clientes:
+            return []
+        self._clientes[cpf] = cliente
+        novas = []
+        for palavra in set(self._dobrar(cliente.nome)):
+            cpfs = self._por_palavra.get(palavra)
+            if cpfs is None:
+                cpfs = self._por_palavra[palavra] = []
+                trigramas = _trigramas(palavra)
+                for trigrama in trigramas:
+                    self._trigramas.setdefault(trigrama, set()).add(palavra)
+                self._n_trigramas[palavra] = len(trigramas)
+                novas.append(palavra)
+            cpfs.append(cpf)
+        return novas
+    
+    def adicionar(self, cliente: Cliente):
+        if isinstance(cliente, PessoaFisica) and cliente.cpf not in self._clientes:
+            for palavra in self._indexar(cliente):
+                self._palavras.adicionar(palavra)
+            self._cpfs.adicionar(cliente.cpf)
+    
+    def _com_prefixo(self, lista: ListaOrdenada, prefixo: str) -> Iterator[str]:
+        for item in lista.a_partir(prefixo):
+            if not item.startswith(prefixo):
+                return
+            yield item
+    
+    def _parecidas(self, termo: str) -> List[str]:
+        """Palavras do vocabulário parecidas com o termo (fora as que têm ele
+        como prefixo), da mais para a menos parecida."""
+        if len(termo) < 3:
+            return []
+        trigramas = _trigramas(termo)
+        comuns: Dict[str, int] = {}
+        for trigrama in trigramas:
+            for palavra in self._trigramas.get(trigrama, ()):
+                comuns[palavra] = comuns.get(palavra, 0) + 1
+        pontuadas = []
+        for palavra, k in comuns.items():
+            similaridade = k / (len(trigramas) + self._n_trigramas[palavra] - k)
+            if similaridade >= self.SIMILARIDADE_MIN and not palavra.startswith(termo):
+                pontuadas.append((-similaridade, palavra))
+        pontuadas.sort()
+        return [palavra for _, palavra in pontuadas]
+    
+    def _estimar(self, palavras: Iterable[str]) -> int:
+        """Clientes das palavras, contados até ESTIMATIVA_MAX."""
+        total = 0
+        for palavra in palavras:
+            total += len(self._por_palavra[palavra])
+            if total >= self.ESTIMATIVA_MAX:
+                break
+        return total
+    
+    def _casar(self, termos: List[str], guia: int, palavras: Iterable[str],
+               parecidas: List[Set[str]], vistos: Set[str]) -> Iterator[PessoaFisica]:
+        """Clientes das `palavras` (candidatas ao termo guia) cujo nome também
+        casa os outros termos, por prefixo ou por uma palavra parecida."""
+        outros = [(termo, parecidas[i]) for i, termo in enumerate(termos) if i != guia]
+        for palavra in palavras:
+            for cpf in self._por_palavra[palavra]:
+                if cpf in vistos:
+                    continue
+                cliente = self._clientes[cpf]
+                if outros:
+                    do_nome = self._dobrar(cliente.nome)
+                    if not all(any(p.startswith(termo) or p in aceitas for p in do_nome)
+                               for termo, aceitas in outros):
+                        continue
+                vistos.add(cpf)
+                yield cliente
+    
+    def buscar(self, consulta: str) -> Iterator[PessoaFisica]:
+        """Clientes que casam com a consulta, sem repetição, os melhores antes.
+        
+        Só dígitos (com a pontuação do CPF) buscam por prefixo de CPF; texto
+        busca palavras do nome com cada termo como prefixo e depois as
+        parecidas. Lazy: quem consome decide quantos resultados quer.
+        """
+        digitos = re.sub(r"[.\-/\s]", "", consulta)
+        if digitos.isdigit():
+            for cpf in self._com_prefixo(self._cpfs, digitos):
+                yield self._clientes[cpf]
+            return
+        termos = self._dobrar(consulta)
+        if not termos:
+            return
+        prefixadas = lambda i: self._com_prefixo(self._palavras, termos[i])
+        # Guia = termo com menos clientes; se algum não tem nenhum, só sobram os parecidos
+        estimativas = [self._estimar(prefixadas(i)) for i in range(len(termos))]
+        guia = min(range(len(termos)), key=estimativas.__getitem__)
+        vistos: Set[str] = set()
+        if estimativas[guia]:
+            yield from self._casar(termos, guia, prefixadas(guia), [set()] * len(termos), vistos)
+        parecidas = [self._parecidas(termo) for termo in termos]
+        if not any(parecidas):
+            return
+        estimativas = [estimativas[i] + self._estimar(parecidas[i]) for i in range(len(termos))]
+        guia = min(range(len(termos)), key=estimativas.__getitem__)
+        candidatas: Iterable[str] = parecidas[guia]
+        if any(p for i, p in enumerate(parecidas) if i != guia):
+            # Outro termo pode ter errado: os clientes do guia voltam a concorrer
+            candidatas = chain(prefixadas(guia), candidatas)
+        yield from self._casar(termos, guia, candidatas, [set(p) for p in parecidas], vistos)
+
+
+def _aguardando_gravacao(metodo):
+    """Faz o método do BancoService esperar a gravação do que registrou.
+    
+    A espera (Armazenamento.aguardar) acontece depois do método, já fora
+    das travas de conta e do serviço, para não segurar as outras threads.
+    """
+    @wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        resultado = metodo(self, *args, **kwargs)
+        self._dados.aguardar()
+        return resultado
+    return envolvido
+
+
+class BancoService:
+    """Regras de negócio sobre o índice de contas e o backend de persistência.
+    
+    Seguro para várias threads: cada movimento roda sob as travas das
+    contas envolvidas (em ordem de número, ver travar_contas) e é
+    persistido antes de soltá-las, de modo que o journal recebe os
+    movimentos de uma conta na mesma ordem em que foram aplicados. A
+    escrita no backend e as mudanças de cadastro usam uma trava única,
+    sempre obtida depois das travas de conta; a compactação em snapshot
+    (_confirmar) roda já sem as travas de conta.
+    
+    Com um backend em segundo plano (GravacaoAgrupada), "persistido" quer
+    dizer enfileirado; as operações públicas só retornam depois da
+    confirmação configurada nele.
+    """
+    
+    def __init__(self, armazenamento: Optional[Armazenamento] = None):
+        self._trava = threading.RLock()
+        self._dados = armazenamento or criar_armazenamento()
+        self._clientes, contas = self._dados.carregar()
+        self._estatisticas = EstatisticasBanco()
+        self._recentes = FeedRecente()
+        self._eventos = Observadores(self._estatisticas, self._recentes)
+        self._contas = IndiceContas(contas, self._eventos)
+        self._recentes.reconstruir_depois(self._contas)
+        self._analise: Optional["AnaliseBanco"] = None
+        self._ranking: Optional[RankingSaldos] = None
+        self._busca: Optional[IndiceBusca] = None
+    
+    @property
+    def clientes(self) -> dict:
+        return self._clientes
+    
+    @property
+    def contas(self) -> Collection[Conta]:
+        return self._contas.contas
+    
+    @_aguardando_gravacao
+    def salvar(self):
+        """Grava o estado completo no backend configurado."""
+        self._salvar()
+    
+    def _salvar(self):
+        with self._trava:
+            self._dados.salvar(self._clientes, self._contas)
+    
+    def sincronizar(self):
+        """Espera o que esta thread registrou chegar ao disco, qualquer que seja a confirmação."""
+        self._dados.aguardar(duravel=True)
+    
+    def fechar(self):
+        with self._trava:
+            self._dados.fechar()
+    
+    def _confirmar(self):
+        """Compacta o backend quando ele pedir um snapshot completo; chamar sem travas de conta."""
+        with self._trava:
+            if self._dados.precisa_snapshot():
+                self._salvar()
+    
+    def _persistir(self, movimentos: Sequence[Movimento]):
+        """Registra movimentos já aplicados; chamar com as travas das contas seguras."""
+        with self._trava:
+            self._dados.registrar_movimentos(movimentos)
+    
+    def buscar_cliente(self, cpf: str) -> Optional[Cliente]:
+        return self._clientes.get(re.sub(r'[^0-9]', '', cpf))
+    
+    @_aguardando_gravacao
+    def criar_cliente(self, nome: str, data_nasc: str, cpf: str, 
+                      endereco: Endereco) -> Optional[PessoaFisica]:
+        if not validar_cpf(cpf):
+            msg_erro("CPF inválido! 11 dígitos necessários.")
+            return None
+        cpf_limpo = re.sub(r'[^0-9]', '', cpf)
+        if cpf_limpo in self._clientes:
+            msg_erro("CPF já cadastrado!")
+            return None
+        if not validar_data(data_nasc):
+            msg_erro("Data inválida! Use dd-mm-aaaa")
+            return None
+        
+        with self._trava:
+            if cpf_limpo in self._clientes:
+                msg_erro("CPF já cadastrado!")
+                return None
+            cliente = PessoaFisica(nome, data_nasc, cpf, endereco)
+            self._clientes[cpf_limpo] = cliente
+            if self._busca is not None:
+                self._busca.adicionar(cliente)
+            self._dados.registrar_cliente(cliente)
+            self._confirmar()
+        return cliente
+    
+    @_aguardando_gravacao
+    def criar_conta(self, cpf: str) -> Optional[Conta]:
+        cliente = self.buscar_cliente(cpf)
+        if not cliente:
+            msg_erro("Cliente não encontrado!")
+            return None
+        with self._trava:
+            conta = ContaCorrente(cliente)
+            self._contas.adicionar(conta)
+            self._dados.registrar_conta(conta)
+            self._confirmar()
+        return conta
+    
+    def buscar_conta(self, numero: int) -> Optional[Conta]:
+        return self._contas.buscar(numero)
+    
+    def _indice_busca(self) -> IndiceBusca:
+        """Montado na primeira busca e depois mantido por criar_cliente."""
+        if self._busca is None:
+            self._busca = IndiceBusca(self._clientes.values())
+        return self._busca
+    
+    def buscar_clientes(self, consulta: str = "", inicio: int = 0,
+                        limite: int = BUSCA_RESULTADOS) -> List[Cliente]:
+        """Uma página dos clientes que casam com a consulta por nome ou CPF.
+        
+        Consulta vazia lista todos, na ordem de cadastro.
+        """
+        with self._trava:
+            if consulta.strip():
+                encontrados = self._indice_busca().buscar(consulta)
+            else:
+                encontrados = iter(self._clientes.values())
+            return list(islice(encontrados, inicio, inicio + limite))
+    
+    def buscar_contas(self, consulta: str = "", inicio: int = 0,
+                      limite: int = BUSCA_RESULTADOS) -> List[Conta]:
+        """Uma página das contas que casam com a consulta.
+        
+        Só dígitos trazem primeiro as contas com esse prefixo no número e
+        depois as dos clientes com esse prefixo no CPF; texto traz as contas
+        dos clientes encontrados pelo nome. Consulta vazia lista todas.
+        """
+        with self._trava:
+            return list(islice(self._contas_encontradas(consulta.strip()), inicio, inicio + limite))
+    
+    def _contas_encontradas(self, consulta: str) -> Iterator[Conta]:
+        if not consulta:
+            yield from self._contas.contas
+            return
+        por_numero: Set[int] = set()
+        if consulta.isdigit() and consulta[0] != "0":
+            for conta in self._contas.com_prefixo(int(consulta)):
+                por_numero.add(conta.numero)
+                yield conta
+        for cliente in self._indice_busca().buscar(consulta):
+            for conta in self._contas.do_cpf(cliente.cpf):
+                if conta.numero not in por_numero:
+                    yield conta
+    
+    def contas_do_cliente(self, cpf: str) -> List[Conta]:
+        return self._contas.do_cpf(re.sub(r'[^0-9]', '', cpf))
+    
+    @_aguardando_gravacao
+    def depositar(self, conta: Conta, valor: Dinheiro) -> bool:
+        t = Deposito(valor)
+        with conta.trava:
+            if not conta.cliente.realizar_transacao(conta, t):
+                return False
+            self._persistir([Movimento.capturar(conta)])
+        self._confirmar()
+        return True
+    
+    @_aguardando_gravacao
+    def sacar(self, conta: Conta, valor: Dinheiro) -> bool:
+        t = Saque(valor)
+        with conta.trava:
+            if not conta.cliente.realizar_transacao(conta, t):
+                return False
+            self._persistir([Movimento.capturar(conta)])
+        self._confirmar()
+        return True
+    
+    @_aguardando_gravacao
+    def transferir(self, origem: Conta, destino: Conta, valor: Dinheiro) -> bool:
+        if origem == destino:
+            msg_erro("Contas devem ser diferentes!")
+            return False
+        t = Transferencia(valor, destino)
+        with travar_contas(origem, destino):
+            if not origem.cliente.realizar_transacao(origem, t):
+                return False
+            self._persistir([Movimento.capturar(origem, destino.numero),
+                             Movimento.capturar(destino, origem.numero)])
+        self._confirmar()
+        return True
+    
+    @_aguardando_gravacao
+    def efetivar_reserva(self, conta: Conta, transacao: Transacao):
+        """Debita (e persiste) um valor já bloqueado com Conta.reservar."""
+        with conta.trava:
+            conta.efetivar_reserva(transacao)
+            self._persistir([Movimento.capturar(conta)])
+        self._confirmar()
+    
+    @_aguardando_gravacao
+    def processar_lote(self, operacoes: Iterable[Union[Operacao, dict]]) -> List[ResultadoOperacao]:
+        """Valida e aplica uma sequência de operações com uma única persistência.
+        
+        Cada operação é validada contra o estado corrente (incluindo as
+        anteriores do mesmo lote); as recusadas não interrompem o lote e
+        aparecem no resultado com o motivo.
+        """
+        validas: List[Tuple[int, Operacao]] = []
+        motivos: Dict[int, Optional[str]] = {}
+        for indice, op in enumerate(operacoes):
+            try:
+                validas.append((indice, op if isinstance(op, Operacao) else Operacao.from_dict(op)))
+            except KeyError as e:
+                motivos[indice] = f"Operação inválida: campo {e} ausente"
+            except (TypeError, ValueError) as e:
+                motivos[indice] = f"Operação inválida: {e}"
+        
+        # Todas as contas do lote travadas de uma vez (em ordem) até o
+        # registro no journal; um snapshot pedido por ele roda já sem elas
+        envolvidas = [self._contas.buscar(n) for _, op in validas for n in (op.conta, op.destino)
+                      if n is not None]
+        movimentos: List[Movimento] = []
+        with travar_contas(*(c for c in envolvidas if c is not None)):
+            for indice, op in validas:
+                motivos[indice] = self._aplicar_operacao(op, movimentos)
+            if movimentos:
+                self._persistir(movimentos)
+        if movimentos:
+            self._confirmar()
+        
+        return [ResultadoOperacao(indice, motivo is None, limpar_ansi(motivo or ""))
+                for indice, motivo in sorted(motivos.items())]
+    
+    def _aplicar_operacao(self, op: Operacao, movimentos: List[Movimento]) -> Optional[str]:
+        """Aplica uma operação do lote; devolve o motivo da recusa ou None."""
+        conta = self._contas.buscar(op.conta)
+        if conta is None:
+            return f"Conta {op.conta} não encontrada"
+        
+        if op.tipo == "deposito":
+            motivo = conta.motivo_recusa_deposito(op.valor)
+            if motivo is None:
+                Deposito(op.valor).registrar(conta)
+                movimentos.append(Movimento.capturar(conta))
+            return motivo
+        
+        if op.tipo == "saque":
+            motivo = conta.motivo_recusa_saque(op.valor)
+            if motivo is None:
+                Saque(op.valor).registrar(conta)
+                movimentos.append(Movimento.capturar(conta))
+            return motivo
+        
+        destino = self._contas.buscar(op.destino) if op.destino is not None else None
+        if destino is None:
+            return f"Conta destino {op.destino} não encontrada"
+        if destino is conta:
+            return "Contas devem ser diferentes!"
+        motivo = conta.motivo_recusa_saque(op.valor) or destino.motivo_recusa_deposito(op.valor)
+        if motivo is None:
+            Transferencia(op.valor, destino).registrar(conta)
+            movimentos.append(Movimento.capturar(conta, destino.numero))
+            movimentos.append(Movimento.capturar(destino, conta.numero))
+        return motivo
+    
+    # Estatísticas para dashboard (mantidas por EstatisticasBanco)
+    def total_saldo(self) -> Dinheiro:
+        return self._estatisticas.total_saldo
+    
+    def total_transacoes(self) -> int:
+        return self._estatisticas.total_transacoes
+    
+    def contas_ativas(self) -> int:
+        return self._estatisticas.contas_ativas
+    
+    def media_saldo(self) -> Dinheiro:
+        return self._estatisticas.media_saldo
+    
+    def transacoes_recentes(self, n: int = 5) -> List[Tuple[RegistroTransacao, Conta]]:
+        with self._eventos.trava:
+            return self._recentes.ultimas(n)
+    
+    def _ranking_saldos(self) -> RankingSaldos:
+        """Montado na primeira consulta (O(n log n)) e depois mantido pelos eventos."""
+        if self._ranking is None:
+            self._ranking = RankingSaldos(self._contas)
+            self._eventos.adicionar(self._ranking)
+        return self._ranking
+    
+    def maiores_saldos(self, n: int = 5) -> List[Conta]:
+        with self._eventos.trava:
+            return self._ranking_saldos().maiores(n)
+    
+    def menores_saldos(self, n: int = 5) -> List[Conta]:
+        with self._eventos.trava:
+            return self._ranking_saldos().menores(n)
+    
+    def posicao_saldo(self, conta: Conta) -> int:
+        """Posição da conta por saldo (1 = maior) entre todas as contas."""
+        with self._eventos.trava:
+            return self._ranking_saldos().posicao(conta)
+    
+    def analise(self) -> "AnaliseBanco":
+        """Colunas de análise, montadas na primeira chamada e mantidas pelos eventos."""
+        with self._eventos.trava:
+            if self._analise is None:
+                self._analise = AnaliseBanco(self._contas, self._eventos.trava)
+                self._eventos.adicionar(self._analise)
+            return self._analise
+
+
+def importar_csv(servico: BancoService, caminho: Path,
+                 tamanho_lote: int = IMPORTACAO_LOTE) -> Iterator[ResultadoOperacao]:
+    """Importa operações de um CSV (tipo,conta,valor,destino) em lotes.
+    
+    O arquivo é lido em fluxo: só um lote de linhas fica em memória e cada
+    lote é persistido numa única escrita. Produz o resultado de cada linha,
+    com o índice igual ao número da linha no arquivo (cabeçalho = 1).
+    """
+    import csv  # importação rara; fica fora do tempo de partida
+    
+    with open(caminho, newline='', encoding='utf-8') as f:
+        leitor = csv.DictReader(f)
+        faltando = {"tipo", "conta", "valor"} - set(leitor.fieldnames or ())
+        if faltando:
+            raise ValueError(f"Colunas ausentes no CSV: {', '.join(sorted(faltando))}")
+        
+        inicio = 2
+        while True:
+            lote = list(islice(leitor, tamanho_lote))
+            if not lote:
+                break
+            for resultado in servico.processar_lote(lote):
+                resultado.indice += inicio
+                yield resultado
+            inicio += len(lote)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANÁLISES
+# ═══════════════════════════════════════════════════════════════════════════════
+# NumPy é opcional e só é importado na primeira análise; sem ele (ou com
+# PYBANK_NUMPY=0) as mesmas consultas rodam em Python puro.
+
+_NUMPY = None
+
+
+def carregar_numpy():
+    """Módulo numpy, ou None se não estiver instalado ou estiver desligado."""
+    global _NUMPY
+    if _NUMPY is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _NUMPY = numpy if ANALISE_NUMPY else False
+    return _NUMPY or None
+
+
+def _posicao_percentil(p: float, n: int) -> int:
+    """Posição (0-based) do percentil p pelo método do posto mais próximo."""
+    if not 0 <= p <= 100:
+        raise ValueError(f"Percentil fora de 0..100: {p}")
+    return max(0, int(-(-p * n // 100)) - 1)
+
 
-class BancoService:
-    def __init__(self):
-        BancoDados.inicializar()
-        self._clientes: dict = BancoDados.carregar_clientes()
-        self._contas: List[Conta] = BancoDados.carregar_contas(self._clientes)
+class AnaliseBanco(ObservadorContas):
+    """Relatórios sobre saldos e históricos guardados em colunas.
     
-    @property
-    def clientes(self) -> dict:
-        return self._clientes
+    Cada conta ocupa uma posição nas colunas de número, saldo (centavos) e
+    status, atualizadas em O(1) a cada evento. Com NumPy as consultas leem
+    as colunas sem cópia (np.frombuffer) e rodam vetorizadas; sem NumPy,
+    as mesmas consultas percorrem as colunas em Python, com resultados
+    idênticos. As colunas por transação (instante, centavos, tipo) só são
+    montadas na primeira consulta que precisa delas, pois isso materializa
+    os históricos carregados sob demanda.
+    """
     
-    @property
-    def contas(self) -> List[Conta]:
-        return self._contas
+    def __init__(self, contas: Iterable[Conta] = (), trava: Optional[threading.RLock] = None,
+                 usar_numpy: bool = True):
+        self._trava = trava or threading.RLock()
+        self._np = carregar_numpy() if usar_numpy else None
+        self._contas: List[Conta] = []
+        self._posicoes: Dict[int, int] = {}
+        self._numeros = array('q')
+        self._saldos = array('q')
+        self._ativas = bytearray()
+        self._epochs: Optional[array] = None
+        self._valores: Optional[array] = None
+        self._tipos: Optional[bytearray] = None
+        for conta in contas:
+            self.conta_adicionada(conta)
     
-    def salvar(self):
-        BancoDados.salvar_clientes(self._clientes)
-        BancoDados.salvar_contas(self._contas)
+    @property
+    def motor(self) -> str:
+        return "numpy" if self._np else "python"
     
-    def buscar_cliente(self, cpf: str) -> Optional[Cliente]:
-        return self._clientes.get(re.sub(r'[^0-9]', '', cpf))
+    def __len__(self) -> int:
+        return len(self._contas)
     
-    def criar_cliente(self, nome: str, data_nasc: str, cpf: str, 
-                      endereco: Endereco) -> Optional[PessoaFisica]:
-        if not validar_cpf(cpf):
-            msg_erro("CPF inválido! 11 dígitos necessários.")
-            return None
-        cpf_limpo = re.sub(r'[^0-9]', '', cpf)
-        if cpf_limpo in self._clientes:
-            msg_erro("CPF já cadastrado!")
-            return None
-        if not validar_data(data_nasc):
-            msg_erro("Data inválida! Use dd-mm-aaaa")
-            return None
-        
-        cliente = PessoaFisica(nome, data_nasc, cpf, endereco)
-        self._clientes[cpf_limpo] = cliente
-        self.salvar()
-        return cliente
+    # Eventos (chegam sob a trava de Observadores)
+    def movimento(self, conta, registro, delta):
+        self._saldos[self._posicoes[conta.numero]] += delta.centavos
+        if self._tipos is not None:
+            self._epochs.append(conta.historico.epoch(-1))
+            self._valores.append(registro.valor.centavos)
+            self._tipos.append(codigo_tipo(registro.tipo))
     
-    def criar_conta(self, cpf: str) -> Optional[Conta]:
-        cliente = self.buscar_cliente(cpf)
-        if not cliente:
-            msg_erro("Cliente não encontrado!")
-            return None
-        conta = ContaCorrente(cliente)
+    def conta_adicionada(self, conta):
+        self._posicoes[conta.numero] = len(self._contas)
         self._contas.append(conta)
-        cliente.adicionar_conta(conta)
-        self.salvar()
-        return conta
+        self._numeros.append(conta.numero)
+        self._saldos.append(conta.saldo.centavos)
+        self._ativas.append(conta.ativa)
+        if self._tipos is not None:
+            conta.historico.copiar_colunas(self._epochs, self._valores, self._tipos)
     
-    def buscar_conta(self, numero: int) -> Optional[Conta]:
-        for c in self._contas:
-            if c.numero == numero:
-                return c
-        return None
+    def conta_removida(self, conta):
+        pos = self._posicoes.pop(conta.numero)
+        ultima = len(self._contas) - 1
+        if pos != ultima:  # a última conta ocupa o lugar da removida
+            movida = self._contas[ultima]
+            self._contas[pos] = movida
+            self._numeros[pos] = self._numeros[ultima]
+            self._saldos[pos] = self._saldos[ultima]
+            self._ativas[pos] = self._ativas[ultima]
+            self._posicoes[movida.numero] = pos
+        self._contas.pop()
+        self._numeros.pop()
+        self._saldos.pop()
+        self._ativas.pop()
+        self._epochs = self._valores = self._tipos = None  # remontadas na próxima consulta
     
-    def depositar(self, conta: Conta, valor: float) -> bool:
-        t = Deposito(valor)
-        if conta.cliente.realizar_transacao(conta, t):
-            self.salvar()
-            return True
-        return False
+    def status_alterado(self, conta):
+        self._ativas[self._posicoes[conta.numero]] = conta.ativa
     
-    def sacar(self, conta: Conta, valor: float) -> bool:
-        t = Saque(valor)
-        if conta.cliente.realizar_transacao(conta, t):
-            self.salvar()
-            return True
-        return False
+    def _colunas_transacoes(self) -> Tuple[array, array, bytearray]:
+        if self._tipos is None:
+            epochs, valores, tipos = array('q'), array('q'), bytearray()
+            for conta in self._contas:
+                conta.historico.copiar_colunas(epochs, valores, tipos)
+            self._epochs, self._valores, self._tipos = epochs, valores, tipos
+        return self._epochs, self._valores, self._tipos
     
-    def transferir(self, origem: Conta, destino: Conta, valor: float) -> bool:
-        if origem == destino:
-            msg_erro("Contas devem ser diferentes!")
-            return False
-        t = Transferencia(valor, destino)
-        if origem.cliente.realizar_transacao(origem, t):
-            self.salvar()
-            return True
-        return False
+    # Consultas. As visões NumPy das colunas não podem sair daqui: enquanto
+    # existirem, o array de origem não pode crescer. Variáveis locais vivem
+    # até o fim da função, depois da trava, por isso cada consulta apaga
+    # (del) as suas antes de soltá-la.
+    def resumo(self) -> dict:
+        """Contagens, total, média, mínimo e máximo dos saldos."""
+        with self._trava:
+            n = len(self._saldos)
+            if self._np:
+                np = self._np
+                saldos = np.frombuffer(self._saldos, dtype=np.int64)
+                ativas = int(np.count_nonzero(np.frombuffer(self._ativas, dtype=np.uint8))) if n else 0
+                total = int(saldos.sum())
+                minimo, maximo = (int(saldos.min()), int(saldos.max())) if n else (0, 0)
+                del saldos
+            else:
+                ativas = n - self._ativas.count(0)
+                total = sum(self._saldos)
+                minimo, maximo = (min(self._saldos), max(self._saldos)) if n else (0, 0)
+        total = Dinheiro(total)
+        return {
+            "contas": n,
+            "contas_ativas": ativas,
+            "total": total,
+            "media": total.dividido(n) if n else Dinheiro(),
+            "minimo": Dinheiro(minimo),
+            "maximo": Dinheiro(maximo),
+        }
     
-    # Estatísticas para dashboard
-    def total_saldo(self) -> float:
-        return sum(c.saldo for c in self._contas)
+    def percentis(self, ps: Sequence[float] = (50, 90, 99)) -> Dict[float, Dinheiro]:
+        """Percentis dos saldos (posto mais próximo: sempre um saldo existente)."""
+        with self._trava:
+            n = len(self._saldos)
+            if not n:
+                return {p: Dinheiro() for p in ps}
+            posicoes = [_posicao_percentil(p, n) for p in ps]
+            if self._np:
+                np = self._np
+                # partition só ordena em volta das posições pedidas: O(n)
+                parcial = np.partition(np.frombuffer(self._saldos, dtype=np.int64), posicoes)
+                valores = [int(parcial[k]) for k in posicoes]
+                del parcial
+            else:
+                ordenados = sorted(self._saldos)
+                valores = [ordenados[k] for k in posicoes]
+        return {p: Dinheiro(v) for p, v in zip(ps, valores)}
     
-    def total_transacoes(self) -> int:
-        return sum(len(c.historico.transacoes) for c in self._contas)
+    def histograma(self, faixas: int = 10) -> List[Tuple[Dinheiro, Dinheiro, int]]:
+        """Distribuição dos saldos em faixas de mesma largura entre o mínimo e o máximo.
+        
+        Cada item é (início, fim exclusivo, quantidade de contas).
+        """
+        if faixas < 1:
+            raise ValueError("O histograma precisa de ao menos uma faixa")
+        with self._trava:
+            if not self._saldos:
+                return []
+            if self._np:
+                np = self._np
+                saldos = np.frombuffer(self._saldos, dtype=np.int64)
+                minimo, maximo = int(saldos.min()), int(saldos.max())
+                passo = -(-(maximo - minimo + 1) // faixas)
+                contagens = np.bincount((saldos - minimo) // passo, minlength=faixas).tolist()
+                del saldos
+            else:
+                minimo, maximo = min(self._saldos), max(self._saldos)
+                passo = -(-(maximo - minimo + 1) // faixas)
+                contagens = [0] * faixas
+                for saldo in self._saldos:
+                    contagens[(saldo - minimo) // passo] += 1
+        return [(Dinheiro(minimo + i * passo), Dinheiro(minimo + (i + 1) * passo), c)
+                for i, c in enumerate(contagens)]
     
-    def contas_ativas(self) -> int:
-        return sum(1 for c in self._contas if c.ativa)
+    def volumes_por_tipo(self, desde: Optional[int] = None) -> Dict[str, Tuple[int, Dinheiro]]:
+        """Quantidade e soma dos valores por tipo de transação (a partir do epoch `desde`)."""
+        with self._trava:
+            epochs, valores, tipos = self._colunas_transacoes()
+            if self._np:
+                np = self._np
+                cod = np.frombuffer(tipos, dtype=np.uint8)
+                val = np.frombuffer(valores, dtype=np.int64)
+                if desde is not None:
+                    recentes = np.frombuffer(epochs, dtype=np.int64) >= desde
+                    cod, val = cod[recentes], val[recentes]
+                    del recentes
+                quantidades = np.bincount(cod, minlength=len(TIPOS_TRANSACAO))
+                volumes = {int(c): (int(quantidades[c]), int(val[cod == c].sum()))
+                           for c in np.flatnonzero(quantidades)}
+                del cod, val, quantidades
+            else:
+                volumes = {}
+                for epoch, centavos, codigo in zip(epochs, valores, tipos):
+                    if desde is not None and epoch < desde:
+                        continue
+                    quantidade, soma = volumes.get(codigo, (0, 0))
+                    volumes[codigo] = (quantidade + 1, soma + centavos)
+        return {TIPOS_TRANSACAO[c]: (q, Dinheiro(v)) for c, (q, v) in sorted(volumes.items())}
     
-    def media_saldo(self) -> float:
-        if not self._contas:
-            return 0
-        return self.total_saldo() / len(self._contas)
+    def top(self, n: int = 5, maiores: bool = True) -> List[Conta]:
+        """As n contas de maior (ou menor) saldo; empates vão para o menor número."""
+        with self._trava:
+            n = min(n, len(self._saldos))
+            if n <= 0:
+                return []
+            if not self._np:
+                sinal = -1 if maiores else 1
+                saldos, numeros = self._saldos, self._numeros
+                escolhidas = heapq.nsmallest(n, range(len(saldos)),
+                                             key=lambda i: (sinal * saldos[i], numeros[i]))
+                return [self._contas[i] for i in escolhidas]
+            np = self._np
+            saldos = np.frombuffer(self._saldos, dtype=np.int64)
+            numeros = np.frombuffer(self._numeros, dtype=np.int64)
+            chave = -saldos if maiores else saldos
+            # argpartition separa os n primeiros em O(len) sem ordenar o resto
+            limiar = chave[np.argpartition(chave, n - 1)[:n]].max()
+            melhores = np.flatnonzero(chave < limiar)
+            empatadas = np.flatnonzero(chave == limiar)
+            faltam = n - len(melhores)
+            if len(empatadas) > faltam:
+                empatadas = empatadas[np.argpartition(numeros[empatadas], faltam - 1)[:faltam]]
+            escolhidas = np.concatenate((melhores, empatadas))
+            ordem = np.lexsort((numeros[escolhidas], chave[escolhidas]))
+            contas = [self._contas[i] for i in escolhidas[ordem].tolist()]
+            del saldos, numeros, chave, limiar, melhores, empatadas, escolhidas, ordem
+            return contas
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -903,9 +4711,9 @@ class Dashboard:
 
         interna = UI_LARGURA - 2
         titulo = titulo_gradiente(f" 📊 {PROJETO_NOME.upper()} DASHBOARD ")
-        print(f"\n{C_PRIMARIA}╔{'═' * interna}╗{Cores.RESET}")
-        print(f"{C_PRIMARIA}║{Cores.RESET}{ajustar_visual(titulo, interna, 'centro')}{C_PRIMARIA}║{Cores.RESET}")
-        print(f"{C_PRIMARIA}╠{'═' * interna}╣{Cores.RESET}")
+        TELA.escrever(f"\n{C_PRIMARIA}╔{'═' * interna}╗{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}║{Cores.RESET}{ajustar_visual(titulo, interna, 'centro')}{C_PRIMARIA}║{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}╠{'═' * interna}╣{Cores.RESET}")
         
         # Painéis de estatísticas
         painel_clientes = criar_painel("CLIENTES", [
@@ -930,49 +4738,44 @@ class Dashboard:
         
         max_linhas = max(len(linhas_clientes), len(linhas_saldo), len(linhas_trans))
         
-        print()
+        TELA.escrever()
         for i in range(max_linhas):
             c = linhas_clientes[i] if i < len(linhas_clientes) else " " * 34
             s = linhas_saldo[i] if i < len(linhas_saldo) else " " * 34
             t = linhas_trans[i] if i < len(linhas_trans) else " " * 34
-            print(f"  {c}  {s}  {t}")
+            TELA.escrever(f"  {c}  {s}  {t}")
         
         # Gráfico de barras - saldos
-        print(f"\n{C_PRIMARIA}  📊 TOP 5 CONTAS POR SALDO:{Cores.RESET}")
-        print(f"  {Cores.DIM}{'─' * 66}{Cores.RESET}")
+        TELA.escrever(f"\n{C_PRIMARIA}  📊 TOP 5 CONTAS POR SALDO:{Cores.RESET}")
+        TELA.escrever(f"  {Cores.DIM}{'─' * 66}{Cores.RESET}")
         
-        contas_ordenadas = sorted(self._banco.contas, key=lambda x: x.saldo, reverse=True)[:5]
-        max_saldo = max((c.saldo for c in contas_ordenadas), default=1)
+        contas_ordenadas = self._banco.maiores_saldos(5)
+        max_saldo = max((c.saldo.centavos for c in contas_ordenadas), default=1)
         
         for conta in contas_ordenadas:
             nome = conta.cliente.nome[:15] if isinstance(conta.cliente, PessoaFisica) else "Cliente"
-            barra = barra_progresso(conta.saldo, max_saldo, 25, C_SUCESSO)
-            print(f"  {C_PRIMARIA}#{conta.numero:>2}{Cores.RESET} {nome:<15} {barra} {formatar_moeda(conta.saldo)}")
+            barra = barra_progresso(conta.saldo.centavos, max_saldo, 25, C_SUCESSO)
+            TELA.escrever(f"  {C_PRIMARIA}#{conta.numero:>2}{Cores.RESET} {nome:<15} {barra} {formatar_moeda(conta.saldo)}")
         
-        print(f"  {Cores.DIM}{'─' * 66}{Cores.RESET}")
+        TELA.escrever(f"  {Cores.DIM}{'─' * 66}{Cores.RESET}")
         
         # Últimas transações
-        print(f"\n{C_PRIMARIA}  🕐 ÚLTIMAS TRANSAÇÕES:{Cores.RESET}")
-        print(f"  {Cores.DIM}{'─' * 66}{Cores.RESET}")
+        TELA.escrever(f"\n{C_PRIMARIA}  🕐 ÚLTIMAS TRANSAÇÕES:{Cores.RESET}")
+        TELA.escrever(f"  {Cores.DIM}{'─' * 66}{Cores.RESET}")
         
-        todas_trans = []
-        for conta in self._banco.contas:
-            for t in conta.historico.transacoes:
-                todas_trans.append((t, conta))
+        recentes = self._banco.transacoes_recentes(5)
         
-        todas_trans.sort(key=lambda x: datetime.strptime(x[0].data, "%d/%m/%Y %H:%M:%S"), reverse=True)
-        
-        for t, conta in todas_trans[:5]:
+        for t, conta in recentes:
             icone = "💰" if t.tipo == "Deposito" else ("💸" if t.tipo == "Saque" else "🔄")
             cor = C_SUCESSO if t.tipo == "Deposito" else (C_ERRO if t.tipo == "Saque" else C_INFO)
             nome = conta.cliente.nome[:12] if isinstance(conta.cliente, PessoaFisica) else "Cliente"
-            print(f"  {icone} {Cores.DIM}{t.data}{Cores.RESET} | {cor}{t.tipo:<12}{Cores.RESET} | {nome:<12} | {formatar_moeda(t.valor)}")
+            TELA.escrever(f"  {icone} {Cores.DIM}{t.data}{Cores.RESET} | {cor}{t.tipo:<12}{Cores.RESET} | {nome:<12} | {formatar_moeda(t.valor)}")
         
-        if not todas_trans:
-            print(f"  {Cores.DIM}Nenhuma transação registrada{Cores.RESET}")
+        if not recentes:
+            TELA.escrever(f"  {Cores.DIM}Nenhuma transação registrada{Cores.RESET}")
         
-        print(f"  {Cores.DIM}{'─' * 66}{Cores.RESET}")
-        print()
+        TELA.escrever(f"  {Cores.DIM}{'─' * 66}{Cores.RESET}")
+        TELA.escrever()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -981,7 +4784,9 @@ class Dashboard:
 
 class MenuUI:
     def __init__(self):
-        self._banco = BancoService()
+        # Interativo: a gravação sai do caminho de cada operação
+        self._banco = BancoService(criar_armazenamento(
+            progresso=criar_progresso_carga("Carregando contas"), agrupado=True))
         self._dashboard = Dashboard(self._banco)
     
     def mostrar_menu(self) -> str:
@@ -1000,9 +4805,9 @@ class MenuUI:
         ]
         
         interna = UI_LARGURA - 2
-        print(f"\n{C_PRIMARIA}╔{'═' * interna}╗{Cores.RESET}")
-        print(f"{C_PRIMARIA}║{Cores.RESET}{ajustar_visual(titulo_gradiente(f'🏦 {PROJETO_NOME.upper()} MENU'), interna, 'centro')}{C_PRIMARIA}║{Cores.RESET}")
-        print(f"{C_PRIMARIA}╠{'═' * interna}╣{Cores.RESET}")
+        TELA.escrever(f"\n{C_PRIMARIA}╔{'═' * interna}╗{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}║{Cores.RESET}{ajustar_visual(titulo_gradiente(f'🏦 {PROJETO_NOME.upper()} MENU'), interna, 'centro')}{C_PRIMARIA}║{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}╠{'═' * interna}╣{Cores.RESET}")
         
         for i in range(0, len(opcoes), 2):
             op1 = opcoes[i]
@@ -1012,41 +4817,81 @@ class MenuUI:
                 op2 = opcoes[i + 1]
                 linha += f"    {op2[3]}{Cores.BOLD}[{op2[0]}]{Cores.RESET} {op2[1]} {op2[2]:<15}{Cores.RESET}"
             
-            print(f"{C_PRIMARIA}║{Cores.RESET}{ajustar_visual(linha, interna)}{C_PRIMARIA}║{Cores.RESET}")
+            TELA.escrever(f"{C_PRIMARIA}║{Cores.RESET}{ajustar_visual(linha, interna)}{C_PRIMARIA}║{Cores.RESET}")
 
-        print(f"{C_PRIMARIA}╚{'═' * interna}╝{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}╚{'═' * interna}╝{Cores.RESET}")
         return input_colorido("Selecione uma opção:", C_DESTAQUE, "👉").lower()
     
+    @staticmethod
+    def _linha_conta(conta: Conta, destacada: bool = False) -> str:
+        nome = conta.cliente.nome[:25] if isinstance(conta.cliente, PessoaFisica) else ""
+        status = f"{C_SUCESSO}●{Cores.RESET}" if conta.ativa else f"{C_ERRO}●{Cores.RESET}"
+        marca = f"{C_DESTAQUE}▶{Cores.RESET}" if destacada else " "
+        linha = f"{marca} {status} [{C_PRIMARIA}{conta.numero}{Cores.RESET}] {ajustar_visual(nome, 25)} {formatar_moeda(conta.saldo)}"
+        return f"{Cores.BOLD}{linha}{Cores.RESET}" if destacada else linha
+    
     def selecionar_conta(self, msg: str = "Selecione a conta") -> Optional[Conta]:
-        """Interface de seleção de conta."""
+        """Seleção de conta por número, nome do titular ou CPF.
+        
+        Num terminal a lista de sugestões acompanha a digitação; fora dele
+        (entrada redirecionada) cada linha é uma busca, e um número de conta
+        existente é escolhido direto.
+        """
         if not self._banco.contas:
             msg_erro("Nenhuma conta cadastrada!")
             return None
+        if TELA.teclas_disponiveis():
+            return self._selecionar_conta_digitando(msg)
         
-        print(f"\n{C_INFO}📋 {msg}:{Cores.RESET}")
-        print(f"{Cores.DIM}{'─' * 50}{Cores.RESET}")
-        
-        for conta in self._banco.contas:
-            if isinstance(conta.cliente, PessoaFisica):
-                nome = conta.cliente.nome[:25]
-                status = f"{C_SUCESSO}●{Cores.RESET}" if conta.ativa else f"{C_ERRO}●{Cores.RESET}"
-                print(f"  {status} [{C_PRIMARIA}{conta.numero}{Cores.RESET}] {nome:<25} {formatar_moeda(conta.saldo)}")
-        
-        print(f"{Cores.DIM}{'─' * 50}{Cores.RESET}")
-        
-        try:
-            num = int(input_colorido("Número da conta:", C_PRIMARIA, "→"))
-            conta = self._banco.buscar_conta(num)
-            if not conta:
-                msg_erro("Conta não encontrada!")
-            return conta
-        except ValueError:
-            msg_erro("Número inválido!")
-            return None
+        TELA.escrever(f"\n{C_INFO}📋 {msg}:{Cores.RESET}")
+        while True:
+            consulta = input_colorido("Número da conta, nome ou CPF (ENTER cancela):", C_PRIMARIA, "→")
+            if not consulta:
+                return None
+            if consulta.isdigit():
+                conta = self._banco.buscar_conta(int(consulta))
+                if conta:
+                    return conta
+            contas = self._banco.buscar_contas(consulta)
+            if not contas:
+                msg_erro("Nenhuma conta encontrada!")
+                continue
+            TELA.escrever(f"{Cores.DIM}{'─' * 50}{Cores.RESET}")
+            for conta in contas:
+                TELA.escrever(self._linha_conta(conta))
+            TELA.escrever(f"{Cores.DIM}{'─' * 50}{Cores.RESET}")
+    
+    def _selecionar_conta_digitando(self, msg: str) -> Optional[Conta]:
+        consulta, escolhida = "", 0
+        with TELA.modo_teclas() as tecla:
+            while True:
+                contas = self._banco.buscar_contas(consulta)
+                escolhida = max(0, min(escolhida, len(contas) - 1))
+                linhas = ["", f"{C_INFO}📋 {msg}:{Cores.RESET} {Cores.DIM}↑↓ escolhe · ENTER confirma · ESC cancela{Cores.RESET}"]
+                linhas += [self._linha_conta(c, i == escolhida) for i, c in enumerate(contas)]
+                if not contas:
+                    linhas.append(f"  {Cores.DIM}Nenhuma conta encontrada{Cores.RESET}")
+                linhas += [""] * (BUSCA_RESULTADOS + 2 - len(linhas))  # altura fixa
+                TELA.rascunho(linhas, f"{C_PRIMARIA}🔎{Cores.RESET} Número, nome ou CPF: {consulta}")
+                
+                t = tecla()
+                if t == TECLA_ENTER:
+                    if contas:
+                        return contas[escolhida]
+                elif t == TECLA_ESC:
+                    return None
+                elif t == TECLA_APAGAR:
+                    consulta, escolhida = consulta[:-1], 0
+                elif t == TECLA_CIMA:
+                    escolhida -= 1
+                elif t == TECLA_BAIXO:
+                    escolhida += 1
+                elif t.isprintable():
+                    consulta, escolhida = consulta + t, 0
     
     def tela_depositar(self):
         limpar_tela()
-        print(criar_caixa("DEPÓSITO", cor_titulo=C_SUCESSO, icone="💰"))
+        TELA.escrever(criar_caixa("DEPÓSITO", cor_titulo=C_SUCESSO, icone="💰"))
         
         conta = self.selecionar_conta()
         if not conta:
@@ -1059,7 +4904,7 @@ class MenuUI:
     
     def tela_sacar(self):
         limpar_tela()
-        print(criar_caixa("SAQUE", cor_titulo=C_ERRO, icone="💸"))
+        TELA.escrever(criar_caixa("SAQUE", cor_titulo=C_ERRO, icone="💸"))
         
         conta = self.selecionar_conta()
         if not conta:
@@ -1067,8 +4912,8 @@ class MenuUI:
         
         if isinstance(conta, ContaCorrente):
             restantes = conta.limite_saques - conta.saques_hoje()
-            print(f"\n{C_INFO}  ℹ  Limite: {formatar_moeda(conta.limite)} | Saques hoje: {conta.saques_hoje()}/{conta.limite_saques}{Cores.RESET}")
-            print(f"  {barra_progresso(conta.saques_hoje(), conta.limite_saques, 20, C_AVISO if restantes <= 1 else C_SUCESSO)}")
+            TELA.escrever(f"\n{C_INFO}  ℹ  Limite: {formatar_moeda(conta.limite)} | Saques hoje: {conta.saques_hoje()}/{conta.limite_saques}{Cores.RESET}")
+            TELA.escrever(f"  {barra_progresso(conta.saques_hoje(), conta.limite_saques, 20, C_AVISO if restantes <= 1 else C_SUCESSO)}")
         
         valor = input_valor("Informe o valor:")
         if valor and self._banco.sacar(conta, valor):
@@ -1081,6 +4926,63 @@ class MenuUI:
         if not conta:
             return
         
+        filtro = ("", None, None, None)  # descrição, desde, ate, tipo
+        transacoes = conta.historico.filtrar()
+        pagina = transacoes.paginas(EXTRATO_POR_PAGINA)
+        while True:
+            paginas = transacoes.paginas(EXTRATO_POR_PAGINA)
+            pagina = max(1, min(pagina, paginas))
+            limpar_tela()
+            self._exibir_extrato(conta, transacoes.pagina(pagina, EXTRATO_POR_PAGINA),
+                                 f"Página {pagina}/{paginas} · {len(transacoes)} transações{filtro[0]}")
+            comando = input_colorido("[a] anterior  [p] próxima  [nº] página  [f] filtrar  [ENTER] sair",
+                                     C_PRIMARIA, "→").lower()
+            if not comando:
+                return
+            if comando == "a":
+                pagina -= 1
+            elif comando == "p":
+                pagina += 1
+            elif comando.isdigit():
+                pagina = int(comando)
+            elif comando == "f":
+                novo = self._ler_filtro_extrato()
+                if novo is not None:
+                    filtro = novo
+                    transacoes = conta.historico.filtrar(*filtro[1:])
+                    pagina = transacoes.paginas(EXTRATO_POR_PAGINA)
+    
+    def _ler_filtro_extrato(self) -> Optional[Tuple[str, Optional[int], Optional[int], Optional[str]]]:
+        """Pergunta período e tipo; None se a entrada for inválida."""
+        desde = ate = tipo = None
+        partes = []
+        inicio = input_colorido("Desde (dd/mm/aaaa, ENTER = início):", C_TEXTO, "📅").strip()
+        fim = input_colorido("Até (dd/mm/aaaa, ENTER = fim):", C_TEXTO, "📅").strip()
+        letra = input_colorido("Tipo ([d]epósito, [s]aque, [t]ransferência, ENTER = todos):",
+                               C_TEXTO, "🔎").strip().lower()
+        try:
+            if inicio:
+                desde = dia_para_epoch(inicio)
+                partes.append(f"desde {inicio}")
+            if fim:
+                ate = dia_para_epoch(fim, fim_do_dia=True)
+                partes.append(f"até {fim}")
+        except ValueError:
+            msg_erro("Data inválida!")
+            TELA.ler(f"{C_PRIMARIA}Pressione ENTER para continuar...{Cores.RESET}")
+            return None
+        if letra:
+            tipo = {"d": "Deposito", "s": "Saque", "t": "Transferencia"}.get(letra[0])
+            if tipo is None:
+                msg_erro("Tipo inválido!")
+                TELA.ler(f"{C_PRIMARIA}Pressione ENTER para continuar...{Cores.RESET}")
+                return None
+            partes.append(tipo)
+        descricao = f" · {' '.join(partes)}" if partes else ""
+        return descricao, desde, ate, tipo
+    
+    def _exibir_extrato(self, conta: Conta, transacoes: Sequence[RegistroTransacao], rodape: str):
+        """Desenha uma página do extrato com o rodapé de paginação."""
         cliente = conta.cliente
         nome = cliente.nome if isinstance(cliente, PessoaFisica) else "Cliente"
 
@@ -1101,19 +5003,19 @@ class MenuUI:
             )
             return f"{C_PRIMARIA}│{Cores.RESET}{conteudo}{C_PRIMARIA}│{Cores.RESET}"
 
-        print(f"\n{C_PRIMARIA}┌{'─' * largura}┐{Cores.RESET}")
-        print(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'{Cores.BOLD} EXTRATO BANCÁRIO {Cores.RESET}', largura, 'centro')}{C_PRIMARIA}│{Cores.RESET}")
-        print(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
-        print(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' {C_DESTAQUE}Cliente:{Cores.RESET} {limitar_texto(nome, 45)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-        print(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' {C_DESTAQUE}Conta:{Cores.RESET} {conta.numero} | {C_DESTAQUE}Agência:{Cores.RESET} {conta.agencia}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-        print(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
-        print(linha_colunas(f"{Cores.DIM}DATA/HORA{Cores.RESET}", f"{Cores.DIM}TIPO{Cores.RESET}", f"{Cores.DIM}VALOR{Cores.RESET}"))
-        print(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
-
-        trans = conta.historico.transacoes
-        if not trans:
+        TELA.escrever(f"\n{C_PRIMARIA}┌{'─' * largura}┐{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'{Cores.BOLD} EXTRATO BANCÁRIO {Cores.RESET}', largura, 'centro')}{C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' {C_DESTAQUE}Cliente:{Cores.RESET} {limitar_texto(nome, 45)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+        posicao = f"{self._banco.posicao_saldo(conta)}º de {len(self._banco.contas)}"
+        TELA.escrever(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' {C_DESTAQUE}Conta:{Cores.RESET} {conta.numero} | {C_DESTAQUE}Agência:{Cores.RESET} {conta.agencia} | {C_DESTAQUE}Ranking:{Cores.RESET} {posicao}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
+        TELA.escrever(linha_colunas(f"{Cores.DIM}DATA/HORA{Cores.RESET}", f"{Cores.DIM}TIPO{Cores.RESET}", f"{Cores.DIM}VALOR{Cores.RESET}"))
+        TELA.escrever(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
+
+        if not transacoes:
             vazio = f"{Cores.DIM}Nenhuma movimentação registrada{Cores.RESET}"
-            print(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(vazio, largura, 'centro')}{C_PRIMARIA}│{Cores.RESET}")
+            TELA.escrever(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(vazio, largura, 'centro')}{C_PRIMARIA}│{Cores.RESET}")
         else:
             mapa_tipos = {
                 "DEPOSITO": "DEPOSITO",
@@ -1121,28 +5023,30 @@ class MenuUI:
                 "TRANSFERENCIA": "TRANSF.SAIDA",
                 "DEPOSITOTRANSFERENCIA": "TRANSF.ENTRADA",
             }
-            for t in trans:
+            for t in transacoes:
                 tipo_fmt = mapa_tipos.get(t.tipo.upper(), t.tipo.upper())
                 valor_fmt = formatar_moeda(t.valor)
-                print(linha_colunas(f"{Cores.DIM}{t.data}{Cores.RESET}", tipo_fmt, valor_fmt))
+                TELA.escrever(linha_colunas(f"{Cores.DIM}{t.data}{Cores.RESET}", tipo_fmt, valor_fmt))
 
-        print(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
         saldo_valor = formatar_moeda(conta.saldo)
         rotulo = f" {C_SUCESSO}{Cores.BOLD}SALDO ATUAL:{Cores.RESET}"
         espacos = max(1, largura - largura_visual(rotulo) - largura_visual(saldo_valor) - 1)
-        print(f"{C_PRIMARIA}│{Cores.RESET}{rotulo}{' ' * espacos}{saldo_valor} {C_PRIMARIA}│{Cores.RESET}")
-        print(f"{C_PRIMARIA}└{'─' * largura}┘{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}│{Cores.RESET}{rotulo}{' ' * espacos}{saldo_valor} {C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' {Cores.DIM}{rodape}{Cores.RESET}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}└{'─' * largura}┘{Cores.RESET}")
     
     def tela_transferir(self):
         limpar_tela()
-        print(criar_caixa("TRANSFERÊNCIA", cor_titulo=C_SECUNDARIA, icone="🔄"))
+        TELA.escrever(criar_caixa("TRANSFERÊNCIA", cor_titulo=C_SECUNDARIA, icone="🔄"))
         
         msg_info("Conta de ORIGEM:")
         origem = self.selecionar_conta()
         if not origem:
             return
         
-        print(f"\n{C_SECUNDARIA}{'─' * 50}{Cores.RESET}")
+        TELA.escrever(f"\n{C_SECUNDARIA}{'─' * 50}{Cores.RESET}")
         msg_info("Conta de DESTINO:")
         destino = self.selecionar_conta()
         if not destino:
@@ -1152,8 +5056,8 @@ class MenuUI:
             msg_erro("Contas devem ser diferentes!")
             return
         
-        print(f"\n  {C_DESTAQUE}De:{Cores.RESET}    Conta #{origem.numero} ({origem.cliente.nome[:20]})")
-        print(f"  {C_DESTAQUE}Para:{Cores.RESET}  Conta #{destino.numero} ({destino.cliente.nome[:20]})")
+        TELA.escrever(f"\n  {C_DESTAQUE}De:{Cores.RESET}    Conta #{origem.numero} ({origem.cliente.nome[:20]})")
+        TELA.escrever(f"  {C_DESTAQUE}Para:{Cores.RESET}  Conta #{destino.numero} ({destino.cliente.nome[:20]})")
         
         valor = input_valor("Valor a transferir:")
         if valor and self._banco.transferir(origem, destino, valor):
@@ -1161,7 +5065,7 @@ class MenuUI:
     
     def tela_nova_conta(self):
         limpar_tela()
-        print(criar_caixa("NOVA CONTA", cor_titulo=C_PRIMARIA, icone="➕"))
+        TELA.escrever(criar_caixa("NOVA CONTA", cor_titulo=C_PRIMARIA, icone="➕"))
         
         cpf = input_cpf()
         cliente = self._banco.buscar_cliente(cpf)
@@ -1176,46 +5080,85 @@ class MenuUI:
         conta = self._banco.criar_conta(cliente.cpf)
         if conta:
             msg_sucesso(f"Conta #{conta.numero} criada!")
-            print(f"\n  {C_DESTAQUE}Dados da conta:{Cores.RESET}")
+            TELA.escrever(f"\n  {C_DESTAQUE}Dados da conta:{Cores.RESET}")
             largura = 40
-            print(f"  ┌{'─' * largura}┐")
-            print(f"  │{ajustar_visual(f' Agência: {conta.agencia}', largura)}│")
-            print(f"  │{ajustar_visual(f' Conta:   {conta.numero}', largura)}│")
-            print(f"  │{ajustar_visual(f' Titular: {limitar_texto(cliente.nome, 30)}', largura)}│")
-            print(f"  └{'─' * largura}┘")
+            TELA.escrever(f"  ┌{'─' * largura}┐")
+            TELA.escrever(f"  │{ajustar_visual(f' Agência: {conta.agencia}', largura)}│")
+            TELA.escrever(f"  │{ajustar_visual(f' Conta:   {conta.numero}', largura)}│")
+            TELA.escrever(f"  │{ajustar_visual(f' Titular: {limitar_texto(cliente.nome, 30)}', largura)}│")
+            TELA.escrever(f"  └{'─' * largura}┘")
+    
+    def _listar_paginado(self, titulo: str, cor: str, icone: str, unidade: str, total: int,
+                         buscar: Callable[[str, int, int], list], desenhar: Callable[[object], None]):
+        """Listagem em páginas de LISTAGEM_POR_PAGINA cartões, com busca.
+        
+        Cada página pede só os seus itens (mais um, para saber se há a
+        próxima); sem busca o total é conhecido e as páginas também.
+        """
+        consulta, pagina = "", 1
+        while True:
+            itens = buscar(consulta, (pagina - 1) * LISTAGEM_POR_PAGINA, LISTAGEM_POR_PAGINA + 1)
+            if not itens and pagina > 1:
+                pagina -= 1
+                continue
+            limpar_tela()
+            TELA.escrever(criar_caixa(titulo, cor_titulo=cor, icone=icone))
+            if consulta:
+                TELA.escrever(f"\n  {C_DESTAQUE}Busca: {consulta}{Cores.RESET} · página {pagina}\n")
+            else:
+                paginas = max(1, -(-total // LISTAGEM_POR_PAGINA))
+                TELA.escrever(f"\n  {C_DESTAQUE}Total: {total} {unidade}{Cores.RESET} · página {pagina}/{paginas}\n")
+            if not itens:
+                msg_aviso("Nenhum resultado.")
+            for item in itens[:LISTAGEM_POR_PAGINA]:
+                desenhar(item)
+            
+            comando = input_colorido("[a] anterior  [p] próxima  [nº] página  [b] buscar  [ENTER] sair",
+                                     C_PRIMARIA, "→").lower()
+            if not comando:
+                return
+            if comando == "a":
+                pagina = max(1, pagina - 1)
+            elif comando == "p":
+                if len(itens) > LISTAGEM_POR_PAGINA:
+                    pagina += 1
+            elif comando.isdigit():
+                pagina = max(1, int(comando))
+            elif comando == "b":
+                consulta = input_colorido("Nome ou CPF (ENTER = todos):", C_TEXTO, "🔎")
+                pagina = 1
     
     def tela_listar_contas(self):
         limpar_tela()
-        print(criar_caixa("CONTAS CADASTRADAS", cor_titulo=C_PRIMARIA, icone="📋"))
-        
         if not self._banco.contas:
+            TELA.escrever(criar_caixa("CONTAS CADASTRADAS", cor_titulo=C_PRIMARIA, icone="📋"))
             msg_aviso("Nenhuma conta cadastrada.")
             return
-        
-        print(f"\n  {C_DESTAQUE}Total: {len(self._banco.contas)} contas{Cores.RESET}\n")
-        
-        for conta in self._banco.contas:
-            if isinstance(conta.cliente, PessoaFisica):
-                status = f"{C_SUCESSO}ATIVA{Cores.RESET}" if conta.ativa else f"{C_ERRO}INATIVA{Cores.RESET}"
-                largura = 60
-                cabecalho = f"{Cores.BOLD}Conta #{conta.numero}{Cores.RESET}"
-                prefixo = f" {cabecalho}"
-                espacos = max(1, largura - largura_visual(prefixo) - largura_visual(status) - 1)
-
-                print(f"  {C_PRIMARIA}┌{'─' * largura}┐{Cores.RESET}")
-                print(f"  {C_PRIMARIA}│{Cores.RESET}{prefixo}{' ' * espacos}{status} {C_PRIMARIA}│{Cores.RESET}")
-                print(f"  {C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
-                print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' Titular: {limitar_texto(conta.cliente.nome, 45)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-                print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' CPF:     {formatar_cpf(conta.cliente.cpf)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-                print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' Saldo:   {formatar_moeda(conta.saldo)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-                if isinstance(conta, ContaCorrente):
-                    print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' Limite:  {formatar_moeda(conta.limite)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-                print(f"  {C_PRIMARIA}└{'─' * largura}┘{Cores.RESET}")
-                print()
+        self._listar_paginado("CONTAS CADASTRADAS", C_PRIMARIA, "📋", "contas", len(self._banco.contas),
+                              self._banco.buscar_contas, self._cartao_conta)
+    
+    def _cartao_conta(self, conta: Conta):
+        if isinstance(conta.cliente, PessoaFisica):
+            status = f"{C_SUCESSO}ATIVA{Cores.RESET}" if conta.ativa else f"{C_ERRO}INATIVA{Cores.RESET}"
+            largura = 60
+            cabecalho = f"{Cores.BOLD}Conta #{conta.numero}{Cores.RESET}"
+            prefixo = f" {cabecalho}"
+            espacos = max(1, largura - largura_visual(prefixo) - largura_visual(status) - 1)
+
+            TELA.escrever(f"  {C_PRIMARIA}┌{'─' * largura}┐{Cores.RESET}")
+            TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{prefixo}{' ' * espacos}{status} {C_PRIMARIA}│{Cores.RESET}")
+            TELA.escrever(f"  {C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
+            TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' Titular: {limitar_texto(conta.cliente.nome, 45)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+            TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' CPF:     {formatar_cpf(conta.cliente.cpf)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+            TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' Saldo:   {formatar_moeda(conta.saldo)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+            if isinstance(conta, ContaCorrente):
+                TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' Limite:  {formatar_moeda(conta.limite)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+            TELA.escrever(f"  {C_PRIMARIA}└{'─' * largura}┘{Cores.RESET}")
+            TELA.escrever()
     
     def tela_novo_cliente(self):
         limpar_tela()
-        print(criar_caixa("NOVO CLIENTE", cor_titulo=C_DESTAQUE, icone="👤"))
+        TELA.escrever(criar_caixa("NOVO CLIENTE", cor_titulo=C_DESTAQUE, icone="👤"))
         
         cpf = input_cpf()
         if not validar_cpf(cpf):
@@ -1235,7 +5178,7 @@ class MenuUI:
             msg_erro("Data inválida!")
             return
         
-        print(f"\n{C_INFO}  📍 Endereço:{Cores.RESET}")
+        TELA.escrever(f"\n{C_INFO}  📍 Endereço:{Cores.RESET}")
         logradouro = input_colorido("Logradouro:", C_TEXTO, "  →").strip()
         numero = input_colorido("Número:", C_TEXTO, "  →").strip()
         bairro = input_colorido("Bairro:", C_TEXTO, "  →").strip()
@@ -1259,32 +5202,31 @@ class MenuUI:
     
     def tela_listar_clientes(self):
         limpar_tela()
-        print(criar_caixa("CLIENTES CADASTRADOS", cor_titulo=C_DESTAQUE, icone="👥"))
-        
         if not self._banco.clientes:
+            TELA.escrever(criar_caixa("CLIENTES CADASTRADOS", cor_titulo=C_DESTAQUE, icone="👥"))
             msg_aviso("Nenhum cliente cadastrado.")
             return
-        
-        print(f"\n  {C_DESTAQUE}Total: {len(self._banco.clientes)} clientes{Cores.RESET}\n")
-        
-        for cliente in self._banco.clientes.values():
-            largura = 60
-            endereco_linha = str(cliente.endereco).replace("\n", " ")
-            print(f"  {C_PRIMARIA}┌{'─' * largura}┐{Cores.RESET}")
-            print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' 👤 {Cores.BOLD}{limitar_texto(cliente.nome, 50)}{Cores.RESET}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-            print(f"  {C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
-            print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'    CPF: {formatar_cpf(cliente.cpf)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-            print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'    Nasc: {cliente.data_nascimento}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-            print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'    End: {limitar_texto(endereco_linha, 48)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-            print(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'    Contas: {C_SUCESSO}{len(cliente.contas)}{Cores.RESET}', largura)}{C_PRIMARIA}│{Cores.RESET}")
-            print(f"  {C_PRIMARIA}└{'─' * largura}┘{Cores.RESET}")
-            print()
+        self._listar_paginado("CLIENTES CADASTRADOS", C_DESTAQUE, "👥", "clientes", len(self._banco.clientes),
+                              self._banco.buscar_clientes, self._cartao_cliente)
+    
+    def _cartao_cliente(self, cliente: PessoaFisica):
+        largura = 60
+        endereco_linha = str(cliente.endereco).replace("\n", " ")
+        TELA.escrever(f"  {C_PRIMARIA}┌{'─' * largura}┐{Cores.RESET}")
+        TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f' 👤 {Cores.BOLD}{limitar_texto(cliente.nome, 50)}{Cores.RESET}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"  {C_PRIMARIA}├{'─' * largura}┤{Cores.RESET}")
+        TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'    CPF: {formatar_cpf(cliente.cpf)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'    Nasc: {cliente.data_nascimento}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'    End: {limitar_texto(endereco_linha, 48)}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"  {C_PRIMARIA}│{Cores.RESET}{ajustar_visual(f'    Contas: {C_SUCESSO}{len(cliente.contas)}{Cores.RESET}', largura)}{C_PRIMARIA}│{Cores.RESET}")
+        TELA.escrever(f"  {C_PRIMARIA}└{'─' * largura}┘{Cores.RESET}")
+        TELA.escrever()
     
     def executar(self):
         limpar_tela()
         
         # Splash screen
-        print("\n" * 5)
+        TELA.escrever("\n" * 5)
         splash = """
          ____                   __        __    
         / __ )____  ____  _____/ /_____ _/ /____
@@ -1292,11 +5234,11 @@ class MenuUI:
       / /_/ / /_/ / /_/ / /__/ /_/ /_/ / (__  )
      /_____/\\____/\\____/\\___/\\__/\\__,_/_/____/
         """
-        print(Cores.gradient(splash, (0, 255, 255), (255, 0, 255)))
+        TELA.escrever(Cores.gradient(splash, (0, 255, 255), (255, 0, 255)))
         largura = 68
-        print(f"\n{C_PRIMARIA}╔{'═' * largura}╗{Cores.RESET}")
-        print(f"{C_PRIMARIA}║{Cores.RESET}{ajustar_visual(titulo_gradiente(f'Bem-vindo ao {PROJETO_NOME} {PROJETO_VERSAO}'), largura, 'centro')}{C_PRIMARIA}║{Cores.RESET}")
-        print(f"{C_PRIMARIA}╚{'═' * largura}╝{Cores.RESET}")
+        TELA.escrever(f"\n{C_PRIMARIA}╔{'═' * largura}╗{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}║{Cores.RESET}{ajustar_visual(titulo_gradiente(f'Bem-vindo ao {PROJETO_NOME} {PROJETO_VERSAO}'), largura, 'centro')}{C_PRIMARIA}║{Cores.RESET}")
+        TELA.escrever(f"{C_PRIMARIA}╚{'═' * largura}╝{Cores.RESET}")
         
         animacao_carregamento("Inicializando sistema", 0.8)
         
@@ -1307,9 +5249,9 @@ class MenuUI:
             if opcao == "q":
                 limpar_tela()
                 interna = UI_LARGURA - 2
-                print(f"\n{C_SUCESSO}╔{'═' * interna}╗{Cores.RESET}")
-                print(f"{C_SUCESSO}║{Cores.RESET}{ajustar_visual(titulo_gradiente(f'Obrigado por usar o {PROJETO_NOME}!'), interna, 'centro')}{C_SUCESSO}║{Cores.RESET}")
-                print(f"{C_SUCESSO}╚{'═' * interna}╝{Cores.RESET}\n")
+                TELA.escrever(f"\n{C_SUCESSO}╔{'═' * interna}╗{Cores.RESET}")
+                TELA.escrever(f"{C_SUCESSO}║{Cores.RESET}{ajustar_visual(titulo_gradiente(f'Obrigado por usar o {PROJETO_NOME}!'), interna, 'centro')}{C_SUCESSO}║{Cores.RESET}")
+                TELA.escrever(f"{C_SUCESSO}╚{'═' * interna}╝{Cores.RESET}\n")
                 break
             
             elif opcao == "d":
@@ -1333,17 +5275,940 @@ class MenuUI:
             else:
                 msg_erro("Opção inválida!")
             
-            input(f"\n{C_PRIMARIA}Pressione ENTER para continuar...{Cores.RESET}")
+            TELA.ler(f"\n{C_PRIMARIA}Pressione ENTER para continuar...{Cores.RESET}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COMANDOS JSON (CLI E SERVIDOR)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ErroComando(Exception):
+    """Falha de um comando JSON; vira {"sucesso": false, "erro": ...}."""
+
+
+def conta_para_json(conta: Conta) -> dict:
+    return {
+        "conta": conta.numero,
+        "agencia": conta.agencia,
+        "titular": conta.cliente.nome if isinstance(conta.cliente, PessoaFisica) else "",
+        "cpf": conta.cliente.cpf if isinstance(conta.cliente, PessoaFisica) else "",
+        "saldo": conta.saldo.reais,
+        "ativa": conta.ativa,
+        "transacoes": len(conta.historico),
+    }
+
+
+class Comandos:
+    """Comandos com resposta JSON, usados pela CLI e pelo servidor de rede.
+    
+    Os parâmetros chegam como dicionário (argumentos da CLI ou campos do
+    pedido JSON). Leituras consultam só o estado em memória; mutações são
+    convertidas em Operacao e aplicadas por BancoService.processar_lote.
+    Valores entram e saem em reais (número JSON), como nos pedidos.
+    """
+    LEITURAS = ("saldo", "extrato", "estatisticas", "analise", "buscar")
+    MUTACOES = {"depositar": "deposito", "sacar": "saque", "transferir": "transferencia"}
+    LEITURA_EM_MEMORIA = True  # leituras não bloqueiam (podem rodar no event loop)
+    
+    def __init__(self, banco: BancoService):
+        self._banco = banco
+    
+    def executar(self, comando: str, params: dict) -> dict:
+        if comando in self.MUTACOES:
+            resposta = self.aplicar([self.operacao(comando, params)])[0]
+            if isinstance(resposta, ErroComando):
+                raise resposta
+            return resposta
+        if comando in self.LEITURAS:
+            return getattr(self, comando)(params)
+        raise ErroComando(f"Comando desconhecido: {comando}")
+    
+    def aplicar(self, operacoes: List[Operacao]) -> List[Union[dict, ErroComando]]:
+        """Aplica mutações num só lote; cada item vira resposta ou ErroComando."""
+        respostas: List[Union[dict, ErroComando]] = []
+        for operacao, resultado in zip(operacoes, self._banco.processar_lote(operacoes)):
+            try:
+                respostas.append(self.resposta(operacao, resultado))
+            except ErroComando as e:
+                respostas.append(e)
+        return respostas
+    
+    @classmethod
+    def operacao(cls, comando: str, params: dict) -> Operacao:
+        """Operação de lote equivalente a um comando de mutação."""
+        try:
+            if comando == "transferir":
+                return Operacao(cls.MUTACOES[comando], int(params["origem"]),
+                                Dinheiro.de_reais(params["valor"]), int(params["destino"]))
+            return Operacao(cls.MUTACOES[comando], int(params["conta"]),
+                            Dinheiro.de_reais(params["valor"]))
+        except KeyError as e:
+            raise ErroComando(f"Parâmetro ausente: {e}")
+        except (TypeError, ValueError) as e:
+            raise ErroComando(f"Parâmetro inválido: {e}")
+    
+    def resposta(self, operacao: Operacao, resultado: ResultadoOperacao) -> dict:
+        if not resultado.sucesso:
+            raise ErroComando(resultado.mensagem)
+        saida = {"sucesso": True, "operacao": operacao.tipo, "valor": operacao.valor.reais}
+        saida.update(conta_para_json(self._conta(operacao.conta)))
+        if operacao.destino is not None:
+            saida["destino"] = conta_para_json(self._conta(operacao.destino))
+        return saida
+    
+    def _conta(self, numero) -> Conta:
+        try:
+            conta = self._banco.buscar_conta(int(numero))
+        except (TypeError, ValueError):
+            raise ErroComando(f"Número de conta inválido: {numero}")
+        if conta is None:
+            raise ErroComando(f"Conta {numero} não encontrada")
+        return conta
+    
+    def saldo(self, params: dict) -> dict:
+        return conta_para_json(self._conta(params.get("conta")))
+    
+    def extrato(self, params: dict) -> dict:
+        conta = self._conta(params.get("conta"))
+        try:
+            desde = dia_para_epoch(params["desde"]) if params.get("desde") else None
+            ate = dia_para_epoch(params["ate"], fim_do_dia=True) if params.get("ate") else None
+            pagina = params.get("pagina")
+            pagina = None if pagina is None else int(pagina)
+            por_pagina = int(params.get("por_pagina") or EXTRATO_POR_PAGINA)
+        except (TypeError, ValueError) as e:
+            raise ErroComando(f"Parâmetro inválido: {e}")
+        if (pagina is not None and pagina < 1) or por_pagina < 1:
+            raise ErroComando("Página e tamanho da página devem ser positivos")
+        tipo = params.get("tipo")
+        if tipo:
+            tipo = next((t for t in TIPOS_TRANSACAO if t.lower() == str(tipo).lower()), tipo)
+        transacoes = conta.historico.filtrar(desde, ate, tipo or None)
+        limite = params.get("limite")
+        if limite is not None:
+            transacoes = transacoes[len(transacoes) - min(int(limite), len(transacoes)):]
+        saida = conta_para_json(conta)
+        if pagina is not None:
+            saida["pagina"] = pagina
+            saida["paginas"] = transacoes.paginas(por_pagina)
+            saida["total"] = len(transacoes)
+            transacoes = transacoes.pagina(pagina, por_pagina)
+        saida["transacoes"] = [{"tipo": t.tipo, "valor": t.valor.reais, "data": t.data}
+                               for t in transacoes]
+        return saida
+    
+    def buscar(self, params: dict) -> dict:
+        consulta = str(params.get("consulta") or "")
+        try:
+            limite = int(params.get("limite", BUSCA_RESULTADOS))
+            inicio = int(params.get("inicio", 0))
+        except (TypeError, ValueError) as e:
+            raise ErroComando(f"Parâmetro inválido: {e}")
+        if limite < 0 or inicio < 0:
+            raise ErroComando("Limite e início não podem ser negativos")
+        clientes = self._banco.buscar_clientes(consulta, inicio, limite)
+        return {
+            "consulta": consulta,
+            "clientes": [{"nome": c.nome, "cpf": c.cpf, "contas": [conta.numero for conta in c.contas]}
+                         for c in clientes],
+            "contas": [conta_para_json(c) for c in self._banco.buscar_contas(consulta, inicio, limite)],
+        }
+    
+    def estatisticas(self, params: dict) -> dict:
+        return {
+            "clientes": len(self._banco.clientes),
+            "contas": len(self._banco.contas),
+            "contas_ativas": self._banco.contas_ativas(),
+            "total_saldo": self._banco.total_saldo().reais,
+            "media_saldo": self._banco.media_saldo().reais,
+            "total_transacoes": self._banco.total_transacoes(),
+        }
+    
+    def analise(self, params: dict) -> dict:
+        try:
+            top = int(params.get("top", 10))
+            faixas = int(params.get("faixas", 10))
+        except (TypeError, ValueError) as e:
+            raise ErroComando(f"Parâmetro inválido: {e}")
+        analise = self._banco.analise()
+        resumo = analise.resumo()
+        try:
+            histograma = analise.histograma(faixas)
+        except ValueError as e:
+            raise ErroComando(str(e))
+        return {
+            "motor": analise.motor,
+            "contas": resumo["contas"],
+            "contas_ativas": resumo["contas_ativas"],
+            **{campo: resumo[campo].reais for campo in ("total", "media", "minimo", "maximo")},
+            "percentis": {f"p{p}": v.reais for p, v in analise.percentis((50, 90, 99)).items()},
+            "histograma": [{"de": de.reais, "ate": ate.reais, "contas": n} for de, ate, n in histograma],
+            "volumes": {tipo: {"quantidade": q, "valor": v.reais}
+                        for tipo, (q, v) in analise.volumes_por_tipo().items()},
+            "top": [{"conta": c.numero, "saldo": c.saldo.reais} for c in analise.top(top)],
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PARTICIONAMENTO EM PROCESSOS
+# ═══════════════════════════════════════════════════════════════════════════════
+# Cada partição é um processo com seu próprio BancoService e seus próprios
+# arquivos em <raiz>/shard-<i>; a conta N mora na partição N % total. Os
+# clientes são replicados em todas. multiprocessing só é importado aqui.
+
+def _anexar_duravel(caminho: Path, registro: dict):
+    """Anexa um registro JSON a um log e espera ele chegar ao disco."""
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, separators=(",", ":")) + "\n")
+        _gravar_em_disco(f)
+
+
+def _ler_log(caminho: Path) -> List[dict]:
+    """Registros de um log JSON; a última linha incompleta (queda) é ignorada."""
+    if not caminho.exists():
+        return []
+    registros = []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                pass
+    return registros
+
+
+def _efetivar_transacao(banco: "BancoService", log: Path, tx: str, papel: str,
+                        conta: Conta, valor: Dinheiro):
+    """Efetiva o lado de uma partição, registrando antes o tamanho que o histórico terá."""
+    _anexar_duravel(log, {"tx": tx, "estado": "efetivando", "n": len(conta.historico) + 1})
+    if papel == "debito":
+        banco.efetivar_reserva(conta, Transferencia(valor, None))
+    else:
+        banco.depositar(conta, valor)
+
+
+def _recuperar_transacoes(banco: "BancoService", diretorio: Path) -> int:
+    """Conclui as transações em dúvida de uma partição recém-carregada; devolve quantas.
+    
+    Os pedidos de uma partição são atendidos um por vez e o journal
+    preserva a ordem, então um histórico menor que o registrado em
+    "efetivando" quer dizer que o movimento não chegou ao disco. Só as
+    transações que o coordenador decidiu efetivar são aplicadas; as sem
+    decisão estão abortadas (a reserva só existia em memória).
+    """
+    log = diretorio / PARTICOES_TRANSACOES
+    transacoes: Dict[str, dict] = {}
+    for registro in _ler_log(log):
+        transacoes.setdefault(registro["tx"], {}).update(registro)
+    decididas = {r["tx"] for r in _ler_log(diretorio.parent / PARTICOES_DECISOES)}
+    aplicadas = 0
+    for tx, t in transacoes.items():
+        conta = banco.buscar_conta(t["conta"])
+        if tx not in decididas or conta is None or len(conta.historico) >= t.get("n", sys.maxsize):
+            continue
+        valor = Dinheiro(t["valor_centavos"])
+        if t["papel"] == "debito":
+            # Desde o voto, nada debitou a conta além do que a reserva permitia
+            motivo = conta.reservar(valor)
+            if motivo is not None:
+                raise ValueError(f"Transação {tx} na conta {conta.numero}: {limpar_ansi(motivo)}")
+        _efetivar_transacao(banco, log, tx, t["papel"], conta, valor)
+        aplicadas += 1
+    if aplicadas:
+        banco.salvar()  # o log some a seguir: o que foi aplicado precisa estar no snapshot
+    log.unlink(missing_ok=True)
+    return aplicadas
+
+
+def _processo_particao(diretorio: str, conexao):
+    """Laço de uma partição: atende os pedidos do coordenador, um por vez.
+    
+    Cada voto positivo e cada efetivação vão antes para o log da partição
+    (transacoes.jsonl, com fsync); ao iniciar, as transações em dúvida da
+    execução anterior são concluídas (_recuperar_transacoes).
+    """
+    banco = BancoService(criar_armazenamento(diretorio=Path(diretorio)))
+    comandos = Comandos(banco)
+    log = Path(diretorio) / PARTICOES_TRANSACOES
+    pendentes: Dict[str, Tuple[str, Conta, Dinheiro]] = {}  # tx -> (papel, conta, valor)
+    efetivadas: "OrderedDict[str, Conta]" = OrderedDict()  # confirmar repetido responde igual
+    
+    def preparar(tx: str, papel: str, numero: int, valor: Dinheiro) -> Tuple[bool, Optional[str]]:
+        """Voto da fase 1: (conta existe, motivo da recusa ou None)."""
+        conta = banco.buscar_conta(numero)
+        if conta is None:
+            return False, f"Conta {'destino ' if papel == 'credito' else ''}{numero} não encontrada"
+        if papel == "debito":
+            motivo = conta.reservar(valor)
+        else:
+            motivo = conta.motivo_recusa_deposito(valor)
+        if motivo is None:
+            try:
+                _anexar_duravel(log, {"tx": tx, "estado": "preparada", "papel": papel,
+                                      "conta": numero, "valor_centavos": valor.centavos})
+            except BaseException:
+                if papel == "debito":
+                    conta.liberar(valor)
+                raise
+            pendentes[tx] = (papel, conta, valor)
+        return True, motivo
+    
+    def confirmar(tx: str) -> dict:
+        if tx in efetivadas:
+            return conta_para_json(efetivadas[tx])
+        if tx not in pendentes:
+            raise ErroComando(f"Transação {tx} desconhecida na partição {Path(diretorio).name}")
+        papel, conta, valor = pendentes.pop(tx)
+        _efetivar_transacao(banco, log, tx, papel, conta, valor)
+        efetivadas[tx] = conta
+        if len(efetivadas) > 4096:
+            efetivadas.popitem(last=False)
+        return conta_para_json(conta)
+    
+    def abortar(tx: str):
+        papel, conta, valor = pendentes.pop(tx)
+        if papel == "debito":
+            conta.liberar(valor)
+    
+    _recuperar_transacoes(banco, Path(diretorio))
+    acoes = {"aplicar": comandos.aplicar, "executar": comandos.executar,
+             "preparar": preparar, "confirmar": confirmar, "abortar": abortar}
+    conexao.send(("ok", None))
+    while True:
+        try:
+            acao, args = conexao.recv()
+        except EOFError:
+            break
+        if acao == "encerrar":
+            banco.fechar()
+            conexao.send(("ok", None))
+            break
+        try:
+            conexao.send(("ok", acoes[acao](*args)))
+        except ErroComando as e:
+            conexao.send(("erro", e))
+        except Exception as e:
+            conexao.send(("erro", ErroComando(f"Partição {Path(diretorio).name}: {e}")))
+
+
+class BancoParticionado:
+    """Coordenador das partições, com a mesma interface de Comandos.
+    
+    Um lote é dividido por partição e os pedaços rodam em paralelo nos
+    processos. Transferências entre partições usam duas fases: a origem
+    reserva o valor e o destino valida o crédito; se as duas aceitam, o
+    coordenador grava a decisão (decisoes.jsonl, com fsync) e manda
+    efetivar nas duas, senão aborta (liberando a reserva). A reserva vale
+    contra qualquer outro débito da conta. Se uma partição cai ou falha
+    depois da decisão, a resposta sai marcada "em_duvida" e a partição
+    conclui a transferência quando for iniciada de novo; o log de decisões
+    é descartado quando todas as partições terminam de iniciar.
+    
+    A ordem das operações de uma mesma conta é preservada dentro do lote;
+    operações de contas diferentes podem ser reordenadas entre si.
+    """
+    LEITURA_EM_MEMORIA = False  # cada leitura é uma ida e volta até o processo
+    
+    def __init__(self, raiz: Path = PARTICOES_DIR):
+        import multiprocessing
+        
+        with open(Path(raiz) / PARTICOES_MANIFESTO, 'r', encoding='utf-8') as f:
+            self._total = json.load(f)["particoes"]
+        self._processos = []
+        self._conexoes = []
+        self._travas = [threading.Lock() for _ in range(self._total)]
+        self._trava_tx = threading.Lock()
+        self._ultimo_tx = 0
+        self._decisoes = Path(raiz) / PARTICOES_DECISOES
+        self._trava_decisoes = threading.Lock()
+        for i in range(self._total):
+            local, remota = multiprocessing.Pipe()
+            processo = multiprocessing.Process(
+                target=_processo_particao, args=(str(Path(raiz) / f"shard-{i}"), remota),
+                name=f"pybank-shard-{i}", daemon=True)
+            processo.start()
+            remota.close()
+            self._processos.append(processo)
+            self._conexoes.append(local)
+        # As partições carregam em paralelo; espera todas ficarem prontas
+        for conexao in self._conexoes:
+            conexao.recv()
+        # Cada uma já resolveu as transações em dúvida da execução anterior
+        self._decisoes.unlink(missing_ok=True)
+    
+    @property
+    def total(self) -> int:
+        return self._total
+    
+    def particao(self, numero: int) -> int:
+        return numero % self._total
+    
+    def __enter__(self) -> "BancoParticionado":
+        return self
+    
+    def __exit__(self, *exc):
+        self.fechar()
+    
+    def fechar(self):
+        for i, conexao in enumerate(self._conexoes):
+            with self._travas[i]:
+                try:
+                    conexao.send(("encerrar", ()))
+                    conexao.recv()
+                except (EOFError, OSError):
+                    pass
+                conexao.close()
+        for processo in self._processos:
+            processo.join(timeout=5)
+    
+    def _pedir(self, pedidos: Dict[int, Tuple[str, tuple]]) -> Dict[int, object]:
+        """Manda um pedido a cada partição indicada e espera todas as respostas.
+        
+        As partições trabalham em paralelo; as travas (obtidas em ordem de
+        índice) garantem um pedido por vez em cada conexão entre threads.
+        """
+        respostas = self._trocar(pedidos)
+        for situacao, valor in respostas.values():
+            if situacao == "erro":
+                raise valor
+        return {i: valor for i, (_, valor) in respostas.items()}
+    
+    def _trocar(self, pedidos: Dict[int, Tuple[str, tuple]]) -> Dict[int, Tuple[str, object]]:
+        """Como _pedir, mas devolve (situação, valor) de cada partição sem levantar.
+        
+        Uma partição que caiu responde ("erro", ErroComando) sem impedir a
+        leitura das respostas das outras.
+        """
+        ordem = sorted(pedidos)
+        respostas: Dict[int, Tuple[str, object]] = {}
+        for i in ordem:
+            self._travas[i].acquire()
+        try:
+            for i in ordem:
+                try:
+                    self._conexoes[i].send(pedidos[i])
+                except OSError:
+                    respostas[i] = ("erro", ErroComando(f"Partição {i} não respondeu"))
+            for i in ordem:
+                if i not in respostas:
+                    try:
+                        respostas[i] = self._conexoes[i].recv()
+                    except (EOFError, OSError):
+                        respostas[i] = ("erro", ErroComando(f"Partição {i} não respondeu"))
+        finally:
+            for i in reversed(ordem):
+                self._travas[i].release()
+        return respostas
+    
+    def _novo_tx(self) -> str:
+        # O instante separa as execuções (o pid pode se repetir entre elas)
+        with self._trava_tx:
+            self._ultimo_tx += 1
+            return f"{os.getpid()}-{epoch_agora()}-{self._ultimo_tx}"
+    
+    def executar(self, comando: str, params: dict) -> dict:
+        if comando in Comandos.MUTACOES:
+            resposta = self.aplicar([Comandos.operacao(comando, params)])[0]
+            if isinstance(resposta, ErroComando):
+                raise resposta
+            return resposta
+        if comando == "estatisticas":
+            return self.estatisticas()
+        if comando in ("analise", "buscar"):
+            raise ErroComando(f"{comando} não disponível com partições (use juntar antes)")
+        if comando in Comandos.LEITURAS:
+            try:
+                particao = self.particao(int(params.get("conta")))
+            except (TypeError, ValueError):
+                raise ErroComando(f"Número de conta inválido: {params.get('conta')}")
+            return self._pedir({particao: ("executar", (comando, params))})[particao]
+        raise ErroComando(f"Comando desconhecido: {comando}")
+    
+    def estatisticas(self) -> dict:
+        partes = list(self._pedir({i: ("executar", ("estatisticas", {}))
+                                   for i in range(self._total)}).values())
+        contas = sum(p["contas"] for p in partes)
+        # Soma em centavos: os totais chegam em reais (float) de cada partição
+        total_saldo = sum((Dinheiro.de_reais(p["total_saldo"]) for p in partes), Dinheiro())
+        return {
+            "clientes": max(p["clientes"] for p in partes),  # replicados
+            "contas": contas,
+            "contas_ativas": sum(p["contas_ativas"] for p in partes),
+            "total_saldo": total_saldo.reais,
+            "media_saldo": total_saldo.dividido(contas).reais if contas else 0.0,
+            "total_transacoes": sum(p["total_transacoes"] for p in partes),
+            "particoes": self._total,
+        }
+    
+    def aplicar(self, operacoes: List[Operacao]) -> List[Union[dict, ErroComando]]:
+        respostas: List[Union[dict, ErroComando, None]] = [None] * len(operacoes)
+        segmento: Dict[int, List[int]] = {}  # partição -> índices ainda não enviados
+        tocadas = set()                      # contas com operações no segmento
+        
+        def enviar_segmento():
+            if not segmento:
+                return
+            resultados = self._pedir({p: ("aplicar", ([operacoes[i] for i in indices],))
+                                      for p, indices in segmento.items()})
+            for p, indices in segmento.items():
+                for i, resposta in zip(indices, resultados[p]):
+                    respostas[i] = resposta
+            segmento.clear()
+            tocadas.clear()
+        
+        for i, op in enumerate(operacoes):
+            particao = self.particao(op.conta)
+            if op.destino is not None and self.particao(op.destino) != particao:
+                # Operações anteriores das mesmas contas precisam vir antes
+                if op.conta in tocadas or op.destino in tocadas:
+                    enviar_segmento()
+                respostas[i] = self._transferir_entre_particoes(op)
+                continue
+            segmento.setdefault(particao, []).append(i)
+            tocadas.add(op.conta)
+            if op.destino is not None:
+                tocadas.add(op.destino)
+        enviar_segmento()
+        return respostas
+    
+    def _transferir_entre_particoes(self, op: Operacao) -> Union[dict, ErroComando]:
+        origem, destino = self.particao(op.conta), self.particao(op.destino)
+        tx = self._novo_tx()
+        respostas = self._trocar({origem: ("preparar", (tx, "debito", op.conta, op.valor)),
+                                  destino: ("preparar", (tx, "credito", op.destino, op.valor))})
+        erro = next((valor for situacao, valor in respostas.values() if situacao == "erro"), None)
+        votos = {p: valor for p, (situacao, valor) in respostas.items() if situacao == "ok"}
+        if erro is not None:
+            recusa = None
+        else:
+            (existe_origem, motivo_origem), (existe_destino, motivo_destino) = votos[origem], votos[destino]
+            # Mesma precedência de BancoService.processar_lote: contas inexistentes primeiro
+            if not existe_origem or not existe_destino:
+                recusa = motivo_origem if not existe_origem else motivo_destino
+            else:
+                recusa = motivo_origem or motivo_destino
+        if erro is not None or recusa:
+            # Sem decisão gravada a transferência está abortada mesmo que
+            # este aviso não chegue (a partição descarta o voto ao reiniciar)
+            aceitas = {p: ("abortar", (tx,)) for p, voto in votos.items() if voto[1] is None}
+            if aceitas:
+                self._trocar(aceitas)
+            return erro if erro is not None else ErroComando(limpar_ansi(recusa))
+        with self._trava_decisoes:
+            _anexar_duravel(self._decisoes, {"tx": tx})
+        respostas = self._trocar({origem: ("confirmar", (tx,)), destino: ("confirmar", (tx,))})
+        falhas = sorted(p for p, (situacao, _) in respostas.items() if situacao == "erro")
+        if falhas:
+            return {"sucesso": False, "em_duvida": True, "transacao": tx,
+                    "operacao": op.tipo, "valor": op.valor.reais,
+                    "erro": (f"Transferência {tx} decidida, mas a partição "
+                             f"{', '.join(map(str, falhas))} não a efetivou: "
+                             f"será concluída quando a partição iniciar de novo")}
+        contas = {p: valor for p, (_, valor) in respostas.items()}
+        saida = {"sucesso": True, "operacao": op.tipo, "valor": op.valor.reais}
+        saida.update(contas[origem])
+        saida["destino"] = contas[destino]
+        return saida
+
+
+def particionar(total: int, destino: Path = PARTICOES_DIR, origem: Path = DATA_DIR) -> List[int]:
+    """Divide o banco de `origem` em `total` partições; devolve as contas por partição."""
+    destino = Path(destino)
+    if (destino / PARTICOES_MANIFESTO).exists():
+        raise ValueError(f"{destino} já contém partições (use juntar antes)")
+    banco = BancoService(criar_armazenamento(diretorio=origem))
+    grupos: List[List[Conta]] = [[] for _ in range(total)]
+    for conta in banco.contas:
+        grupos[conta.numero % total].append(conta)
+    for i, contas in enumerate(grupos):
+        diretorio = destino / f"shard-{i}"
+        diretorio.mkdir(parents=True, exist_ok=True)
+        armazenamento = criar_armazenamento(diretorio=diretorio, sob_demanda=False)
+        try:
+            armazenamento.salvar(banco.clientes, contas)
+        finally:
+            armazenamento.fechar()
+    banco.fechar()
+    with open(destino / PARTICOES_MANIFESTO, 'w', encoding='utf-8') as f:
+        json.dump({"particoes": total}, f)
+    return [len(g) for g in grupos]
+
+
+def juntar(origem: Path = PARTICOES_DIR, destino: Path = DATA_DIR) -> int:
+    """Reúne as partições de `origem` num banco único em `destino`; devolve o nº de contas."""
+    with open(Path(origem) / PARTICOES_MANIFESTO, 'r', encoding='utf-8') as f:
+        total = json.load(f)["particoes"]
+    clientes: dict = {}
+    contas: List[Conta] = []
+    for i in range(total):
+        banco = BancoService(criar_armazenamento(diretorio=Path(origem) / f"shard-{i}",
+                                                 sob_demanda=False))
+        _recuperar_transacoes(banco, Path(origem) / f"shard-{i}")
+        clientes = clientes or banco.clientes
+        contas.extend(banco.contas)
+        banco.fechar()
+    contas.sort(key=lambda c: c.numero)
+    armazenamento = criar_armazenamento(diretorio=destino, sob_demanda=False)
+    try:
+        armazenamento.salvar(clientes, contas)
+    finally:
+        armazenamento.fechar()
+    (Path(origem) / PARTICOES_DECISOES).unlink(missing_ok=True)
+    return len(contas)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SERVIDOR DE REDE
+# ═══════════════════════════════════════════════════════════════════════════════
+# asyncio é importado só aqui dentro: a CLI não paga o custo na partida.
+
+class ServidorBanco:
+    """Servidor asyncio de JSON por linha (TCP ou socket Unix).
+    
+    Cada linha é um pedido {"comando": ..., <parâmetros>, "id": opcional}
+    e recebe uma linha de resposta, na ordem, por conexão. Leituras são
+    respondidas na hora a partir da memória. Mutações vão para uma fila
+    consumida por uma única corrotina escritora: tudo o que acumulou
+    enquanto o lote anterior era gravado vira um só processar_lote (uma
+    persistência), executado numa thread para não travar as leituras.
+    """
+    
+    def __init__(self, comandos: Comandos, lote_max: int = SERVIDOR_LOTE_MAX):
+        self._comandos = comandos
+        self._lote_max = lote_max
+        self._fila = None
+        self._loop = None
+    
+    async def servir(self, host: str = SERVIDOR_HOST, porta: int = SERVIDOR_PORTA,
+                     unix: Optional[str] = None, pronto: Optional[Callable[[], None]] = None):
+        import asyncio
+        
+        self._loop = asyncio.get_running_loop()
+        self._fila = asyncio.Queue()
+        escritor = asyncio.create_task(self._escritor())
+        if unix:
+            servidor = await asyncio.start_unix_server(self._atender, path=unix)
+        else:
+            servidor = await asyncio.start_server(self._atender, host, porta)
+        if pronto:
+            pronto()
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            escritor.cancel()
+    
+    async def _atender(self, leitor, escritor):
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                resposta = await self._responder(linha)
+                escritor.write(json.dumps(resposta, ensure_ascii=False).encode("utf-8") + b"\n")
+                await escritor.drain()
+        except (ConnectionError, ValueError):
+            pass  # cliente caiu ou mandou linha maior que o limite do leitor
+        finally:
+            escritor.close()
+    
+    async def _responder(self, linha: bytes) -> dict:
+        id_pedido = None
+        try:
+            pedido = json.loads(linha)
+            if not isinstance(pedido, dict):
+                raise ErroComando("Pedido deve ser um objeto JSON")
+            id_pedido = pedido.pop("id", None)
+            comando = pedido.pop("comando", None)
+            if comando in Comandos.MUTACOES:
+                futuro = self._loop.create_future()
+                self._fila.put_nowait((Comandos.operacao(comando, pedido), futuro))
+                resposta = await futuro
+            elif self._comandos.LEITURA_EM_MEMORIA:
+                resposta = self._comandos.executar(comando, pedido)
+            else:
+                resposta = await self._loop.run_in_executor(
+                    None, self._comandos.executar, comando, pedido)
+        except (ErroComando, ValueError) as e:
+            resposta = {"sucesso": False, "erro": str(e)}
+        if id_pedido is not None:
+            resposta = {"id": id_pedido, **resposta}
+        return resposta
+    
+    async def _escritor(self):
+        while True:
+            lote = [await self._fila.get()]
+            while len(lote) < self._lote_max and not self._fila.empty():
+                lote.append(self._fila.get_nowait())
+            try:
+                respostas = await self._loop.run_in_executor(
+                    None, self._comandos.aplicar, [op for op, _ in lote])
+            except Exception as e:
+                respostas = [ErroComando(f"Falha ao gravar: {e}")] * len(lote)
+            for (_, futuro), resposta in zip(lote, respostas):
+                if futuro.done():  # cliente pode ter desconectado
+                    continue
+                if isinstance(resposta, ErroComando):
+                    futuro.set_exception(resposta)
+                else:
+                    futuro.set_result(resposta)
+
+
+def gerar_carga(host: str = SERVIDOR_HOST, porta: int = SERVIDOR_PORTA,
+                unix: Optional[str] = None, pedidos: int = 10_000, conexoes: int = 32,
+                fracao_leituras: float = 0.8, semente: Optional[int] = None) -> dict:
+    """Cliente de carga: mede pedidos/s e latências contra um ServidorBanco.
+    
+    Cada conexão manda um pedido por vez (malha fechada). Leituras são
+    saldo/extrato de contas aleatórias; mutações são transferências de
+    R$ 0,01 entre contas aleatórias, que não mudam o saldo total do banco.
+    """
+    import asyncio
+    import random
+    import time
+    
+    rnd = random.Random(semente)
+    latencias: List[float] = []
+    contagem = {"recusados": 0, "erros": 0}
+    
+    async def conectar():
+        if unix:
+            return await asyncio.open_unix_connection(unix, limit=1 << 24)
+        return await asyncio.open_connection(host, porta, limit=1 << 24)
+    
+    async def pedir(leitor, escritor, pedido: dict) -> dict:
+        escritor.write(json.dumps(pedido).encode("utf-8") + b"\n")
+        await escritor.drain()
+        linha = await leitor.readline()
+        if not linha:
+            raise ConnectionError("servidor fechou a conexão")
+        return json.loads(linha)
+    
+    async def cliente(n_contas: int, cota: int):
+        leitor, escritor = await conectar()
+        try:
+            for _ in range(cota):
+                origem = rnd.randint(1, n_contas)
+                if rnd.random() < fracao_leituras:
+                    pedido = ({"comando": "saldo", "conta": origem} if rnd.random() < 0.8
+                              else {"comando": "extrato", "conta": origem, "limite": 5})
+                else:
+                    destino = rnd.randint(1, n_contas - 1)
+                    destino += destino >= origem
+                    pedido = {"comando": "transferir", "origem": origem,
+                              "destino": destino, "valor": 0.01}
+                inicio = time.perf_counter()
+                try:
+                    resposta = await pedir(leitor, escritor, pedido)
+                except (ConnectionError, ValueError):
+                    contagem["erros"] += 1
+                    break
+                latencias.append(time.perf_counter() - inicio)
+                if resposta.get("sucesso") is False:
+                    contagem["recusados"] += 1
+        finally:
+            escritor.close()
+    
+    async def executar() -> float:
+        leitor, escritor = await conectar()
+        n_contas = (await pedir(leitor, escritor, {"comando": "estatisticas"}))["contas"]
+        escritor.close()
+        if n_contas < 2:
+            raise ErroComando("São necessárias ao menos 2 contas para gerar carga")
+        cotas = [pedidos // conexoes + (i < pedidos % conexoes) for i in range(conexoes)]
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(n_contas, c) for c in cotas if c))
+        return time.perf_counter() - inicio
+    
+    duracao = asyncio.run(executar())
+    latencias.sort()
+    
+    def percentil(p: float) -> float:
+        return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000, 3) if latencias else 0.0
+    
+    return {
+        "pedidos": len(latencias),
+        "conexoes": conexoes,
+        "duracao_s": round(duracao, 3),
+        "pedidos_s": round(len(latencias) / duracao, 1) if duracao else 0.0,
+        "recusados": contagem["recusados"],
+        "erros": contagem["erros"],
+        "latencia_ms": {"p50": percentil(0.50), "p90": percentil(0.90),
+                        "p99": percentil(0.99), "max": percentil(1.0)},
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LINHA DE COMANDO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _valor_cli(texto: str) -> Dinheiro:
+    try:
+        return Dinheiro.de_reais(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"valor inválido: {texto}")
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="PyBank.py", description=f"{PROJETO_NOME} {PROJETO_VERSAO}; sem subcomando abre o menu interativo.")
+    sub = parser.add_subparsers(dest="comando")
+    
+    p = sub.add_parser("depositar", help="deposita na conta (JSON)")
+    p.add_argument("conta", type=int)
+    p.add_argument("valor", type=_valor_cli)
+    p = sub.add_parser("sacar", help="saca da conta (JSON)")
+    p.add_argument("conta", type=int)
+    p.add_argument("valor", type=_valor_cli)
+    p = sub.add_parser("transferir", help="transfere entre contas (JSON)")
+    p.add_argument("origem", type=int)
+    p.add_argument("destino", type=int)
+    p.add_argument("valor", type=_valor_cli)
+    p = sub.add_parser("saldo", help="saldo e dados da conta (JSON)")
+    p.add_argument("conta", type=int)
+    p = sub.add_parser("extrato", help="histórico da conta (JSON)")
+    p.add_argument("conta", type=int)
+    p.add_argument("--limite", type=int, help="só as N transações mais recentes")
+    p.add_argument("--desde", metavar="DD/MM/AAAA", help="a partir deste dia")
+    p.add_argument("--ate", metavar="DD/MM/AAAA", help="até este dia (inclusive)")
+    p.add_argument("--tipo", help="Deposito, Saque ou Transferencia")
+    p.add_argument("--pagina", type=int, help="página N (1 = mais antiga), com total de páginas")
+    p.add_argument("--por-pagina", type=int, default=EXTRATO_POR_PAGINA)
+    sub.add_parser("estatisticas", help="totais do banco (JSON)")
+    p = sub.add_parser("buscar", help="clientes e contas por nome, CPF ou número da conta (JSON)")
+    p.add_argument("consulta")
+    p.add_argument("--limite", type=int, default=BUSCA_RESULTADOS)
+    p.add_argument("--inicio", type=int, default=0, help="resultados a pular (paginação)")
+    p = sub.add_parser("analise", help="percentis, histograma, volumes por tipo e top-N (JSON)")
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--faixas", type=int, default=10, help="faixas do histograma de saldos")
+    
+    p = sub.add_parser("migrar-sqlite", help="converte os arquivos JSON para SQLite")
+    p.add_argument("diretorio", nargs="?", type=Path, default=DATA_DIR)
+    p = sub.add_parser("converter", help="regrava o snapshot em binário (pybank.snap), fragmentos ou JSON")
+    p.add_argument("formato", choices=tuple(FORMATOS_SNAPSHOT))
+    p.add_argument("diretorio", nargs="?", type=Path, default=DATA_DIR)
+    p = sub.add_parser("particionar", help="divide as contas em N partições (processos)")
+    p.add_argument("total", type=int)
+    p.add_argument("--destino", type=Path, default=PARTICOES_DIR)
+    p = sub.add_parser("juntar", help="reúne as partições de volta no diretório de dados")
+    p.add_argument("--origem", type=Path, default=PARTICOES_DIR)
+    p = sub.add_parser("importar-csv", help="importa operações de um CSV em lotes")
+    p.add_argument("arquivo", type=Path)
+    p.add_argument("--lote", type=int, default=IMPORTACAO_LOTE)
+    
+    for nome, ajuda in (("servir", "servidor JSON por linha (TCP ou socket Unix)"),
+                        ("carga", "gera carga contra o servidor e mede pedidos/s e p99")):
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument("--host", default=SERVIDOR_HOST)
+        p.add_argument("--porta", type=int, default=SERVIDOR_PORTA)
+        p.add_argument("--unix", metavar="CAMINHO", help="usa socket Unix em vez de TCP")
+        if nome == "servir":
+            p.add_argument("--lote-max", type=int, default=SERVIDOR_LOTE_MAX)
+            p.add_argument("--confirmacao", choices=GravacaoAgrupada.CONFIRMACOES, default=CONFIRMACAO,
+                           help="responder às mutações depois do fsync (duravel) ou já em memória")
+            p.add_argument("--particoes", metavar="DIR", type=Path, nargs="?", const=PARTICOES_DIR,
+                           help="atende a partir das partições (um processo por partição)")
+        else:
+            p.add_argument("--pedidos", type=int, default=10_000)
+            p.add_argument("--conexoes", type=int, default=32)
+            p.add_argument("--leituras", type=float, default=0.8, help="fração de leituras (0 a 1)")
+    return parser
+
+
+def executar_comando(args) -> int:
+    """Roda um subcomando JSON; devolve o código de saída do processo."""
+    params = {k: v for k, v in vars(args).items() if k != "comando"}
+    try:
+        banco = BancoService(criar_armazenamento(sob_demanda=True))
+        saida = Comandos(banco).executar(args.comando, params)
+        codigo = 0
+    except (ErroComando, OSError, ValueError) as e:
+        saida = {"sucesso": False, "erro": str(e)}
+        codigo = 1
+    print(json.dumps(saida, ensure_ascii=False))
+    return codigo
+
+
+def importar_csv_cli(arquivo: Path, tamanho_lote: int):
+    servico = BancoService(criar_armazenamento())
+    aplicadas = recusadas = 0
+    for resultado in importar_csv(servico, arquivo, tamanho_lote):
+        if resultado.sucesso:
+            aplicadas += 1
+        else:
+            recusadas += 1
+            msg_aviso(f"Linha {resultado.indice}: {resultado.mensagem}")
+    servico.salvar()
+    msg_sucesso(f"{aplicadas} operações aplicadas, {recusadas} recusadas")
+
+
+def servir_cli(args):
+    import asyncio
+    
+    if args.particoes:
+        comandos = BancoParticionado(args.particoes)
+    else:
+        comandos = Comandos(BancoService(criar_armazenamento(
+            agrupado=True, confirmacao=args.confirmacao)))
+    servidor = ServidorBanco(comandos, args.lote_max)
+    endereco = args.unix or f"{args.host}:{args.porta}"
+    try:
+        asyncio.run(servidor.servir(args.host, args.porta, args.unix,
+                                    pronto=lambda: msg_info(f"Servindo em {endereco}")))
+    except KeyboardInterrupt:
+        msg_aviso("Servidor encerrado.")
+    finally:
+        if isinstance(comandos, BancoParticionado):
+            comandos.fechar()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # PONTO DE ENTRADA
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    args = criar_parser().parse_args(argv)
+    if args.comando == "migrar-sqlite":
+        n_clientes, n_contas = migrar_json_para_sqlite(args.diretorio)
+        msg_sucesso(f"Migrados {n_clientes} clientes e {n_contas} contas para "
+                    f"{args.diretorio / SQLITE_FILE.name}")
+        return
+    if args.comando == "converter":
+        try:
+            n_clientes, n_contas = converter_snapshot(args.formato, args.diretorio)
+        except (OSError, ValueError) as e:
+            msg_erro(str(e))
+            sys.exit(1)
+        destino = {"json": f"{CLIENTES_FILE.name}/{CONTAS_FILE.name}", "binario": SNAPSHOT_FILE.name,
+                   "fragmentado": f"{FRAGMENTOS_DIR.name}/"}[args.formato]
+        msg_sucesso(f"Convertidos {n_clientes} clientes e {n_contas} contas para {args.diretorio / destino}")
+        return
+    if args.comando == "importar-csv":
+        importar_csv_cli(args.arquivo, args.lote)
+        return
+    if args.comando == "servir":
+        servir_cli(args)
+        return
+    if args.comando == "particionar":
+        por_particao = particionar(args.total, args.destino)
+        msg_sucesso(f"{sum(por_particao)} contas em {args.total} partições "
+                    f"({', '.join(map(str, por_particao))}) em {args.destino}")
+        return
+    if args.comando == "juntar":
+        msg_sucesso(f"{juntar(args.origem)} contas reunidas em {DATA_DIR}")
+        return
+    if args.comando == "carga":
+        print(json.dumps(gerar_carga(args.host, args.porta, args.unix, args.pedidos,
+                                     args.conexoes, args.leituras), ensure_ascii=False))
+        return
+    if args.comando is not None:
+        sys.exit(executar_comando(args))
+    
     try:
         app = MenuUI()
-        app.executar()
+        with TELA.sessao():
+            app.executar()
     except KeyboardInterrupt:
         print(f"\n\n{C_AVISO}⚠ Operação cancelada.{Cores.RESET}")
     except Exception as e: